@@ -129,6 +129,9 @@ def _run() -> None:
 
 
 if __name__ == "__main__":
+    # OCR runs in spawned worker processes; frozen builds must dispatch those here.
+    import multiprocessing
+    multiprocessing.freeze_support()
     try:
         _run()
     except Exception as e:
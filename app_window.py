@@ -14,12 +14,16 @@ from PySide6.QtWidgets import (
 from .theme import THEME, qss
 from .settings import load_settings
 from .tools_registry import ToolRegistry
+from .modules.overlay.overlay_controller import CaptureStatusWidget, OcrReadoutWidget
+from .modules.timers.alarms import AlarmScheduler
+from .modules.timers.schedule_cache import ScheduleCache
 from .ui.search_dialog import SearchDialog
 from .ui.pages.general import GeneralPage
 from .ui.pages.github_zip_page import GithubZipPage
 from .ui.pages.settings_page import SettingsPage
 from .ui.pages.faq_page import FaqPage
 from .ui.pages.capture_page import CapturePage
+from .ui.pages.capture_browser_page import CaptureBrowserPage
 from .ui.pages.ocr_preview_page import OCRPreviewPage
 from .ui.pages.coding_helper_page import CodingHelperPage
 from .ui.pages.overlay_page import OverlayPage
@@ -37,6 +41,10 @@ class JarvizMainWindow(QMainWindow):
 
         self._registry = ToolRegistry()
 
+        # One schedule cache and alarm scheduler shared by every page/overlay.
+        self._schedule = ScheduleCache()
+        self._alarms = AlarmScheduler(self._schedule.next_event)
+
         self._root = QWidget()
         self._root.setObjectName("AppRoot")
         self.setCentralWidget(self._root)
@@ -120,7 +128,7 @@ class JarvizMainWindow(QMainWindow):
         github = GithubZipPage()
         self._add_page(github)
 
-        overlay = OverlayPage()
+        overlay = OverlayPage(schedule=self._schedule, alarms=self._alarms)
         self._add_page(overlay)
 
         settings = SettingsPage(on_theme_changed=self._apply_theme)
@@ -129,6 +137,9 @@ class JarvizMainWindow(QMainWindow):
         capture = CapturePage()
         self._add_page(capture)
 
+        browser = CaptureBrowserPage()
+        self._add_page(browser)
+
         ocrprev = OCRPreviewPage()
         self._add_page(ocrprev)
 
@@ -138,6 +149,10 @@ class JarvizMainWindow(QMainWindow):
         faq = FaqPage()
         self._add_page(faq)
 
+        overlay.add_overlay_widget(CaptureStatusWidget(capture.recorder.status))
+        overlay.add_overlay_widget(OcrReadoutWidget(ocrprev.overlay_text))
+        overlay.set_hud_extra(ocrprev.hud_text)
+
     def _add_page(self, page):
         self._pages[page.page_id] = page
         self._stack.addWidget(page)
@@ -0,0 +1,234 @@
+"""
+Capture throughput benchmark: synthetic input driven straight into
+CaptureRecorder's hook callbacks (no pynput, no display), one or more producer
+threads at a fixed total rate.
+
+Reports sustained write throughput, hook callback latency percentiles, drops,
+file bytes per event, hook-to-write latency and process CPU time per event.
+
+Run from the repo root:
+    python benchmarks/bench_capture_throughput.py [--rate 20000] [--threads 2] [--seconds 5]
+    python benchmarks/bench_capture_throughput.py --formats binary --modes event,adaptive --json out.json
+    python benchmarks/bench_capture_throughput.py --baseline out.json   # exit 1 on regressions
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from modules.capture_recorder import CaptureConfig, CaptureRecorder  # noqa: E402
+from modules.capture_filters import parse_rules  # noqa: E402
+from modules.capture_format import BINARY_EXT, JSONL_EXT  # noqa: E402
+from modules.foreground import FakeProvider  # noqa: E402
+
+_KEYS = ["w", "a", "s", "d", "q", "e", "r", "1", "2", "3", "Key.space", "Key.shift"]
+_BUTTONS = ["Button.left", "Button.right"]
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def _producer(rec: CaptureRecorder, rate: float, seconds: float, mix: Dict[str, float], seed: int,
+              lat: array, start: threading.Barrier) -> None:
+    """Call the hooks at `rate` events/s, paced in 1 ms bursts, timing every call."""
+    rnd = random.Random(seed)
+    p_click = mix["click"]
+    p_key = p_click + mix["key"]
+    clock = time.perf_counter_ns
+    x, y, heading = 960.0, 540.0, 0.0
+    key_down: List[str] = []
+    on_move, on_click = rec._on_move, rec._on_click
+    on_press, on_release = rec._on_key_press, rec._on_key_release
+
+    start.wait()
+    t0 = clock()
+    end = t0 + int(seconds * 1e9)
+    period = 1e9 / rate
+    sent = 0
+    while True:
+        now = clock()
+        if now >= end:
+            break
+        due = int((now - t0) / period) - sent
+        if due <= 0:
+            time.sleep(min(0.001, (sent + 1) * period / 1e9 - (now - t0) / 1e9))
+            continue
+        for _ in range(due):
+            r = rnd.random()
+            if r < p_click:
+                b = _BUTTONS[r < p_click * 0.8]
+                c0 = clock()
+                on_click(int(x), int(y), b, True)
+                on_click(int(x), int(y), b, False)
+                lat.append((clock() - c0) // 2)
+            elif r < p_key:
+                c0 = clock()
+                if key_down and rnd.random() < 0.5:
+                    on_release(key_down.pop())
+                else:
+                    k = rnd.choice(_KEYS)
+                    key_down.append(k)
+                    on_press(k)
+                lat.append(clock() - c0)
+            else:
+                # Smooth-ish strokes so adaptive mode sees realistic paths.
+                heading += rnd.gauss(0.0, 0.15)
+                x = min(3839.0, max(0.0, x + 6.0 * math.cos(heading)))
+                y = min(2159.0, max(0.0, y + 6.0 * math.sin(heading)))
+                c0 = clock()
+                on_move(int(x), int(y))
+                lat.append(clock() - c0)
+        sent += due
+
+
+def run_case(args, fmt: str, mode: str, out_dir: str) -> Dict[str, Any]:
+    mix = {"click": args.click_share, "key": args.key_share}
+    target = "Benchmark Target"
+    rec = CaptureRecorder(foreground=FakeProvider(target))
+    cfg = CaptureConfig(
+        target_window_substring=target,
+        mode=mode,
+        output_path=os.path.join(out_dir, f"bench_{fmt}_{mode}" + (BINARY_EXT if fmt == "binary" else JSONL_EXT)),
+        format=fmt,
+        segment_max_mb=args.segment_mb,
+        filters=parse_rules(args.filters.replace(";", "\n")) if args.filters else [],
+    )
+
+    lats = [array("q") for _ in range(args.threads)]
+    barrier = threading.Barrier(args.threads + 1)
+    threads = [
+        threading.Thread(
+            target=_producer,
+            args=(rec, args.rate / args.threads, args.seconds, mix, 1000 + i, lats[i], barrier),
+            name=f"bench-producer-{i}", daemon=True,
+        )
+        for i in range(args.threads)
+    ]
+    rec.start(cfg, listen=False)
+    for t in threads:
+        t.start()
+
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    barrier.wait()
+    for t in threads:
+        t.join()
+    live = rec.live_stats()
+    rec.stop()
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    st = rec.status()
+    on_disk = 0
+    for dirpath, _dirs, files in os.walk(out_dir):
+        on_disk += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files
+                       if not f.endswith((".idx", ".keys", ".json")))
+    calls = sorted(v for lat in lats for v in lat)
+    written = st["events_written"]
+    return {
+        "format": fmt,
+        "mode": mode,
+        "calls": len(calls),
+        "written": written,
+        "written_per_s": written / wall if wall else 0.0,
+        "dropped": st["dropped"],
+        "filtered": st["filtered"],
+        "bytes_per_event": st["bytes_written"] / written if written else 0.0,
+        "disk_bytes_per_event": on_disk / written if written else 0.0,
+        "hook_us_p50": _percentile(calls, 0.5) / 1e3,
+        "hook_us_p99": _percentile(calls, 0.99) / 1e3,
+        "hook_us_max": (calls[-1] / 1e3) if calls else 0.0,
+        "write_ms_p50": live["latency_ms"]["p50"],
+        "write_ms_p99": live["latency_ms"]["p99"],
+        "cpu_s": cpu,
+        "cpu_us_per_call": cpu / len(calls) * 1e6 if calls else 0.0,
+    }
+
+
+# Metrics checked against a baseline (higher = worse).
+_REGRESSION_KEYS = ("hook_us_p50", "hook_us_p99", "cpu_us_per_call", "bytes_per_event")
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    base = {(r["format"], r["mode"]): r for r in baseline}
+    problems = []
+    for r in results:
+        b = base.get((r["format"], r["mode"]))
+        if b is None:
+            continue
+        for key in _REGRESSION_KEYS:
+            old, new = float(b[key]), float(r[key])
+            if new > old * (1.0 + tolerance):
+                problems.append(f"{r['format']}/{r['mode']}: {key} {old:.3f} -> {new:.3f}")
+        if r["dropped"] > b["dropped"]:
+            problems.append(f"{r['format']}/{r['mode']}: dropped {b['dropped']} -> {r['dropped']}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rate", type=float, default=20000.0, help="total events/s across all producer threads")
+    ap.add_argument("--threads", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--formats", default="jsonl,binary")
+    ap.add_argument("--modes", default="event,adaptive")
+    ap.add_argument("--click-share", type=float, default=0.02)
+    ap.add_argument("--key-share", type=float, default=0.08)
+    ap.add_argument("--segment-mb", type=int, default=0, help="rotate segments at this size (0 = one file)")
+    ap.add_argument("--filters", default="", help="capture filter rules, ';'-separated")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="compare against a previous --json file; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown vs the baseline")
+    args = ap.parse_args()
+    args.threads = max(1, args.threads)
+
+    print(f"rate {args.rate:.0f}/s, {args.threads} thread(s), {args.seconds:.1f} s per case\n")
+    print(f"{'format':<7} {'mode':<9} {'written/s':>10} {'drops':>6} {'B/ev':>6} {'disk B/ev':>9} "
+          f"{'hook p50 us':>11} {'p99 us':>7} {'max us':>8} {'write p99 ms':>12} {'cpu us/ev':>9}")
+    results = []
+    for fmt in [f for f in args.formats.split(",") if f]:
+        for mode in [m for m in args.modes.split(",") if m]:
+            out_dir = tempfile.mkdtemp(prefix="jarviz-bench-")
+            try:
+                r = run_case(args, fmt, mode, out_dir)
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+            results.append(r)
+            print(f"{fmt:<7} {mode:<9} {r['written_per_s']:>10.0f} {r['dropped']:>6} {r['bytes_per_event']:>6.1f} "
+                  f"{r['disk_bytes_per_event']:>9.1f} {r['hook_us_p50']:>11.2f} {r['hook_us_p99']:>7.1f} "
+                  f"{r['hook_us_max']:>8.0f} {r['write_ms_p99']:>12.1f} {r['cpu_us_per_call']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions:")
+            for p in problems:
+                print("  " + p)
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
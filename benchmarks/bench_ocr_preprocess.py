@@ -0,0 +1,171 @@
+"""
+OCR preprocessing micro-benchmark: runs modules/ocr/preprocess.py over tooltip
+screenshots and reports the time of every step, plus how many pixels are left
+for the OCR engine.
+
+Screenshots are PNG/JPG files of the capture region (what mss would grab), set
+roughly on the tooltip. With no --images, synthetic ones are drawn with Qt: a
+framed panel with a few lines of text and a margin of game-like scenery around
+it. --save-fixtures keeps them for later runs.
+
+Run from the repo root:
+    python benchmarks/bench_ocr_preprocess.py [--images shots/] [--repeat 50]
+    python benchmarks/bench_ocr_preprocess.py --save-fixtures fixtures/ --count 12
+    python benchmarks/bench_ocr_preprocess.py --ocr            # also time tesseract on each variant
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import QRect, Qt  # noqa: E402
+from PySide6.QtGui import QColor, QFont, QGuiApplication, QImage, QLinearGradient, QPainter, QPen  # noqa: E402
+
+from modules.ocr.engines import FakeEngine, TesseractEngine, find_tesseract  # noqa: E402
+from modules.ocr.preprocess import STEPS, PreprocessConfig, Preprocessor  # noqa: E402
+
+Shot = Tuple[str, bytes, int, int]  # name, BGRA bytes, width, height
+
+_WORDS = ["Ancient", "Sword", "of", "the", "Fallen", "King", "Damage", "Attack", "Speed", "Critical",
+          "Strike", "Chance", "Requires", "Level", "Strength", "Item", "Quality", "Resistance", "+12%", "42-87"]
+
+
+def _bgra(img: QImage) -> Tuple[bytes, int, int]:
+    img = img.convertToFormat(QImage.Format.Format_RGB32)  # BGRA byte order, like mss
+    w, h = img.width(), img.height()
+    row = img.bytesPerLine()
+    data = bytes(img.constBits())
+    if row != w * 4:
+        data = b"".join(data[y * row:y * row + w * 4] for y in range(h))
+    return data, w, h
+
+
+def load_shots(folder: str) -> List[Shot]:
+    shots = []
+    for path in sorted(glob.glob(os.path.join(folder, "*"))):
+        if not path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
+            continue
+        img = QImage(path)
+        if img.isNull():
+            continue
+        shots.append((os.path.basename(path),) + _bgra(img))
+    return shots
+
+
+def make_tooltip(rnd: random.Random, margin: int = 60) -> QImage:
+    lines = rnd.randint(4, 9)
+    bw, bh = rnd.randint(260, 460), 34 + lines * 20
+    w, h = bw + rnd.randint(0, margin) + rnd.randint(0, margin), bh + rnd.randint(0, margin) + rnd.randint(0, margin)
+    img = QImage(w, h, QImage.Format.Format_RGB32)
+    p = QPainter(img)
+    grad = QLinearGradient(0, 0, w, h)
+    grad.setColorAt(0.0, QColor(rnd.randint(20, 70), rnd.randint(30, 80), rnd.randint(20, 60)))
+    grad.setColorAt(1.0, QColor(rnd.randint(40, 90), rnd.randint(20, 60), rnd.randint(10, 50)))
+    p.fillRect(0, 0, w, h, grad)
+    for _ in range(20):  # scenery
+        p.fillRect(rnd.randrange(w), rnd.randrange(h), rnd.randint(4, 60), rnd.randint(4, 60),
+                   QColor(rnd.randint(20, 110), rnd.randint(20, 110), rnd.randint(20, 110)))
+
+    bx, by = rnd.randint(0, w - bw), rnd.randint(0, h - bh)
+    p.fillRect(bx, by, bw, bh, QColor(12, 10, 16))
+    p.setPen(QPen(QColor(196, 160, 90), 2))
+    p.drawRect(bx + 1, by + 1, bw - 3, bh - 3)
+    font = QFont()
+    font.setPixelSize(13)
+    p.setFont(font)
+    for i in range(lines):
+        text = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(2, 6)))
+        p.setPen(QColor(255, 200, 80) if i == 0 else QColor(210, 210, 215))
+        p.drawText(QRect(bx + 10, by + 10 + i * 20, bw - 20, 20), int(Qt.AlignmentFlag.AlignLeft), text)
+    p.end()
+    return img
+
+
+def _variants(args) -> Dict[str, PreprocessConfig]:
+    base = PreprocessConfig(upscale=args.upscale)
+    return {
+        "gray only": replace(base, crop=False, stretch=False, binarize=False, upscale=1, invert="no"),
+        "crop+gray": replace(base, stretch=False, binarize=False, upscale=1, invert="no"),
+        "full": base,
+    }
+
+
+def _median(vals: List[float]) -> float:
+    s = sorted(vals)
+    return s[len(s) // 2] if s else 0.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", help="folder of tooltip screenshots (png/jpg)")
+    ap.add_argument("--count", type=int, default=8, help="synthetic tooltips when --images is not given")
+    ap.add_argument("--margin", type=int, default=60, help="max scenery margin per side around synthetic tooltips")
+    ap.add_argument("--save-fixtures", help="write the synthetic tooltips here as PNG")
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--upscale", type=int, default=2)
+    ap.add_argument("--ocr", action="store_true", help="also run OCR on each variant's output")
+    ap.add_argument("--fake-ocr", action="store_true", help="with --ocr: use the fake engine instead of tesseract")
+    ap.add_argument("--tesseract", default="", help="tesseract executable (default: PATH)")
+    args = ap.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])  # noqa: F841 (fonts need it)
+    if args.images:
+        shots = load_shots(args.images)
+        if not shots:
+            sys.exit(f"No images found in {args.images}")
+    else:
+        rnd = random.Random(1234)
+        shots = []
+        for i in range(args.count):
+            img = make_tooltip(rnd, args.margin)
+            name = f"tooltip_{i:02d}.png"
+            if args.save_fixtures:
+                os.makedirs(args.save_fixtures, exist_ok=True)
+                img.save(os.path.join(args.save_fixtures, name))
+            shots.append((name,) + _bgra(img))
+
+    engine = None
+    if args.ocr:
+        engine = FakeEngine() if args.fake_ocr else TesseractEngine(find_tesseract(args.tesseract))
+
+    print(f"{len(shots)} image(s), {args.repeat} run(s) each\n")
+    steps_hdr = " ".join(f"{s:>9}" for s in STEPS)
+    print(f"{'variant':<10} {steps_hdr} {'total us':>9} {'px out/in':>9}" + ("  ocr ms" if engine else ""))
+    for label, cfg in _variants(args).items():
+        pre = Preprocessor(cfg)
+        totals: List[float] = []
+        ratio: List[float] = []
+        ocr_ms: List[float] = []
+        for _name, raw, w, h in shots:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                out = pre(raw, w, h)
+                totals.append((time.perf_counter() - t0) * 1e6)
+            ratio.append(out.size / float(w * h))
+            if engine is not None:
+                t0 = time.perf_counter()
+                engine(out)
+                ocr_ms.append((time.perf_counter() - t0) * 1000.0)
+        means = pre.times.mean_ms()
+        cells = " ".join(f"{means[s] * 1000:>9.0f}" if s in means else f"{'-':>9}" for s in STEPS)
+        line = f"{label:<10} {cells} {_median(totals):>9.0f} {sum(ratio) / len(ratio):>9.2f}"
+        if engine is not None:
+            line += f"  {_median(ocr_ms):>6.0f}"
+        print(line)
+
+    print("\nstep columns: mean microseconds per image; total: median; px out/in: output pixels / input pixels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Schedule parser benchmark: streaming html.parser tokenizer vs the old
+BeautifulSoup + get_text + per-line regex implementation.
+
+Run from the repo root:
+    python benchmarks/bench_schedule_parse.py [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from modules.timers.d4_event_schedule import D4Event, _parse_events  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _legacy_parse(html: str):
+    """The pre-streaming parser, kept here only as the comparison baseline."""
+    from bs4 import BeautifulSoup
+    from dateutil import tz
+
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text("\n", strip=True)
+    lines = [ln.strip() for ln in text.splitlines() if re.search(r"\d{1,2}/\d{1,2}/\d{4}", ln)]
+
+    events = []
+    for ln in lines:
+        m = re.match(r"^(\d{1,2}/\d{1,2}/\d{4}\s+\d{1,2}:\d{2}\s+[AP]M)(.*)$", ln)
+        if not m:
+            continue
+        try:
+            dt = datetime.strptime(m.group(1).strip(), "%m/%d/%Y %I:%M %p").replace(tzinfo=tz.tzlocal())
+        except Exception:
+            continue
+        tail = m.group(2).strip()
+        kind = "worldboss" if tail in {"Avarice", "Ashava", "Wandering Death", "Azmodan"} else "event"
+        events.append(D4Event(kind=kind, starts_at=dt, label=tail))
+    events.sort(key=lambda e: e.starts_at)
+    return events
+
+
+def _measure(fn, html: str, repeat: int):
+    fn(html)  # warm caches/imports
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        events = fn(html)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return events, statistics.median(times), peak
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        parsers = [("bs4 (old)", _legacy_parse), ("streaming", _parse_events)]
+    except ModuleNotFoundError:
+        print("bs4 not installed: benchmarking the streaming parser only.\n")
+        parsers = [("streaming", _parse_events)]
+
+    print(f"{'fixture':<34} {'parser':<12} {'events':>6} {'labelled':>8} {'median ms':>10} {'peak KiB':>9}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "helltides_schedule_*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        name = os.path.basename(path)
+        for label, fn in parsers:
+            events, med, peak = _measure(fn, html, args.repeat)
+            labelled = sum(1 for e in events if e.label)
+            print(f"{name:<34} {label:<12} {len(events):>6} {labelled:>8} {med * 1000:>10.2f} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
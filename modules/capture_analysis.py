@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+try:
+    from ..paths import data_dir
+except ImportError:  # pragma: no cover
+    from paths import data_dir
+
+from .capture_compress import open_read
+from .capture_format import (
+    EV_CLICK, EV_KEY_PRESS, EV_KEY_RELEASE, EV_MOVE, EVENT_NAMES, EVENT_TYPES,
+    HEADER_SIZE, RECORD_SIZE, REC_KEYDEF, REC_KEYNAME,
+    BinaryDecoder, is_binary, records_to_events,
+)
+from .capture_segments import MANIFEST_NAME, load_manifest
+
+if np is not None:
+    from .capture_format import EVENT_DTYPE, RECORD_DTYPE
+
+CACHE_VERSION = 1
+
+# Interval/dwell histograms: 10 ms bins up to 2 s, plus one overflow bin.
+_HIST_BIN_MS = 10
+_HIST_BINS = 200
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is not installed. Install requirements first.")
+
+
+# --------------------
+# Chunked readers -> EVENT_DTYPE arrays
+# --------------------
+class _NameTable:
+    """Session-wide key/button names; per-file codes are remapped into it."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+def _session_files(path: str) -> List[str]:
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST_NAME:
+        m = load_manifest(path)
+        d = path if os.path.isdir(path) else os.path.dirname(path)
+        return [os.path.join(d, s["path"]) for s in m.get("segments", []) if not s.get("removed")]
+    return [path]
+
+
+def _binary_chunks(path: str, table: _NameTable, chunk_events: int) -> Iterator["np.ndarray"]:
+    dec = BinaryDecoder()  # fed only KEYDEF/KEYNAME records, keeps state across chunks
+    t_ns = 0
+    rest = b""
+    with open_read(path) as f:
+        f.read(HEADER_SIZE)
+        while True:
+            data = f.read(RECORD_SIZE * chunk_events)
+            if not data:
+                return
+            data = rest + data
+            usable = len(data) - len(data) % RECORD_SIZE
+            rest = data[usable:]
+            if not usable:
+                continue
+            raw = np.frombuffer(data, dtype=RECORD_DTYPE, count=usable // RECORD_SIZE)
+            types = raw["type"]
+            for i in np.flatnonzero((types == REC_KEYDEF) | (types == REC_KEYNAME)):
+                for _ in dec.decode(data[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]):
+                    pass
+            ev, t_ns = records_to_events(raw, t_ns)
+            named = (ev["type"] == EV_CLICK) | (ev["type"] == EV_KEY_PRESS) | (ev["type"] == EV_KEY_RELEASE)
+            if named.any():
+                codes = ev["code"][named]
+                n = max(len(dec.names), int(codes.max()) + 1)
+                remap = np.array([table.intern(dec.names[c] if c < len(dec.names) else f"<code {c}>")
+                                  for c in range(n)], dtype=np.uint16)
+                ev["code"][named] = remap[codes]
+            yield ev
+
+
+def _jsonl_chunks(path: str, table: _NameTable, chunk_events: int) -> Iterator["np.ndarray"]:
+    cols: Dict[str, List[Any]] = {k: [] for k in ("t_ns", "type", "pressed", "code", "x", "y", "dx", "dy")}
+
+    def flush():
+        out = np.empty(len(cols["t_ns"]), dtype=EVENT_DTYPE)
+        for k, v in cols.items():
+            out[k] = np.clip(v, -32768, 32767) if k in ("x", "y", "dx", "dy") else v
+            v.clear()
+        return out
+
+    with open_read(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                d = json.loads(line)
+                etype = EVENT_TYPES[d.get("type", "")]
+            except (ValueError, KeyError):
+                continue
+            cols["t_ns"].append(int(float(d.get("t", 0.0)) * 1e9))
+            cols["type"].append(etype)
+            cols["pressed"].append(bool(d.get("pressed", False)))
+            name = d.get("button") if etype == EV_CLICK else d.get("key")
+            cols["code"].append(table.intern(str(name)) if name is not None else 0)
+            cols["x"].append(int(d.get("x", 0) or 0))
+            cols["y"].append(int(d.get("y", 0) or 0))
+            cols["dx"].append(int(d.get("dx", 0) or 0))
+            cols["dy"].append(int(d.get("dy", 0) or 0))
+            if len(cols["t_ns"]) >= chunk_events:
+                yield flush()
+    if cols["t_ns"]:
+        yield flush()
+
+
+def iter_chunks(path: str, chunk_events: int = 1 << 20) -> Tuple[Iterator["np.ndarray"], List[str]]:
+    """
+    Stream a capture (JSONL, binary, compressed, or a segmented session) as
+    EVENT_DTYPE arrays of at most `chunk_events` events. Returns the iterator and
+    the session-wide name list that `code` indexes into (filled while iterating).
+    """
+    _require_numpy()
+    table = _NameTable()
+
+    def gen():
+        for p in _session_files(path):
+            if not os.path.exists(p):
+                continue
+            if is_binary(p):
+                yield from _binary_chunks(p, table, chunk_events)
+            else:
+                # Parsed JSONL is held as Python lists until flushed: keep those chunks small.
+                yield from _jsonl_chunks(p, table, min(chunk_events, 1 << 16))
+
+    return gen(), table.names
+
+
+# --------------------
+# Analysis
+# --------------------
+@dataclass
+class CaptureStats:
+    events: int = 0
+    duration_s: float = 0.0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    apm_window_s: int = 60
+    actions_per_s: Any = None   # int array, one bin per second of session time
+    apm_mean: float = 0.0
+    apm_peak: float = 0.0
+
+    key_counts: Dict[str, int] = field(default_factory=dict)
+
+    click_interval_hist: Any = None   # _HIST_BINS + 1 counts, 10 ms bins (last = overflow)
+    click_interval_ms: Dict[str, float] = field(default_factory=dict)  # mean / p50 / p90
+    dwell_hist: Any = None
+    dwell_ms: Dict[str, float] = field(default_factory=dict)
+    dwell_by_key_ms: Dict[str, float] = field(default_factory=dict)
+
+    heatmap: Any = None       # moves per cell, shape (rows, cols)
+    heat_cell_px: int = 16
+    heat_origin: Tuple[int, int] = (0, 0)
+    offscreen_moves: int = 0
+
+    def apm_rolling(self) -> "np.ndarray":
+        """APM at each second, over the trailing `apm_window_s` seconds."""
+        a = self.actions_per_s
+        if a is None or not len(a):
+            return np.zeros(0)
+        c = np.cumsum(a)
+        w = self.apm_window_s
+        rolled = c.copy()
+        rolled[w:] -= c[:-w]
+        return rolled * (60.0 / w)
+
+
+def _hist_add(hist: "np.ndarray", values_ns: "np.ndarray") -> None:
+    b = np.minimum(values_ns // (_HIST_BIN_MS * 1_000_000), _HIST_BINS)
+    hist += np.bincount(b.astype(np.int64), minlength=_HIST_BINS + 1)
+
+
+def _hist_summary(hist: "np.ndarray", total_ns: int, count: int) -> Dict[str, float]:
+    if count == 0:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0}
+    c = np.cumsum(hist)
+
+    def pct(q: float) -> float:
+        return float(np.searchsorted(c, q * count) + 0.5) * _HIST_BIN_MS
+
+    return {"count": count, "mean": total_ns / count / 1e6, "p50": pct(0.5), "p90": pct(0.9)}
+
+
+class _Accumulator:
+    """Per-chunk vectorized updates; state carried between chunks is O(keys + screen cells)."""
+
+    def __init__(self, apm_window_s: int, cell_px: int, screen: Tuple[int, int, int, int]) -> None:
+        self.apm_window_s = apm_window_s
+        self.events = 0
+        self.t_max = 0
+        self.counts = np.zeros(len(EVENT_NAMES), dtype=np.int64)
+        self.actions = np.zeros(0, dtype=np.int64)
+        self.key_counts = np.zeros(0, dtype=np.int64)
+
+        self.click_hist = np.zeros(_HIST_BINS + 1, dtype=np.int64)
+        self.click_total = 0
+        self.click_n = 0
+        self.last_click: Optional[int] = None
+
+        self.dwell_hist = np.zeros(_HIST_BINS + 1, dtype=np.int64)
+        self.dwell_total = 0
+        self.dwell_n = 0
+        self.dwell_sum = np.zeros(0, dtype=np.int64)
+        self.dwell_cnt = np.zeros(0, dtype=np.int64)
+        self.held: Dict[int, int] = {}  # code -> first press time of a key still down
+
+        x0, y0, x1, y1 = screen
+        self.cell = max(1, int(cell_px))
+        self.origin = (x0, y0)
+        self.cols = max(1, -(-(x1 - x0) // self.cell))
+        self.rows = max(1, -(-(y1 - y0) // self.cell))
+        self.heat = np.zeros(self.rows * self.cols, dtype=np.int64)
+        self.offscreen = 0
+
+    @staticmethod
+    def _grow(a: "np.ndarray", n: int) -> "np.ndarray":
+        return a if len(a) >= n else np.concatenate([a, np.zeros(n - len(a), dtype=a.dtype)])
+
+    def add(self, ev: "np.ndarray") -> None:
+        if not len(ev):
+            return
+        self.events += len(ev)
+        t = ev["t_ns"]
+        types = ev["type"]
+        self.t_max = max(self.t_max, int(t.max()))
+        self.counts += np.bincount(types, minlength=len(EVENT_NAMES))[:len(EVENT_NAMES)]
+
+        clicks = (types == EV_CLICK) & ev["pressed"]
+        presses = types == EV_KEY_PRESS
+        self._apm(t[clicks | presses])
+        self._keys(ev["code"][presses])
+        self._clicks(t[clicks])
+        self._dwell(ev[(types == EV_KEY_PRESS) | (types == EV_KEY_RELEASE)])
+        moves = ev[types == EV_MOVE]
+        self._heat(moves["x"], moves["y"])
+
+    def _apm(self, t: "np.ndarray") -> None:
+        if not len(t):
+            return
+        sec = (t // 1_000_000_000).astype(np.int64)
+        self.actions = self._grow(self.actions, int(sec.max()) + 1)
+        self.actions += np.bincount(sec, minlength=len(self.actions))
+
+    def _keys(self, codes: "np.ndarray") -> None:
+        if not len(codes):
+            return
+        self.key_counts = self._grow(self.key_counts, int(codes.max()) + 1)
+        self.key_counts += np.bincount(codes, minlength=len(self.key_counts))
+
+    def _clicks(self, t: "np.ndarray") -> None:
+        if not len(t):
+            return
+        if self.last_click is not None:
+            t = np.concatenate([[self.last_click], t])
+        self.last_click = int(t[-1])
+        gaps = np.diff(t)
+        if len(gaps):
+            _hist_add(self.click_hist, gaps)
+            self.click_total += int(gaps.sum())
+            self.click_n += len(gaps)
+
+    def _dwell(self, keys: "np.ndarray") -> None:
+        if not len(keys) and not self.held:
+            return
+        code = keys["code"].astype(np.int64)
+        t = keys["t_ns"]
+        press = keys["type"] == EV_KEY_PRESS
+        if self.held:
+            # Keys still down at the end of the previous chunk re-enter as presses.
+            hc = np.fromiter(self.held.keys(), dtype=np.int64)
+            ht = np.fromiter(self.held.values(), dtype=np.int64)
+            code = np.concatenate([hc, code])
+            t = np.concatenate([ht, t])
+            press = np.concatenate([np.ones(len(hc), dtype=bool), press])
+            self.held = {}
+
+        order = np.lexsort((t, code))
+        code, t, press = code[order], t[order], press[order]
+        # A press starts a hold unless the previous event of the same key was also a
+        # press (auto-repeat). Each release ends the hold started by its run's first press.
+        same = np.zeros(len(code), dtype=bool)
+        same[1:] = code[1:] == code[:-1]
+        prev_press = np.zeros(len(code), dtype=bool)
+        prev_press[1:] = press[:-1]
+        start = press & ~(same & prev_press)
+        start_idx = np.maximum.accumulate(np.where(start, np.arange(len(code)), -1))
+        rel = ~press & same & prev_press & (start_idx >= 0)
+        if rel.any():
+            d = t[rel] - t[start_idx[rel]]
+            c = code[rel]
+            _hist_add(self.dwell_hist, d)
+            self.dwell_total += int(d.sum())
+            self.dwell_n += len(d)
+            n = int(c.max()) + 1
+            self.dwell_sum = self._grow(self.dwell_sum, n)
+            self.dwell_cnt = self._grow(self.dwell_cnt, n)
+            self.dwell_sum += np.bincount(c, weights=d, minlength=len(self.dwell_sum)).astype(np.int64)
+            self.dwell_cnt += np.bincount(c, minlength=len(self.dwell_cnt))
+
+        # Carry keys whose last event is a press: they are still held.
+        if len(code):
+            last = np.ones(len(code), dtype=bool)
+            last[:-1] = code[:-1] != code[1:]
+            for i in np.flatnonzero(last & press):
+                self.held[int(code[i])] = int(t[start_idx[i]])
+
+    def _heat(self, x: "np.ndarray", y: "np.ndarray") -> None:
+        if not len(x):
+            return
+        cx = (x.astype(np.int64) - self.origin[0]) // self.cell
+        cy = (y.astype(np.int64) - self.origin[1]) // self.cell
+        inside = (cx >= 0) & (cx < self.cols) & (cy >= 0) & (cy < self.rows)
+        self.offscreen += int((~inside).sum())
+        self.heat += np.bincount(cy[inside] * self.cols + cx[inside], minlength=len(self.heat))
+
+    def result(self, names: List[str]) -> CaptureStats:
+        s = CaptureStats()
+        s.events = self.events
+        s.duration_s = self.t_max / 1e9
+        s.counts = {EVENT_NAMES[i]: int(n) for i, n in enumerate(self.counts) if i in EVENT_NAMES}
+
+        s.apm_window_s = self.apm_window_s
+        s.actions_per_s = self.actions
+        if len(self.actions):
+            roll = s.apm_rolling()
+            s.apm_mean = float(self.actions.sum()) / max(1e-9, s.duration_s) * 60.0
+            s.apm_peak = float(roll.max())
+
+        s.key_counts = {names[i] if i < len(names) else f"<code {i}>": int(n)
+                        for i, n in enumerate(self.key_counts) if n}
+
+        s.click_interval_hist = self.click_hist
+        s.click_interval_ms = _hist_summary(self.click_hist, self.click_total, self.click_n)
+        s.dwell_hist = self.dwell_hist
+        s.dwell_ms = _hist_summary(self.dwell_hist, self.dwell_total, self.dwell_n)
+        s.dwell_by_key_ms = {names[i] if i < len(names) else f"<code {i}>": float(self.dwell_sum[i]) / n / 1e6
+                             for i, n in enumerate(self.dwell_cnt) if n}
+
+        s.heatmap = self.heat.reshape(self.rows, self.cols)
+        s.heat_cell_px = self.cell
+        s.heat_origin = self.origin
+        s.offscreen_moves = self.offscreen
+        return s
+
+
+# --------------------
+# Result cache (keyed by file size + mtime)
+# --------------------
+_ARRAYS = ("actions_per_s", "click_interval_hist", "dwell_hist", "heatmap")
+
+
+def _source_stamp(path: str) -> Dict[str, int]:
+    p = os.path.join(path, MANIFEST_NAME) if os.path.isdir(path) else path
+    st = os.stat(p)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _cache_file(path: str, params: Dict[str, Any]) -> str:
+    key = json.dumps({"path": os.path.abspath(path), "params": params, "v": CACHE_VERSION}, sort_keys=True)
+    d = os.path.join(data_dir(), "cache", "analysis")
+    return os.path.join(d, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npz")
+
+
+def _load_cached(cache: str, stamp: Dict[str, int]) -> Optional[CaptureStats]:
+    try:
+        with np.load(cache, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("stamp") != stamp:
+                return None
+            s = CaptureStats(**{k: v for k, v in meta["stats"].items()})
+            for k in _ARRAYS:
+                setattr(s, k, z[k])
+            s.heat_origin = tuple(s.heat_origin)
+            return s
+    except (OSError, KeyError, ValueError, TypeError):
+        return None
+
+
+def _save_cached(cache: str, stamp: Dict[str, int], s: CaptureStats) -> None:
+    stats = {k: v for k, v in s.__dict__.items() if k not in _ARRAYS}
+    meta = json.dumps({"stamp": stamp, "stats": stats})
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        buf = io.BytesIO()
+        np.savez_compressed(buf, meta=np.array(meta), **{k: getattr(s, k) for k in _ARRAYS})
+        tmp = cache + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, cache)
+    except OSError:
+        pass
+
+
+def analyze(
+    path: str,
+    apm_window_s: int = 60,
+    cell_px: int = 16,
+    screen: Tuple[int, int, int, int] = (0, 0, 3840, 2160),
+    chunk_events: int = 1 << 20,
+    use_cache: bool = True,
+) -> CaptureStats:
+    """
+    Stats for a capture file or segmented session, computed in bounded-memory
+    chunks. Results are cached per file (size + mtime), so reopening is instant.
+    """
+    _require_numpy()
+    params = {"apm_window_s": apm_window_s, "cell_px": cell_px, "screen": list(screen)}
+    stamp = _source_stamp(path)
+    cache = _cache_file(path, params)
+    if use_cache:
+        hit = _load_cached(cache, stamp)
+        if hit is not None:
+            return hit
+
+    acc = _Accumulator(max(1, int(apm_window_s)), cell_px, screen)
+    chunks, names = iter_chunks(path, chunk_events)
+    for ev in chunks:
+        acc.add(ev)
+    stats = acc.result(names)
+    if use_cache:
+        _save_cached(cache, stamp, stats)
+    return stats
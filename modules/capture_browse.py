@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+from .capture_compress import codec_for
+from .capture_format import (
+    EV_CLICK, EV_KEY_PRESS, EV_KEY_RELEASE, EV_MOVE, EV_SCROLL, EVENT_TYPES,
+    HEADER_SIZE, RECORD_SIZE, REC_GAP, REC_KEYDEF, REC_KEYNAME,
+    BinaryDecoder, is_binary, parse_header, records_to_events,
+)
+
+if np is not None:
+    from .capture_format import RECORD_DTYPE
+
+# Rows are addressed through a sparse index: one entry per BLOCK_ROWS events
+# (file offset, time base, first event time). Only blocks that scroll into view
+# are decoded, and a few are kept in an LRU cache.
+BLOCK_ROWS = 1024
+CACHED_BLOCKS = 64
+_SCAN_BYTES = 4 * 1024 * 1024
+
+# Decoded row: (t seconds, event type, x, y, detail)
+Row = Tuple[float, int, int, int, str]
+Progress = Callable[[int, bool], None]  # (rows indexed so far, done)
+
+
+class BrowseCancelled(Exception):
+    pass
+
+
+class CaptureIndex:
+    """
+    Random access to the events of one uncompressed capture (binary or JSONL)
+    through an mmap, without loading the file.
+
+    build() scans the file once and can run on a worker thread: `rows` grows as
+    it goes and rows below it can be read at any time. A scan is a single
+    vectorized pass over the mapped bytes, so even very large files become
+    browsable block by block within milliseconds of opening.
+    """
+
+    def __init__(self, path: str) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed. Install requirements first.")
+        if codec_for(path):
+            raise ValueError("Compressed captures can't be browsed directly; decompress the file first.")
+        self.path = path
+        self.binary = is_binary(path)
+        self._fh = open(path, "rb")
+        self.size = os.fstat(self._fh.fileno()).st_size
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        if self.binary:
+            parse_header(self._mm[:HEADER_SIZE])
+
+        self.rows = 0          # events indexed so far (readable)
+        self.complete = False
+        self.names: List[str] = []  # binary: key/button names seen by the scan
+        self._offsets = array("q")  # per block: file offset of its first record/line
+        self._bases = array("q")    # per block: time the first delta counts from (binary)
+        self._t_first = array("q")  # per block: time of its first event
+        self._end = HEADER_SIZE if self.binary else 0  # scanned up to here
+        self._cache: "OrderedDict[int, List[Row]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def blocks(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> None:
+        self._cache.clear()
+        try:
+            if self._mm is not None:
+                self._mm.close()
+        except (BufferError, ValueError):
+            pass
+        self._fh.close()
+
+    # --------------------
+    # Scanning
+    # --------------------
+    def build(self, progress: Optional[Progress] = None, cancel: Optional[threading.Event] = None) -> None:
+        if self._mm is not None:
+            scan = self._scan_binary if self.binary else self._scan_jsonl
+            for _ in scan():
+                if cancel is not None and cancel.is_set():
+                    return
+                if progress is not None:
+                    progress(self.rows, False)
+        self.complete = True
+        if progress is not None:
+            progress(self.rows, True)
+
+    def _scan_binary(self):
+        mm, size = self._mm, self.size
+        dec = BinaryDecoder()
+        pos, t, row = HEADER_SIZE, 0, 0
+        per_chunk = _SCAN_BYTES // RECORD_SIZE
+        while pos + RECORD_SIZE <= size:
+            n = min(per_chunk, (size - pos) // RECORD_SIZE)
+            raw = np.frombuffer(mm, dtype=RECORD_DTYPE, count=n, offset=pos)
+            types = raw["type"]
+            names = (types == REC_KEYDEF) | (types == REC_KEYNAME)
+            for i in np.flatnonzero(names):
+                o = pos + int(i) * RECORD_SIZE
+                for _ in dec.decode(mm[o:o + RECORD_SIZE]):
+                    pass
+            dt = raw["dt"].astype(np.int64)
+            dt[types == REC_GAP] *= 1000
+            dt[names] = 0
+            cum = np.cumsum(dt)
+            cum += t
+            ev = np.flatnonzero(types < REC_GAP)
+            starts = ev[(-row) % BLOCK_ROWS::BLOCK_ROWS]
+            self.names = list(dec.names)
+            self._bases.extend((cum[starts] - dt[starts]).tolist())
+            self._t_first.extend(cum[starts].tolist())
+            self._offsets.extend((pos + starts * RECORD_SIZE).tolist())
+            row += len(ev)
+            t = int(cum[-1])
+            pos += n * RECORD_SIZE
+            self._end = pos
+            self.rows = row
+            yield
+
+    def _scan_jsonl(self):
+        mm, size = self._mm, self.size
+        pos, row = 0, 0
+        chunk = _SCAN_BYTES
+        while pos < size:
+            end = min(size, pos + chunk)
+            buf = np.frombuffer(mm, dtype=np.uint8, count=end - pos, offset=pos)
+            nl = np.flatnonzero(buf == 10)
+            if not len(nl):
+                if end == size:
+                    break  # trailing partial line (file still being written)
+                chunk *= 2
+                continue
+            chunk = _SCAN_BYTES
+            nl += pos
+            line_starts = np.concatenate([[pos], nl[:-1] + 1])
+            for s in line_starts[(-row) % BLOCK_ROWS::BLOCK_ROWS].tolist():
+                r = _parse_line(mm[s:mm.find(b"\n", s)])
+                self._offsets.append(s)
+                self._bases.append(0)
+                self._t_first.append(int(r[0] * 1e9) if r is not None else 0)
+            row += len(nl)
+            pos = int(nl[-1]) + 1
+            self._end = pos
+            self.rows = row
+            yield
+
+    # --------------------
+    # Rows
+    # --------------------
+    def _block_span(self, b: int) -> Tuple[int, int]:
+        end = self._offsets[b + 1] if b + 1 < len(self._offsets) else self._end
+        return self._offsets[b], end
+
+    def _decode_block(self, b: int) -> List[Row]:
+        start, end = self._block_span(b)
+        if self.binary:
+            ev = self._block_events(b)
+            names = self.names
+            out: List[Row] = []
+            for t, et, pressed, code, x, y, dx, dy in ev.tolist():
+                if et == EV_MOVE:
+                    detail = ""
+                elif et == EV_SCROLL:
+                    detail = f"{dx:+d}, {dy:+d}"
+                else:
+                    detail = names[code] if code < len(names) else f"<code {code}>"
+                    if et == EV_CLICK:
+                        detail += " down" if pressed else " up"
+                out.append((t / 1e9, et, x, y, detail))
+            return out
+        lines = self._mm[start:end].split(b"\n")
+        return [_parse_line(ln) or (0.0, -1, 0, 0, ln.decode("utf-8", "replace")) for ln in lines[:-1]]
+
+    def _block_events(self, b: int):
+        start, end = self._block_span(b)
+        raw = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=(end - start) // RECORD_SIZE, offset=start)
+        ev, _ = records_to_events(raw, self._bases[b])
+        return ev
+
+    def block(self, b: int) -> List[Row]:
+        with self._lock:
+            rows = self._cache.get(b)
+            if rows is not None:
+                self._cache.move_to_end(b)
+                return rows
+        rows = self._decode_block(b)
+        if not self.complete and b + 1 >= self.blocks:
+            return rows  # the last block still grows while the scan runs
+        with self._lock:
+            self._cache[b] = rows
+            while len(self._cache) > CACHED_BLOCKS:
+                self._cache.popitem(last=False)
+        return rows
+
+    def row(self, i: int) -> Row:
+        return self.block(i // BLOCK_ROWS)[i % BLOCK_ROWS]
+
+    def block_arrays(self, b: int):
+        """(types u1, t_ns i8) of block `b`, for filtering (bypasses the row cache)."""
+        if self.binary:
+            ev = self._block_events(b)
+            return ev["type"], ev["t_ns"]
+        rows = self._decode_block(b)
+        types = np.fromiter((r[1] for r in rows), dtype=np.int16, count=len(rows))
+        t = np.fromiter((int(r[0] * 1e9) for r in rows), dtype=np.int64, count=len(rows))
+        return types, t
+
+    # --------------------
+    # Filtering
+    # --------------------
+    def filter(self, t_start_s: Optional[float] = None, t_end_s: Optional[float] = None,
+               types: Sequence[int] = (), cancel: Optional[threading.Event] = None) -> "RowFilter":
+        """
+        Rows within [t_start_s, t_end_s) whose type is in `types` (empty = all).
+        Only blocks overlapping the time range are decoded; the result holds one
+        count per block plus a bitmask for partially matching blocks.
+        """
+        nb = self.blocks
+        t_first = np.array(self._t_first[:nb], dtype=np.int64)  # copy: the scan may still be appending
+        lo = -(1 << 62) if t_start_s is None else int(t_start_s * 1e9)
+        hi = (1 << 62) if t_end_s is None else int(t_end_s * 1e9)
+        b0 = max(0, int(np.searchsorted(t_first, lo, "right")) - 1)
+        b1 = int(np.searchsorted(t_first, hi, "left"))
+        want = np.array(sorted(set(types)), dtype=np.int16)
+
+        counts = np.zeros(nb, dtype=np.int64)
+        masks: Dict[int, "np.ndarray"] = {}
+        for b in range(b0, min(b1, nb)):
+            if cancel is not None and cancel.is_set():
+                raise BrowseCancelled()
+            et, t = self.block_arrays(b)
+            m = (t >= lo) & (t < hi)
+            if len(want):
+                m &= np.isin(et, want)
+            c = int(m.sum())
+            counts[b] = c
+            if c and c != len(m):
+                masks[b] = np.packbits(m)
+        return RowFilter(np.cumsum(counts), masks)
+
+
+class RowFilter:
+    """Maps filtered row numbers to file rows: per-block counts plus bitmasks."""
+
+    def __init__(self, cum: "np.ndarray", masks: Dict[int, "np.ndarray"]) -> None:
+        self._cum = cum
+        self._masks = masks
+        self.rows = int(cum[-1]) if len(cum) else 0
+        self._memo: Tuple[int, Optional["np.ndarray"]] = (-1, None)
+
+    def source_row(self, k: int) -> int:
+        b = int(np.searchsorted(self._cum, k, "right"))
+        within = k - (int(self._cum[b - 1]) if b else 0)
+        mask = self._masks.get(b)
+        if mask is None:
+            return b * BLOCK_ROWS + within
+        if self._memo[0] != b:
+            self._memo = (b, np.flatnonzero(np.unpackbits(mask)))
+        return b * BLOCK_ROWS + int(self._memo[1][within])
+
+
+def _parse_line(line: bytes) -> Optional[Row]:
+    try:
+        d = json.loads(line)
+        et = EVENT_TYPES[d.get("type", "")]
+    except (ValueError, KeyError, AttributeError):
+        return None
+    if et == EV_CLICK:
+        detail = f"{d.get('button', '')} {'down' if d.get('pressed') else 'up'}"
+    elif et == EV_SCROLL:
+        detail = f"{int(d.get('dx', 0)):+d}, {int(d.get('dy', 0)):+d}"
+    elif et in (EV_KEY_PRESS, EV_KEY_RELEASE):
+        detail = str(d.get("key", ""))
+    else:
+        detail = ""
+    return float(d.get("t", 0.0)), et, int(d.get("x", 0) or 0), int(d.get("y", 0) or 0), detail
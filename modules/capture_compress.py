@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Sequence
+
+# Optional: zstd is faster and tighter than gzip; gzip (stdlib) is the fallback.
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None
+
+GZIP_EXT = ".gz"
+ZSTD_EXT = ".zst"
+
+CODEC_EXT = {"gzip": GZIP_EXT, "zstd": ZSTD_EXT}
+
+
+def available_codecs() -> List[str]:
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def pick_codec(preference: str = "auto") -> str:
+    """Resolve "auto" / "zstd" / "gzip" / "none" to a codec that is actually usable ("" = none)."""
+    pref = (preference or "none").lower()
+    if pref in ("none", "off", ""):
+        return ""
+    if pref == "zstd" and zstandard is None:
+        return "gzip"
+    if pref == "auto":
+        return available_codecs()[0]
+    return pref if pref in CODEC_EXT else ""
+
+
+def codec_for(path: str) -> str:
+    if path.endswith(ZSTD_EXT):
+        return "zstd"
+    if path.endswith(GZIP_EXT):
+        return "gzip"
+    return ""
+
+
+@contextmanager
+def open_read(path: str, offset: int = 0) -> Iterator[BinaryIO]:
+    """
+    Uncompressed byte stream of a capture file, starting at `offset`.
+
+    For compressed files `offset` must be the start of a compressed block (as
+    recorded in the file's index); decompression starts there, not at the top.
+    """
+    codec = codec_for(path)
+    fh = open(path, "rb")
+    try:
+        fh.seek(offset)
+        if codec == "gzip":
+            with gzip.GzipFile(fileobj=fh, mode="rb") as gz:
+                yield gz
+        elif codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard is not installed; cannot read .zst captures.")
+            reader = zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True, closefd=False)
+            with io.BufferedReader(reader) as zs:
+                yield zs
+        else:
+            yield fh
+    finally:
+        fh.close()
+
+
+def _compress_block(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level if level > 0 else 3).compress(data)
+    return gzip.compress(data, compresslevel=level if level > 0 else 6, mtime=0)
+
+
+def compress_blocks(src: str, dst: str, codec: str, boundaries: Sequence[int], level: int = 0) -> List[int]:
+    """
+    Compress `src` into `dst` as a sequence of independent gzip members / zstd
+    frames, one per [boundaries[i], boundaries[i+1]) byte range (the last block
+    runs to EOF). Returns the compressed offset where each block starts, so an
+    index can point straight at a block and reading never has to start at the top.
+    """
+    size = os.path.getsize(src)
+    cuts = sorted({b for b in boundaries if 0 <= b < size} | {0})
+    out_offsets: List[int] = []
+    tmp = dst + ".tmp"
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        for i, start in enumerate(cuts):
+            end = cuts[i + 1] if i + 1 < len(cuts) else size
+            fin.seek(start)
+            out_offsets.append(fout.tell())
+            fout.write(_compress_block(fin.read(end - start), codec, level))
+    os.replace(tmp, dst)
+    return out_offsets
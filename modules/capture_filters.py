@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .capture_format import EVENT_NAMES, EVENT_TYPES, EV_CLICK, EV_KEY_PRESS, EV_KEY_RELEASE, RawEvent
+
+ACTIONS = ("drop", "keep", "sample")
+_KEY_TYPES = (EV_KEY_PRESS, EV_KEY_RELEASE)
+
+
+@dataclass
+class FilterRule:
+    """
+    One capture filter rule. Rules are tried in order and the first one that
+    matches an event decides: "drop" it, "keep" it, or "sample" (keep 1 in `every`).
+    Events no rule matches are kept.
+
+    Match criteria (all given ones must hold):
+      types:   event names ("mouse_move", "key_release", ...); empty = all
+      rect:    (x0, y0, x1, y1); pointer events inside it (or outside, with outside=True)
+      keys:    key/button names ("w", "Key.shift", "Button.left")
+    """
+
+    action: str = "drop"
+    types: Tuple[str, ...] = ()
+    rect: Optional[Tuple[int, int, int, int]] = None
+    outside: bool = False
+    keys: Tuple[str, ...] = ()
+    every: int = 1
+
+    def describe(self) -> str:
+        parts = [self.action, ",".join(self.types) or "*"]
+        if self.rect is not None:
+            parts += ["outside" if self.outside else "inside", ",".join(str(v) for v in self.rect)]
+        if self.keys:
+            parts += ["keys", ",".join(self.keys)]
+        if self.action == "sample":
+            parts.append(str(self.every))
+        return " ".join(parts)
+
+
+def parse_rule(line: str) -> FilterRule:
+    """
+    Parse one rule from the one-line form used in the UI, e.g.:
+        drop key_release
+        drop mouse_move outside 0,0,2560,1440
+        keep key_press,key_release keys w,a,s,d
+        sample mouse_scroll 4
+    """
+    tok = line.split()
+    if not tok or tok[0] not in ACTIONS:
+        raise ValueError(f"Rule must start with one of {', '.join(ACTIONS)}: {line!r}")
+    rule = FilterRule(action=tok[0])
+    i = 1
+    if i < len(tok) and tok[i] not in ("inside", "outside", "keys") and not tok[i].isdigit():
+        rule.types = tuple(t for t in tok[i].split(",") if t and t != "*")
+        for t in rule.types:
+            if t not in EVENT_TYPES:
+                raise ValueError(f"Unknown event type {t!r} in {line!r}")
+        i += 1
+    while i < len(tok):
+        word = tok[i]
+        if word in ("inside", "outside") and i + 1 < len(tok):
+            vals = [int(v) for v in tok[i + 1].split(",")]
+            if len(vals) != 4:
+                raise ValueError(f"Rectangle needs x0,y0,x1,y1: {line!r}")
+            rule.rect = (vals[0], vals[1], vals[2], vals[3])
+            rule.outside = word == "outside"
+            i += 2
+        elif word == "keys" and i + 1 < len(tok):
+            rule.keys = tuple(k for k in tok[i + 1].split(",") if k)
+            i += 2
+        elif word.isdigit() and rule.action == "sample":
+            rule.every = max(1, int(word))
+            i += 1
+        else:
+            raise ValueError(f"Unexpected {word!r} in {line!r}")
+    return rule
+
+
+def parse_rules(text: str) -> List[FilterRule]:
+    """One rule per line; blank lines and lines starting with # are ignored."""
+    return [parse_rule(ln) for ln in (ln.strip() for ln in text.splitlines()) if ln and not ln.startswith("#")]
+
+
+def key_name(key: Any) -> str:
+    """pynput Key/KeyCode/Button -> the name used in rules ("w", "Key.shift", "Button.left")."""
+    ch = getattr(key, "char", None)
+    return ch if ch else str(key)
+
+
+# --------------------
+# Compilation
+# --------------------
+Matcher = Callable[[RawEvent], bool]
+
+# Returned by _compile_match when a rule can never match an event type.
+_NEVER = object()
+
+
+def _compile_match(rule: FilterRule, etype: int):
+    """Specialised predicate for `rule` on events of `etype` (None = always matches, _NEVER = never)."""
+    checks: List[Matcher] = []
+
+    if rule.rect is not None:
+        if etype in _KEY_TYPES:
+            return _NEVER  # no position: a rect rule never matches key events
+        x0, y0, x1, y1 = rule.rect
+        if rule.outside:
+            checks.append(lambda ev: not (x0 <= ev[2] < x1 and y0 <= ev[3] < y1))
+        else:
+            checks.append(lambda ev: x0 <= ev[2] < x1 and y0 <= ev[3] < y1)
+
+    if rule.keys:
+        if etype not in _KEY_TYPES and etype != EV_CLICK:
+            return _NEVER
+        names = frozenset(rule.keys)
+        cache: Dict[Any, bool] = {}  # key object -> matches; pynput reuses key objects
+
+        def match_key(ev: RawEvent) -> bool:
+            k = ev[4]
+            try:
+                return cache[k]
+            except KeyError:
+                hit = cache[k] = key_name(k) in names or str(k) in names
+                return hit
+            except TypeError:
+                return key_name(k) in names
+
+        checks.append(match_key)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    a, b = checks
+    return lambda ev: a(ev) and b(ev)
+
+
+class CompiledFilter:
+    """
+    Rules compiled once into per-event-type chains of specialised predicates.
+
+    Call it with a raw event: True = keep. Types no rule mentions have no chain
+    and cost one tuple lookup. Per-rule hit counters are kept in `hits`.
+    """
+
+    def __init__(self, rules: Sequence[FilterRule]) -> None:
+        self.rules: List[FilterRule] = list(rules)
+        self.hits: List[int] = [0] * len(self.rules)
+        self.dropped = 0
+        self._sample_n: List[int] = [0] * len(self.rules)
+
+        chains: Dict[int, List[Tuple[Optional[Matcher], int, int, int]]] = {}
+        for etype in EVENT_NAMES:
+            name = EVENT_NAMES[etype]
+            chain = []
+            for i, rule in enumerate(self.rules):
+                if rule.action not in ACTIONS:
+                    raise ValueError(f"Unknown action {rule.action!r}")
+                if rule.types and name not in rule.types:
+                    continue
+                match = _compile_match(rule, etype)
+                if match is _NEVER:
+                    continue
+                chain.append((match, ACTIONS.index(rule.action), i, max(1, rule.every)))
+                if match is None and rule.action != "sample":
+                    break  # unconditional drop/keep: later rules are unreachable
+            chains[etype] = chain
+        self._chains: Tuple[Optional[list], ...] = tuple(chains.get(t) or None for t in range(max(EVENT_NAMES) + 1))
+
+    def __call__(self, ev: RawEvent) -> bool:
+        chain = self._chains[ev[0]]
+        if chain is None:
+            return True
+        for match, action, i, every in chain:
+            if match is not None and not match(ev):
+                continue
+            self.hits[i] += 1
+            if action == 0:  # drop
+                self.dropped += 1
+                return False
+            if action == 1:  # keep
+                return True
+            n = self._sample_n[i]
+            self._sample_n[i] = n + 1
+            if n % every:
+                self.dropped += 1
+                return False
+            return True
+        return True
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{"rule": r.describe(), "hits": h} for r, h in zip(self.rules, self.hits)]
+
+
+def compile_filters(rules: Sequence[FilterRule]) -> Optional[CompiledFilter]:
+    """CompiledFilter for `rules`, or None when there is nothing to filter."""
+    return CompiledFilter(rules) if rules else None
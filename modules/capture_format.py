@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import json
+import struct
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+from .capture_compress import codec_for, open_read
+
+
+# Raw event tuples pushed by the input hooks: (etype, t_ns, a, b, c, d)
+#   move:   a=x, b=y
+#   click:  a=x, b=y, c=button, d=pressed
+#   scroll: a=x, b=y, c=dx, d=dy
+#   key:    c=key
+RawEvent = Tuple[int, int, Any, Any, Any, Any]
+
+EV_MOVE = 0
+EV_CLICK = 1
+EV_SCROLL = 2
+EV_KEY_PRESS = 3
+EV_KEY_RELEASE = 4
+
+EVENT_NAMES = {
+    EV_MOVE: "mouse_move",
+    EV_CLICK: "mouse_click",
+    EV_SCROLL: "mouse_scroll",
+    EV_KEY_PRESS: "key_press",
+    EV_KEY_RELEASE: "key_release",
+}
+EVENT_TYPES = {v: k for k, v in EVENT_NAMES.items()}
+
+# --------------------
+# Binary layout
+# --------------------
+# Header: magic, version, record size, wall-clock start (time_ns), perf_counter_ns start.
+MAGIC = b"JVZCAP\x00\x01"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHqq4x")
+HEADER_SIZE = _HEADER.size  # 32
+
+# Record: type, flags, code, dt_ns, x, y, dx, dy (16 bytes, little-endian).
+_REC = struct.Struct("<BBHIhhhh")
+RECORD_SIZE = _REC.size
+
+# Meta records (never returned as events).
+REC_GAP = 0xF0       # dt holds a gap in microseconds (delta too large for u32 ns)
+REC_KEYDEF = 0xF1    # code = interned id, x = UTF-8 byte length of the name
+REC_KEYNAME = 0xF2   # continuation: 15 name bytes after the type byte
+
+FLAG_PRESSED = 0x01
+
+_U32 = 0xFFFFFFFF
+_NAME_CHUNK = RECORD_SIZE - 1
+
+BINARY_EXT = ".jcap"
+JSONL_EXT = ".jsonl"
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("type", "u1"), ("flags", "u1"), ("code", "<u2"), ("dt", "<u4"),
+        ("x", "<i2"), ("y", "<i2"), ("dx", "<i2"), ("dy", "<i2"),
+    ])
+    # What read_numpy() returns: absolute times, meta records removed.
+    EVENT_DTYPE = np.dtype([
+        ("t_ns", "<i8"), ("type", "u1"), ("pressed", "?"), ("code", "<u2"),
+        ("x", "<i2"), ("y", "<i2"), ("dx", "<i2"), ("dy", "<i2"),
+    ])
+
+
+def _i16(v: Any) -> int:
+    try:
+        v = int(v)
+    except (TypeError, ValueError):
+        return 0
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+# --------------------
+# Encoders (used by the recorder's writer thread)
+# --------------------
+class JsonlEncoder:
+    """One JSON object per line, relative float seconds (the original format)."""
+
+    binary = False
+    ext = JSONL_EXT
+
+    def __init__(self, start_ns: int) -> None:
+        self.start_ns = start_ns
+
+    def header(self) -> bytes:
+        return b""
+
+    def to_dict(self, ev: RawEvent) -> Dict[str, Any]:
+        etype, t_ns, a, b, c, d = ev
+        t = (t_ns - self.start_ns) / 1e9
+        if etype == EV_MOVE:
+            return {"t": t, "type": "mouse_move", "x": a, "y": b}
+        if etype == EV_CLICK:
+            return {"t": t, "type": "mouse_click", "x": a, "y": b, "button": str(c), "pressed": bool(d)}
+        if etype == EV_SCROLL:
+            return {"t": t, "type": "mouse_scroll", "x": a, "y": b, "dx": c, "dy": d}
+        if etype == EV_KEY_PRESS:
+            return {"t": t, "type": "key_press", "key": str(c)}
+        return {"t": t, "type": "key_release", "key": str(c)}
+
+    def encode(self, batch: Iterable[RawEvent]) -> bytes:
+        dumps = json.dumps
+        to_dict = self.to_dict
+        return "".join(dumps(to_dict(ev), ensure_ascii=False) + "\n" for ev in batch).encode("utf-8")
+
+
+def _keydef(code: int, name: str, out: List[bytes]) -> None:
+    raw = name.encode("utf-8")
+    out.append(_REC.pack(REC_KEYDEF, 0, code, 0, len(raw), 0, 0, 0))
+    for i in range(0, len(raw), _NAME_CHUNK):
+        out.append(bytes((REC_KEYNAME,)) + raw[i:i + _NAME_CHUNK].ljust(_NAME_CHUNK, b"\0"))
+
+
+class BinaryEncoder:
+    """
+    Fixed 16-byte records with integer nanosecond deltas.
+
+    Key and button names are interned: the first time a name is seen a KEYDEF
+    record (plus KEYNAME continuation records) assigns it a 16-bit code, and every
+    later event carries just the code.
+    """
+
+    binary = True
+    ext = BINARY_EXT
+
+    def __init__(self, start_ns: int, wall_ns: Optional[int] = None) -> None:
+        self.start_ns = start_ns
+        self.wall_ns = time.time_ns() if wall_ns is None else wall_ns
+        self._prev_ns = start_ns
+        self._codes: Dict[str, int] = {}
+        self._obj_codes: Dict[Any, int] = {}
+        self.names: List[str] = []
+
+    def header(self) -> bytes:
+        return _HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self.wall_ns, self.start_ns)
+
+    @property
+    def t_ns(self) -> int:
+        """Session time the next record's delta is measured from."""
+        return self._prev_ns - self.start_ns
+
+    def name_records(self) -> bytes:
+        """KEYDEF/KEYNAME records for every name interned so far."""
+        out: List[bytes] = []
+        for code, name in enumerate(self.names):
+            _keydef(code, name, out)
+        return b"".join(out)
+
+    def _intern(self, obj: Any, out: List[bytes]) -> int:
+        try:
+            return self._obj_codes[obj]
+        except (KeyError, TypeError):
+            pass
+        name = str(obj)
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            if code > 0xFFFF:
+                code = 0xFFFF  # table full; share the last slot
+            else:
+                self._codes[name] = code
+                self.names.append(name)
+                _keydef(code, name, out)
+        try:
+            self._obj_codes[obj] = code
+        except TypeError:
+            pass
+        return code
+
+    def encode(self, batch: Iterable[RawEvent]) -> bytes:
+        pack = _REC.pack
+        out: List[bytes] = []
+        prev = self._prev_ns
+        for etype, t_ns, a, b, c, d in batch:
+            dt = t_ns - prev
+            if dt < 0:
+                dt = 0
+            else:
+                prev = t_ns
+            if dt > _U32:
+                us = dt // 1000
+                dt -= us * 1000
+                while us > 0:
+                    step = us if us < _U32 else _U32
+                    out.append(pack(REC_GAP, 0, 0, step, 0, 0, 0, 0))
+                    us -= step
+
+            if etype == EV_MOVE:
+                out.append(pack(EV_MOVE, 0, 0, dt, _i16(a), _i16(b), 0, 0))
+            elif etype == EV_CLICK:
+                code = self._intern(c, out)
+                out.append(pack(EV_CLICK, FLAG_PRESSED if d else 0, code, dt, _i16(a), _i16(b), 0, 0))
+            elif etype == EV_SCROLL:
+                out.append(pack(EV_SCROLL, 0, 0, dt, _i16(a), _i16(b), _i16(c), _i16(d)))
+            else:
+                code = self._intern(c, out)
+                out.append(pack(etype, 0, code, dt, 0, 0, 0, 0))
+        self._prev_ns = prev
+        return b"".join(out)
+
+
+def make_encoder(fmt: str, start_ns: int):
+    return BinaryEncoder(start_ns) if fmt == "binary" else JsonlEncoder(start_ns)
+
+
+# --------------------
+# Readers
+# --------------------
+def is_binary(path: str) -> bool:
+    with open_read(path) as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(path: str) -> Dict[str, int]:
+    with open_read(path) as f:
+        return parse_header(f.read(HEADER_SIZE))
+
+
+def parse_header(raw: bytes) -> Dict[str, int]:
+    if len(raw) < HEADER_SIZE:
+        raise ValueError("Not a JARVIZ binary capture (file too short).")
+    magic, version, rec_size, wall_ns, start_ns = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError("Not a JARVIZ binary capture (bad magic).")
+    if rec_size != RECORD_SIZE:
+        raise ValueError(f"Unsupported record size {rec_size}.")
+    return {"version": version, "wall_ns": wall_ns, "start_ns": start_ns}
+
+
+class BinaryDecoder:
+    """Turns a stream of binary records back into JSONL-shaped dicts."""
+
+    def __init__(self, names: Optional[List[str]] = None, t_ns: int = 0) -> None:
+        self.names: List[str] = list(names or [])
+        self.t_ns = t_ns  # time since session start of the last decoded record
+        self._def: Optional[Tuple[int, int]] = None  # (code, byte length) being assembled
+        self._buf = b""
+
+    def _name(self, code: int) -> str:
+        return self.names[code] if code < len(self.names) else f"<code {code}>"
+
+    def decode(self, data: bytes) -> Iterator[Dict[str, Any]]:
+        unpack = _REC.unpack_from
+        for off in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            etype = data[off]
+            if etype == REC_KEYNAME:
+                if self._def is not None:
+                    self._buf += data[off + 1:off + RECORD_SIZE]
+                    code, n = self._def
+                    if len(self._buf) >= n:
+                        while len(self.names) <= code:
+                            self.names.append("")
+                        self.names[code] = self._buf[:n].decode("utf-8", "replace")
+                        self._def, self._buf = None, b""
+                continue
+
+            _, flags, code, dt, x, y, dx, dy = unpack(data, off)
+            if etype == REC_GAP:
+                self.t_ns += dt * 1000
+                continue
+            if etype == REC_KEYDEF:
+                self._def, self._buf = (code, x), b""
+                continue
+
+            self.t_ns += dt
+            t = self.t_ns / 1e9
+            if etype == EV_MOVE:
+                yield {"t": t, "type": "mouse_move", "x": x, "y": y}
+            elif etype == EV_CLICK:
+                yield {"t": t, "type": "mouse_click", "x": x, "y": y, "button": self._name(code), "pressed": bool(flags & FLAG_PRESSED)}
+            elif etype == EV_SCROLL:
+                yield {"t": t, "type": "mouse_scroll", "x": x, "y": y, "dx": dx, "dy": dy}
+            elif etype in (EV_KEY_PRESS, EV_KEY_RELEASE):
+                yield {"t": t, "type": EVENT_NAMES[etype], "key": self._name(code)}
+
+
+def iter_binary(path: str, chunk_records: int = 65536) -> Iterator[Dict[str, Any]]:
+    read_header(path)
+    dec = BinaryDecoder()
+    with open_read(path) as f:
+        f.read(HEADER_SIZE)
+        while True:
+            data = f.read(RECORD_SIZE * chunk_records)
+            if not data:
+                return
+            usable = len(data) - len(data) % RECORD_SIZE
+            yield from dec.decode(data[:usable])
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open_read(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Events from a capture in either format, as JSONL-shaped dicts."""
+    return iter_binary(path) if is_binary(path) else iter_jsonl(path)
+
+
+def read_numpy(path: str):
+    """
+    Load a binary capture as a NumPy structured array (EVENT_DTYPE) plus the key
+    name table, in a handful of vectorized passes.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed. Install requirements first.")
+    read_header(path)
+    if codec_for(path):
+        with open_read(path) as f:
+            data = f.read()[HEADER_SIZE:]
+        raw = np.frombuffer(data[:len(data) - len(data) % RECORD_SIZE], dtype=RECORD_DTYPE)
+    else:
+        raw = np.fromfile(path, dtype=RECORD_DTYPE, offset=HEADER_SIZE)
+
+    names = _names_from_records(raw)
+    out, _ = records_to_events(raw)
+    return out, names
+
+
+def records_to_events(raw, t0_ns: int = 0):
+    """
+    RECORD_DTYPE records -> (EVENT_DTYPE events, time of the last record).
+    `t0_ns` is the session time before the first record, for chunked reads.
+    """
+    types = raw["type"]
+    dt = raw["dt"].astype(np.int64)
+    dt[types == REC_GAP] *= 1000
+    dt[(types == REC_KEYDEF) | (types == REC_KEYNAME)] = 0
+    t_ns = np.cumsum(dt)
+    t_ns += t0_ns
+
+    keep = types < REC_GAP
+    sel = raw[keep]
+    out = np.empty(len(sel), dtype=EVENT_DTYPE)
+    out["t_ns"] = t_ns[keep]
+    out["type"] = sel["type"]
+    out["pressed"] = (sel["flags"] & FLAG_PRESSED) != 0
+    for f in ("code", "x", "y", "dx", "dy"):
+        out[f] = sel[f]
+    return out, int(t_ns[-1]) if len(t_ns) else t0_ns
+
+
+def _names_from_records(raw) -> List[str]:
+    names: List[str] = []
+    defs = np.flatnonzero(raw["type"] == REC_KEYDEF)
+    if not len(defs):
+        return names
+    as_bytes = raw.view(np.uint8).reshape(-1, RECORD_SIZE)
+    for i in defs:
+        code, n = int(raw["code"][i]), int(raw["x"][i])
+        k = -(-n // _NAME_CHUNK)
+        body = as_bytes[i + 1:i + 1 + k, 1:].tobytes()[:n]
+        while len(names) <= code:
+            names.append("")
+        names[code] = body.decode("utf-8", "replace")
+    return names
+
+
+# --------------------
+# Converters
+# --------------------
+def _dict_to_raw(ev: Dict[str, Any]) -> Optional[RawEvent]:
+    etype = EVENT_TYPES.get(ev.get("type", ""))
+    if etype is None:
+        return None
+    t_ns = int(round(float(ev.get("t", 0.0)) * 1e9))
+    if etype == EV_MOVE:
+        return (etype, t_ns, ev.get("x", 0), ev.get("y", 0), None, None)
+    if etype == EV_CLICK:
+        return (etype, t_ns, ev.get("x", 0), ev.get("y", 0), ev.get("button", ""), ev.get("pressed", False))
+    if etype == EV_SCROLL:
+        return (etype, t_ns, ev.get("x", 0), ev.get("y", 0), ev.get("dx", 0), ev.get("dy", 0))
+    return (etype, t_ns, None, None, ev.get("key", ""), None)
+
+
+def jsonl_to_binary(src: str, dst: str, batch: int = 65536) -> int:
+    enc = BinaryEncoder(start_ns=0)
+    n = 0
+    buf: List[RawEvent] = []
+    with open(dst, "wb") as f:
+        f.write(enc.header())
+        for ev in iter_jsonl(src):
+            raw = _dict_to_raw(ev)
+            if raw is None:
+                continue
+            buf.append(raw)
+            if len(buf) >= batch:
+                f.write(enc.encode(buf))
+                n += len(buf)
+                buf = []
+        if buf:
+            f.write(enc.encode(buf))
+            n += len(buf)
+    return n
+
+
+def binary_to_jsonl(src: str, dst: str) -> int:
+    n = 0
+    with open(dst, "w", encoding="utf-8") as f:
+        for ev in iter_binary(src):
+            f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            n += 1
+    return n
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .capture_format import (
+    HEADER_SIZE, RECORD_SIZE, REC_GAP, REC_KEYDEF, REC_KEYNAME, _REC,
+    BinaryDecoder, is_binary, read_header,
+)
+from .capture_compress import codec_for, open_read
+
+# Sidecar files next to a capture:
+#   <capture>.idx   fixed-width checkpoints (t_ns, byte offset), appended while recording
+#   <capture>.keys  binary captures only: interned key/button names, one JSON string per line
+#
+# Offsets are byte positions in the file as stored. For compressed segments
+# (capture_segments) they point at the start of an independently compressed block.
+# Offset 0 always means "top of the file", where a binary header still has to be skipped.
+#
+# A checkpoint (t_ns, offset) promises that every event stored before `offset`
+# happened at or before `t_ns` (nanoseconds since session start). Seeking to T
+# therefore starts at the last checkpoint with t_ns < T and skips nothing that matters.
+IDX_EXT = ".idx"
+KEYS_EXT = ".keys"
+
+IDX_MAGIC = b"JVZIDX\x00\x01"
+IDX_VERSION = 1
+_IDX_HEADER = struct.Struct("<8sHHIq")  # magic, version, entry size, format, interval_ns
+_IDX_ENTRY = struct.Struct("<qQ")       # t_ns, offset
+
+FMT_JSONL = 0
+FMT_BINARY = 1
+
+
+def index_path(capture_path: str) -> str:
+    return capture_path + IDX_EXT
+
+
+def keys_path(capture_path: str) -> str:
+    return capture_path + KEYS_EXT
+
+
+# --------------------
+# Writing
+# --------------------
+class IndexWriter:
+    """Appends checkpoints (and, for binary captures, new key names) while recording."""
+
+    def __init__(self, capture_path: str, binary: bool, interval_ms: int = 1000, path: Optional[str] = None,
+                 write_keys: bool = True) -> None:
+        self.binary = binary
+        self.interval_ns = max(1, int(interval_ms)) * 1_000_000
+        self.checkpoints = 0
+        self._last_t: Optional[int] = None
+        self._names = 0
+
+        self._fh = open(path or index_path(capture_path), "wb")
+        self._fh.write(_IDX_HEADER.pack(IDX_MAGIC, IDX_VERSION, _IDX_ENTRY.size,
+                                        FMT_BINARY if binary else FMT_JSONL, self.interval_ns))
+        self._keys = open(keys_path(capture_path), "w", encoding="utf-8") if binary and write_keys else None
+
+    def checkpoint(self, t_ns: int, offset: int) -> None:
+        self._fh.write(_IDX_ENTRY.pack(t_ns, offset))
+        self._last_t = t_ns
+        self.checkpoints += 1
+
+    def maybe_checkpoint(self, t_ns: int, offset: int) -> bool:
+        if self._last_t is not None and t_ns - self._last_t < self.interval_ns:
+            return False
+        self.checkpoint(t_ns, offset)
+        return True
+
+    def add_names(self, names: List[str]) -> None:
+        """Record names interned so far; only the ones not yet written are appended."""
+        if self._keys is None or len(names) <= self._names:
+            return
+        for name in names[self._names:]:
+            self._keys.write(json.dumps(name, ensure_ascii=False) + "\n")
+        self._names = len(names)
+
+    def flush(self) -> None:
+        self._fh.flush()
+        if self._keys is not None:
+            self._keys.flush()
+
+    def close(self) -> None:
+        for fh in (self._fh, self._keys):
+            if fh is not None:
+                try:
+                    fh.close()
+                except Exception:
+                    pass
+
+
+def build_index(capture_path: str, interval_ms: int = 1000) -> int:
+    """
+    (Re)build the sidecar index of an existing capture by scanning it once.
+
+    For captures recorded before indexing existed, or whose index was lost.
+    Written to a temp file and swapped in, so a live reader never sees half of it.
+    Returns the number of checkpoints.
+    """
+    if codec_for(capture_path):
+        raise ValueError("Compressed segments are indexed when they are compressed; cannot rebuild.")
+    binary = is_binary(capture_path)
+    tmp = index_path(capture_path) + ".tmp"
+    w = IndexWriter(capture_path, binary, interval_ms, path=tmp)
+    try:
+        if binary:
+            names = _scan_binary(capture_path, w)
+            w.add_names(names)
+        else:
+            _scan_jsonl(capture_path, w)
+    finally:
+        w.close()
+    os.replace(tmp, index_path(capture_path))
+    return w.checkpoints
+
+
+def read_checkpoints(capture_path: str) -> List[Tuple[int, int]]:
+    """All (t_ns, offset) checkpoints of a capture's index ([] when it has none)."""
+    try:
+        with open(index_path(capture_path), "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if len(data) < _IDX_HEADER.size or data[:len(IDX_MAGIC)] != IDX_MAGIC:
+        return []
+    n = (len(data) - _IDX_HEADER.size) // _IDX_ENTRY.size
+    return [_IDX_ENTRY.unpack_from(data, _IDX_HEADER.size + i * _IDX_ENTRY.size) for i in range(n)]
+
+
+def write_index(capture_path: str, binary: bool, checkpoints: List[Tuple[int, int]], interval_ms: int = 1000) -> None:
+    """Write a complete index for `capture_path` (atomically), e.g. after compressing it."""
+    tmp = index_path(capture_path) + ".tmp"
+    w = IndexWriter(capture_path, binary, interval_ms, path=tmp, write_keys=False)
+    try:
+        for t_ns, offset in checkpoints:
+            w.checkpoint(t_ns, offset)
+    finally:
+        w.close()
+    os.replace(tmp, index_path(capture_path))
+
+
+def _scan_binary(path: str, w: IndexWriter, chunk_records: int = 65536) -> List[str]:
+    read_header(path)
+    dec = BinaryDecoder()  # only fed meta records, to assemble the name table
+    unpack = _REC.unpack_from
+    t = 0
+    offset = HEADER_SIZE
+    w.checkpoint(0, offset)
+    with open(path, "rb") as f:
+        f.seek(HEADER_SIZE)
+        while True:
+            data = f.read(RECORD_SIZE * chunk_records)
+            usable = len(data) - len(data) % RECORD_SIZE
+            if not usable:
+                break
+            for off in range(0, usable, RECORD_SIZE):
+                etype = data[off]
+                if etype == REC_KEYDEF or etype == REC_KEYNAME:
+                    for _ in dec.decode(data[off:off + RECORD_SIZE]):
+                        pass
+                    continue
+                dt = unpack(data, off)[3]
+                if etype == REC_GAP:
+                    t += dt * 1000
+                    continue
+                # Checkpoints only ever land on event records, never inside a KEYDEF run.
+                w.maybe_checkpoint(t, offset + off)
+                t += dt
+            offset += usable
+    return dec.names
+
+
+def _scan_jsonl(path: str, w: IndexWriter) -> None:
+    t = 0
+    offset = 0
+    w.checkpoint(0, 0)
+    with open(path, "rb") as f:
+        for line in f:
+            ev_t = _line_t_ns(line)
+            if ev_t is not None:
+                w.maybe_checkpoint(t, offset)
+                t = max(t, ev_t)
+            offset += len(line)
+
+
+def _line_t_ns(line: bytes) -> Optional[int]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return int(round(float(json.loads(line).get("t", 0.0)) * 1e9))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+# --------------------
+# Reading
+# --------------------
+class _CheckpointTimes:
+    """Sequence view of checkpoint times inside the mapped index (for bisect)."""
+
+    def __init__(self, mm: mmap.mmap, count: int) -> None:
+        self._mm = mm
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return _IDX_ENTRY.unpack_from(self._mm, _IDX_HEADER.size + i * _IDX_ENTRY.size)[0]
+
+
+class CaptureReader:
+    """
+    Random access into a capture (JSONL or binary) by session time.
+
+    With a sidecar index the file is positioned with a binary search over the
+    memory-mapped checkpoints, then only the requested window is read and decoded.
+    Without one (old captures; see build_index) it falls back to scanning from the start.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.binary = is_binary(path)
+        if self.binary:
+            read_header(path)
+        self.names: List[str] = _read_keys(path) if self.binary else []
+
+        self._idx_fh = None
+        self._mm: Optional[mmap.mmap] = None
+        self._times: Optional[_CheckpointTimes] = None
+        self._open_index()
+
+    def _open_index(self) -> None:
+        path = index_path(self.path)
+        try:
+            fh = open(path, "rb")
+        except OSError:
+            return
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            fh.close()
+            return
+        ok = False
+        if len(mm) >= _IDX_HEADER.size:
+            magic, version, entry, fmt, _ = _IDX_HEADER.unpack_from(mm, 0)
+            want = FMT_BINARY if self.binary else FMT_JSONL
+            ok = magic == IDX_MAGIC and entry == _IDX_ENTRY.size and fmt == want
+        if not ok:
+            mm.close()
+            fh.close()
+            return
+        # A trailing partial entry (crash mid-write) is ignored.
+        count = (len(mm) - _IDX_HEADER.size) // _IDX_ENTRY.size
+        self._idx_fh, self._mm = fh, mm
+        self._times = _CheckpointTimes(mm, count)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._idx_fh is not None:
+            self._idx_fh.close()
+            self._idx_fh = None
+        self._times = None
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def indexed(self) -> bool:
+        return self._times is not None and len(self._times) > 0
+
+    @property
+    def checkpoints(self) -> int:
+        return len(self._times) if self._times is not None else 0
+
+    def checkpoint(self, i: int) -> Tuple[int, int]:
+        """(t_ns, offset) of checkpoint `i`."""
+        if self._times is None:
+            raise IndexError("capture has no index")
+        if not 0 <= i < len(self._times):
+            raise IndexError(i)
+        return _IDX_ENTRY.unpack_from(self._mm, _IDX_HEADER.size + i * _IDX_ENTRY.size)
+
+    def seek(self, t_s: float) -> Tuple[int, int]:
+        """
+        (offset, t_ns) to start reading from so that no event at or after `t_s`
+        seconds is missed. O(log n) in the number of checkpoints.
+        """
+        t_ns = int(t_s * 1e9)
+        if not self.indexed or t_ns <= 0:
+            return 0, 0
+        i = bisect_left(self._times, t_ns) - 1
+        if i < 0:
+            return 0, 0
+        t, offset = self.checkpoint(i)
+        return offset, t
+
+    def events(self, start_s: Optional[float] = None, end_s: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Events with start_s <= t < end_s (either bound optional), streamed in file order."""
+        offset, t_ns = self.seek(start_s) if start_s is not None else (0, 0)
+        raw = self._iter_binary(offset, t_ns) if self.binary else self._iter_jsonl(offset)
+        for ev in raw:
+            t = ev.get("t", 0.0)
+            if end_s is not None and t >= end_s:
+                return
+            if start_s is not None and t < start_s:
+                continue
+            yield ev
+
+    def _iter_binary(self, offset: int, t_ns: int, chunk_records: int = 16384) -> Iterator[Dict[str, Any]]:
+        dec = BinaryDecoder(self.names, t_ns=t_ns)
+        with open_read(self.path, offset) as f:
+            if offset == 0:
+                f.read(HEADER_SIZE)
+            while True:
+                data = f.read(RECORD_SIZE * chunk_records)
+                usable = len(data) - len(data) % RECORD_SIZE
+                if not usable:
+                    return
+                yield from dec.decode(data[:usable])
+
+    def _iter_jsonl(self, offset: int) -> Iterator[Dict[str, Any]]:
+        with open_read(self.path, offset) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _read_keys(capture_path: str) -> List[str]:
+    names: List[str] = []
+    try:
+        with open(keys_path(capture_path), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    names.append(str(json.loads(line)))
+                except ValueError:
+                    break
+    except OSError:
+        pass
+    return names
+
+
+def read_window(path: str, start_s: Optional[float] = None, end_s: Optional[float] = None) -> List[Dict[str, Any]]:
+    """One-shot helper: list of events in [start_s, end_s)."""
+    with CaptureReader(path) as r:
+        return list(r.events(start_s, end_s))
@@ -1,17 +1,11 @@
 from __future__ import annotations
 
-import json
 import os
 import threading
 import time
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
-
-# Optional (Windows) foreground window checks.
-try:
-    import win32gui  # type: ignore
-except Exception:  # pragma: no cover
-    win32gui = None
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Deque, List
 
 # Input capture (cross-platform). On Windows this is what you want.
 try:
@@ -20,13 +14,48 @@ except Exception:  # pragma: no cover
     mouse = None
     keyboard = None
 
+from .capture_format import (
+    RawEvent, EV_MOVE, EV_CLICK, EV_SCROLL, EV_KEY_PRESS, EV_KEY_RELEASE, make_encoder,
+)
+from .capture_index import IndexWriter
+from .capture_compress import pick_codec
+from .capture_segments import SegmentSession
+from .capture_filters import CompiledFilter, FilterRule, compile_filters
+from .capture_simplify import PathSimplifier
+from .capture_stats import RollingStats
+from .capture_stream import StreamServer
+from .foreground import ForegroundProvider, default_provider
+
 
 @dataclass
 class CaptureConfig:
     target_window_substring: str = "Diablo IV"
-    mode: str = "event"  # "event" or "fixed"
+    mode: str = "event"  # "event", "fixed" or "adaptive"
     fixed_rate_ms: int = 25
+    tolerance_px: float = 2.0  # adaptive mode: max path deviation of dropped moves
     output_path: str = ""
+    format: str = "jsonl"  # "jsonl" or "binary" (see capture_format)
+    queue_max: int = 262144       # raw events buffered before hooks start dropping
+    batch_size: int = 4096        # wake the writer early once this many are queued
+    flush_interval_ms: int = 100  # group-commit interval
+    index_interval_ms: int = 1000  # sidecar time index checkpoint spacing (0 = no index)
+    segment_max_mb: int = 0       # segmented mode: roll over at this size...
+    segment_max_s: int = 0        # ...or after this many seconds (both 0 = one file)
+    compress: str = "auto"        # closed segments: "auto" | "zstd" | "gzip" | "none"
+    max_segments: int = 0         # keep only the newest N segments on disk (0 = all)
+    filters: List[FilterRule] = field(default_factory=list)  # applied in the hooks, before queueing
+    stream: bool = False          # also fan events out live to local subscribers (capture_stream)
+    stream_port: int = 0          # 0 = any free port (advertised in capture_stream.json)
+
+
+def _unused_path(path: str) -> str:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return path
+    base, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{base}-{n}{ext}"):
+        n += 1
+    return f"{base}-{n}{ext}"
 
 
 class CaptureRecorder:
@@ -34,30 +63,79 @@ class CaptureRecorder:
     Safe-ish recorder:
       - Only records while user explicitly starts it
       - By default only records while the target window is the foreground window (Windows)
-      - No playback, only event logging to JSONL
+      - No playback, only event logging (JSONL or the compact binary format)
+
+    Input hooks only append a raw tuple to an unbounded-by-lock deque (capped at
+    cfg.queue_max, counting drops beyond it). A writer thread drains it in
+    batches, serializes and flushes once per batch, so disk I/O never runs on the
+    hook threads.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, foreground: Optional[ForegroundProvider] = None) -> None:
         self._lock = threading.RLock()
         self._running = False
         self._paused = False
-        self._thread: Optional[threading.Thread] = None
         self._cfg = CaptureConfig()
-        self._start_t = 0.0
+
+        # Foreground gate: the provider calls back on focus changes; hooks only read _paused.
+        self._fg = foreground if foreground is not None else default_provider()
+        self._target = ""
+        self._fg_title = ""
+        self._gate_flips = 0
 
         self._mouse_listener = None
         self._kbd_listener = None
 
         self._events_written = 0
         self._last_move_t = 0.0
+        self._last_error = ""  # last write failure (the batch is counted as dropped)
+
+        # Adaptive mode: moves go through the simplifier. Its lock is only taken in
+        # that mode, and keeps kept moves ordered with the events around them.
+        self._path = PathSimplifier()
+        self._path_lock = threading.Lock()
+        self._moves_seen = 0
+        self._moves_kept = 0
+
+        self._filter: Optional[CompiledFilter] = None
+
+        # Rolling rates/mix/latency, updated by the writer thread, read lock-free.
+        self._stats = RollingStats()
+
+        # Live fan-out to local subscribers (None = not streaming)
+        self._stream: Optional[StreamServer] = None
 
         self._fh = None
 
+        # Hook -> writer hand-off. deque.append/popleft are atomic, so hooks never
+        # take self._lock.
+        self._queue: Deque[RawEvent] = deque()
+        self._queue_max = 0
+        self._batch_size = 0
+        self._dropped = 0
+        self._batches = 0
+        self._last_batch = 0
+        self._writer_wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._start_ns = 0
+        self._encoder = None
+        self._bytes_written = 0
+        self._index: Optional[IndexWriter] = None
+        self._offset = 0
+        self._last_t_ns = 0
+
+        # Segmented output (None = one file for the whole session)
+        self._session: Optional[SegmentSession] = None
+        self._seg_path = ""
+        self._seg_opened = 0.0
+        self._seg_events = 0
+        self._seg_bytes = 0
+
     def available(self) -> bool:
         return mouse is not None and keyboard is not None
 
     def supports_foreground_gate(self) -> bool:
-        return win32gui is not None
+        return self._fg is not None and self._fg.available()
 
     def status(self) -> Dict[str, Any]:
         with self._lock:
@@ -65,15 +143,45 @@ class CaptureRecorder:
                 "running": self._running,
                 "paused": self._paused,
                 "events_written": self._events_written,
+                "queue_depth": len(self._queue),
+                "dropped": self._dropped,
+                "error": self._last_error,
+                "batches": self._batches,
+                "last_batch": self._last_batch,
                 "target_window_substring": self._cfg.target_window_substring,
                 "mode": self._cfg.mode,
+                "moves_seen": self._moves_seen,
+                "moves_kept": self._moves_kept,
+                "move_ratio": self._moves_seen / self._moves_kept if self._moves_kept else 1.0,
+                "filtered": self._filter.dropped if self._filter is not None else 0,
+                "filters": self._filter.stats() if self._filter is not None else [],
                 "fixed_rate_ms": self._cfg.fixed_rate_ms,
                 "output_path": self._cfg.output_path,
+                "format": self._cfg.format,
+                "bytes_written": self._bytes_written,
+                "index_checkpoints": self._index.checkpoints if self._index is not None else 0,
+                "segments": self._session.status()["segments"] if self._session is not None else 0,
+                "compressing": self._session.status()["compressing"] if self._session is not None else 0,
                 "foreground_gate": self.supports_foreground_gate(),
+                "foreground_provider": self._fg.name if self._fg is not None else "none",
+                "foreground_title": self._fg_title,
+                "gate_flips": self._gate_flips,
+                "stream": self._stream.status() if self._stream is not None else {},
             }
 
-    def start(self, cfg: CaptureConfig) -> None:
-        if not self.available():
+    def live_stats(self) -> Dict[str, Any]:
+        """
+        Rolling events/s, APM, event mix and hook-to-write latency percentiles over
+        the last minute. Does not take the recorder lock; cheap enough for a GUI timer.
+        """
+        return self._stats.snapshot()
+
+    def start(self, cfg: CaptureConfig, listen: bool = True) -> None:
+        """
+        Begin a session. With listen=False no input hooks are installed and the
+        caller drives the _on_* callbacks itself (synthetic load, replays).
+        """
+        if listen and not self.available():
             raise RuntimeError("pynput is not available. Install requirements first.")
 
         with self._lock:
@@ -81,13 +189,60 @@ class CaptureRecorder:
                 return
             self._cfg = cfg
             os.makedirs(os.path.dirname(cfg.output_path), exist_ok=True)
-            self._fh = open(cfg.output_path, "a", encoding="utf-8")
+            self._start_ns = time.perf_counter_ns()
+            self._last_t_ns = self._start_ns
+            self._encoder = make_encoder(cfg.format, self._start_ns)
+            self._session = None
+            if cfg.segment_max_mb > 0 or cfg.segment_max_s > 0:
+                self._session = SegmentSession(
+                    cfg.output_path, self._encoder.ext, cfg.format,
+                    codec=pick_codec(cfg.compress),
+                    max_segments=cfg.max_segments,
+                    index_interval_ms=cfg.index_interval_ms or 1000,
+                )
+                cfg.output_path = self._session.manifest_path
+                self._open_segment(self._session.next_segment_path())
+            else:
+                if self._encoder.binary or cfg.index_interval_ms > 0:
+                    # Binary captures carry one time base/key table per file, and an index
+                    # describes a single session; never append in either case.
+                    cfg.output_path = _unused_path(cfg.output_path)
+                self._open_segment(cfg.output_path)
+            self._bytes_written = 0
             self._events_written = 0
-            self._start_t = time.perf_counter()
             self._last_move_t = 0.0
+            self._path = PathSimplifier(cfg.tolerance_px)
+            self._filter = compile_filters(cfg.filters)
+            self._moves_seen = 0
+            self._moves_kept = 0
+            self._queue = deque()
+            self._queue_max = max(1, int(cfg.queue_max))
+            self._batch_size = max(1, int(cfg.batch_size))
+            self._dropped = 0
+            self._last_error = ""
+            self._batches = 0
+            self._last_batch = 0
+            self._stats.reset()
+            self._writer_wake.clear()
+            self._stream = None
+            if cfg.stream:
+                try:
+                    self._stream = StreamServer(self._start_ns, port=cfg.stream_port)
+                    self._stream.start()
+                except OSError:
+                    self._stream = None
             self._running = True
             self._paused = False
 
+        self._writer = threading.Thread(target=self._writer_loop, name="capture-writer", daemon=True)
+        self._writer.start()
+
+        self._start_gate()
+        if not listen:
+            self._mouse_listener = None
+            self._kbd_listener = None
+            return
+
         # Start listeners
         self._mouse_listener = mouse.Listener(
             on_move=self._on_move,
@@ -102,15 +257,18 @@ class CaptureRecorder:
         self._mouse_listener.start()
         self._kbd_listener.start()
 
-        self._thread = threading.Thread(target=self._gate_loop, daemon=True)
-        self._thread.start()
 
     def stop(self) -> None:
         with self._lock:
             if not self._running:
                 return
+            # Keep the last point of an in-progress stroke before hooks stop pushing.
+            with self._path_lock:
+                self._keep_held(self._path.flush())
             self._running = False
 
+        self._stop_gate()
+
         try:
             if self._mouse_listener is not None:
                 self._mouse_listener.stop()
@@ -123,87 +281,263 @@ class CaptureRecorder:
         except Exception:
             pass
 
+        # The writer drains whatever is still queued, then exits.
+        self._writer_wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5.0)
+            self._writer = None
+
         with self._lock:
-            try:
-                if self._fh is not None:
-                    self._fh.flush()
-                    self._fh.close()
-            except Exception:
-                pass
-            self._fh = None
+            self._close_segment()
+            if self._session is not None:
+                self._session.close()  # compression finishes in the background
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
             self._paused = False
 
+    def wait_closed(self, timeout: float = 10.0) -> bool:
+        """
+        After stop(): wait for the last segments to be compressed and the manifest
+        marked complete. Blocks, so only for shutdown; True when nothing is left.
+        """
+        session = self._session
+        return session.join(timeout) if session is not None and not self._running else True
+
     # --------------------
-    # Foreground gating
+    # Output files / segments
     # --------------------
-    def _is_target_foreground(self) -> bool:
-        # If win32gui isn't available, we can't gate by foreground window.
-        if win32gui is None:
-            return True
-
+    def _open_segment(self, path: str) -> None:
+        # Every file (segment) is self-contained: own header, key table and index,
+        # with times still measured from the session start.
+        self._fh = open(path, "ab")
+        self._fh.write(self._encoder.header())
+        self._offset = self._fh.tell()
+        self._seg_path = path
+        self._seg_opened = time.monotonic()
+        self._seg_events = 0
+        self._seg_bytes = 0
+
+        self._index = None
+        if self._cfg.index_interval_ms > 0 or self._session is not None:
+            try:
+                self._index = IndexWriter(path, self._encoder.binary, self._cfg.index_interval_ms or 1000)
+                self._index.checkpoint(0, self._offset)
+            except OSError:
+                self._index = None
+        if self._session is not None:
+            self._session.segment_opened(path, (self._last_t_ns - self._start_ns) / 1e9)
+
+    def _close_segment(self) -> None:
         try:
-            hwnd = win32gui.GetForegroundWindow()
-            title = win32gui.GetWindowText(hwnd) or ""
-            return (self._cfg.target_window_substring or "").lower() in title.lower()
+            if self._fh is not None:
+                self._fh.flush()
+                self._fh.close()
         except Exception:
+            pass
+        self._fh = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._session is not None and self._seg_path:
+            self._session.segment_closed(
+                self._seg_path, (self._last_t_ns - self._start_ns) / 1e9, self._seg_events, self._seg_bytes)
+        self._seg_path = ""
+
+    def _segment_due(self) -> bool:
+        cfg = self._cfg
+        if cfg.segment_max_mb > 0 and self._seg_bytes >= cfg.segment_max_mb * 1024 * 1024:
             return True
+        return cfg.segment_max_s > 0 and time.monotonic() - self._seg_opened >= cfg.segment_max_s
 
-    def _gate_loop(self) -> None:
-        # Poll foreground window; pause if target not focused.
-        while True:
-            with self._lock:
-                if not self._running:
-                    return
-            ok = self._is_target_foreground()
-            with self._lock:
-                self._paused = not ok
-            time.sleep(0.15)
+    def _rotate(self) -> None:
+        with self._lock:
+            self._close_segment()
+            self._encoder = make_encoder(self._cfg.format, self._start_ns)
+            self._open_segment(self._session.next_segment_path())
 
     # --------------------
-    # Event logging
+    # Foreground gating
     # --------------------
-    def _rel_t(self) -> float:
-        return time.perf_counter() - self._start_t
+    def _start_gate(self) -> None:
+        self._target = (self._cfg.target_window_substring or "").lower()
+        self._gate_flips = 0
+        if not self.supports_foreground_gate():
+            # Can't observe the foreground window: record everything.
+            self._paused = False
+            return
+        try:
+            self._on_foreground(self._fg.start(self._on_foreground))
+        except Exception:
+            self._paused = False
 
-    def _write(self, payload: Dict[str, Any]) -> None:
-        with self._lock:
-            if not self._running or self._fh is None or self._paused:
-                return
-            self._fh.write(json.dumps(payload, ensure_ascii=False) + "\n")
-            self._events_written += 1
+    def _stop_gate(self) -> None:
+        if self._fg is not None:
+            try:
+                self._fg.stop()
+            except Exception:
+                pass
+
+    def _on_foreground(self, title: str) -> None:
+        # Provider thread, right when focus changes. Hooks only read _paused.
+        paused = self._target not in (title or "").lower()
+        self._fg_title = title or ""
+        if paused == self._paused:
+            return
+        self._gate_flips += 1
+        # Adaptive mode: a held move belongs to the side of the flip it was seen
+        # on. Keep it when focus leaves; start a fresh stroke when focus returns.
+        with self._path_lock:
+            if paused:
+                self._keep_held(self._path.flush())
+            else:
+                self._path.reset()
+            self._paused = paused
+
+    # --------------------
+    # Event logging (hook threads: enqueue only)
+    # --------------------
+    def _admit(self, ev: RawEvent) -> bool:
+        # The foreground gate and the filters; only admitted events are counted.
+        if not self._running or self._paused:
+            return False
+        f = self._filter
+        return f is None or f(ev)
+
+    def _push(self, ev: RawEvent) -> None:
+        if self._admit(ev):
+            self._enqueue(ev)
+
+    def _enqueue(self, ev: RawEvent) -> None:
+        s = self._stream
+        if s is not None:
+            s.publish(ev)
+        q = self._queue
+        if len(q) >= self._queue_max:
+            self._dropped += 1
+            return
+        q.append(ev)
+        if len(q) >= self._batch_size:
+            self._writer_wake.set()
+
+    def _keep_held(self, held: Optional[RawEvent]) -> None:
+        # A move the simplifier held back: already admitted when it was fed.
+        # Called with self._path_lock held.
+        if held is not None and self._running and not self._paused:
+            self._moves_kept += 1
+            self._enqueue(held)
 
     def _on_move(self, x: int, y: int) -> None:
+        ev = (EV_MOVE, time.perf_counter_ns(), x, y, None, None)
+        mode = self._cfg.mode
+        if mode == "adaptive":
+            with self._path_lock:
+                # Checked under the lock: never hold a point across a gate flip.
+                if not self._admit(ev):
+                    return
+                self._moves_seen += 1
+                self._keep_held(self._path.feed(ev))
+            return
+
+        if not self._admit(ev):
+            return
+        self._moves_seen += 1
         # Throttle mouse move events in "fixed" mode.
-        if self._cfg.mode == "fixed":
+        if mode == "fixed":
             now = time.perf_counter()
             if self._last_move_t and (now - self._last_move_t) * 1000.0 < max(1, self._cfg.fixed_rate_ms):
                 return
             self._last_move_t = now
-
-        self._write({"t": self._rel_t(), "type": "mouse_move", "x": x, "y": y})
+        self._moves_kept += 1
+        self._enqueue(ev)
+
+    def _push_after_path(self, ev: RawEvent, click: bool = False) -> None:
+        # Non-move events in adaptive mode: settle the held move first so the
+        # file stays in time order (and, around clicks, keep the adjacent points).
+        if self._cfg.mode != "adaptive":
+            self._push(ev)
+            return
+        with self._path_lock:
+            self._keep_held(self._path.keep_next() if click else self._path.flush())
+            self._push(ev)
+
+    def _flush_idle_path(self) -> None:
+        # Writer thread: a stroke that has come to rest still gets its end point.
+        if self._cfg.mode != "adaptive":
+            return
+        with self._path_lock:
+            t = self._path.pending_t
+            if t and time.perf_counter_ns() - t > self._path.hold_ns:
+                self._keep_held(self._path.flush())
 
     def _on_click(self, x: int, y: int, button, pressed: bool) -> None:
-        self._write({
-            "t": self._rel_t(),
-            "type": "mouse_click",
-            "x": x,
-            "y": y,
-            "button": str(button),
-            "pressed": bool(pressed),
-        })
+        self._push_after_path((EV_CLICK, time.perf_counter_ns(), x, y, button, pressed), click=True)
 
     def _on_scroll(self, x: int, y: int, dx: int, dy: int) -> None:
-        self._write({
-            "t": self._rel_t(),
-            "type": "mouse_scroll",
-            "x": x,
-            "y": y,
-            "dx": dx,
-            "dy": dy,
-        })
+        self._push_after_path((EV_SCROLL, time.perf_counter_ns(), x, y, dx, dy))
 
     def _on_key_press(self, key) -> None:
-        self._write({"t": self._rel_t(), "type": "key_press", "key": str(key)})
+        self._push_after_path((EV_KEY_PRESS, time.perf_counter_ns(), None, None, key, None))
 
     def _on_key_release(self, key) -> None:
-        self._write({"t": self._rel_t(), "type": "key_release", "key": str(key)})
+        self._push_after_path((EV_KEY_RELEASE, time.perf_counter_ns(), None, None, key, None))
+
+    # --------------------
+    # Writer thread (serialize + group commit)
+    # --------------------
+    def _drain(self) -> List[RawEvent]:
+        q = self._queue
+        batch: List[RawEvent] = []
+        try:
+            while True:
+                batch.append(q.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _write_batch(self, batch: List[RawEvent]) -> None:
+        if self._session is not None and self._seg_events and self._segment_due():
+            self._rotate()
+        enc = self._encoder
+        data = enc.encode(batch)
+        fh = self._fh
+        if fh is None:
+            return
+        idx = self._index
+        if idx is not None:
+            # Batch boundaries are record boundaries: everything before this offset
+            # happened at or before the last event of the previous batch.
+            idx.maybe_checkpoint(self._last_t_ns - self._start_ns, self._offset)
+        fh.write(data)
+        fh.flush()
+        self._stats.add(batch, time.perf_counter_ns())
+        self._offset += len(data)
+        self._seg_events += len(batch)
+        self._seg_bytes += len(data)
+        self._last_t_ns = max(self._last_t_ns, max(ev[1] for ev in batch))
+        if idx is not None:
+            if enc.binary:
+                idx.add_names(enc.names)
+            idx.flush()
+        with self._lock:
+            self._events_written += len(batch)
+            self._bytes_written += len(data)
+            self._batches += 1
+            self._last_batch = len(batch)
+
+    def _writer_loop(self) -> None:
+        interval = max(1, self._cfg.flush_interval_ms) / 1000.0
+        while True:
+            self._writer_wake.wait(interval)
+            self._writer_wake.clear()
+            self._flush_idle_path()
+            batch = self._drain()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    with self._lock:
+                        self._dropped += len(batch)
+                        self._last_error = str(e) or type(e).__name__
+            if not self._running and not self._queue:
+                return
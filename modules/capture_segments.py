@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .capture_compress import CODEC_EXT, compress_blocks
+from .capture_index import CaptureReader, index_path, keys_path, read_checkpoints, write_index
+
+# A segmented session is a directory next to where the single file would have gone:
+#   captures/capture_20250101_120000/
+#       manifest.json
+#       part-0001.jcap.zst   (+ .idx, .keys)   closed, compressed
+#       part-0002.jcap       (+ .idx, .keys)   being written
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Compressed blocks span at least this much raw data; block starts become the
+# compressed segment's index checkpoints.
+BLOCK_BYTES = 256 * 1024
+
+
+def session_dir_for(output_path: str) -> str:
+    base = os.path.splitext(output_path)[0]
+    d, n = base, 1
+    while os.path.isdir(d) and os.listdir(d):
+        d = f"{base}-{n}"
+        n += 1
+    return d
+
+
+class SegmentSession:
+    """
+    Bookkeeping for one segmented recording: segment names, the manifest, and a
+    background thread that compresses closed segments and enforces retention.
+
+    The recorder's writer thread calls segment_opened/segment_closed; everything
+    slow (compression, deletes) happens on the "capture-compress" thread.
+    """
+
+    def __init__(self, output_path: str, ext: str, fmt: str, codec: str = "", max_segments: int = 0,
+                 index_interval_ms: int = 1000) -> None:
+        self.dir = session_dir_for(output_path)
+        os.makedirs(self.dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.dir, MANIFEST_NAME)
+        self.ext = ext
+        self.codec = codec
+        self.max_segments = max(0, int(max_segments))
+        self._index_interval_ms = index_interval_ms
+
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "format": fmt,
+            "codec": codec,
+            "started_at": time.time(),
+            "complete": False,
+            "segments": [],
+        }
+        self._jobs: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._worker, name="capture-compress", daemon=True)
+        self._thread.start()
+        self._save()
+
+    # --------------------
+    # Called by the recorder (writer thread)
+    # --------------------
+    def next_segment_path(self) -> str:
+        with self._lock:
+            n = len(self._manifest["segments"]) + 1
+        return os.path.join(self.dir, f"part-{n:04d}{self.ext}")
+
+    def segment_opened(self, path: str, t_start_s: float) -> None:
+        with self._lock:
+            self._manifest["segments"].append({
+                "path": os.path.basename(path),
+                "t_start": t_start_s,
+                "t_end": None,
+                "events": 0,
+                "bytes": 0,
+                "codec": "",
+                "removed": False,
+            })
+            self._save_locked()
+
+    def segment_closed(self, path: str, t_end_s: float, events: int, nbytes: int) -> None:
+        name = os.path.basename(path)
+        with self._lock:
+            seg = self._find(name)
+            if seg is not None:
+                seg.update(t_end=t_end_s, events=events, bytes=nbytes)
+            self._save_locked()
+            self._pending += 1
+        self._jobs.put(name)
+
+    def close(self) -> None:
+        """Mark the session finished once queued compression is done (does not block)."""
+        self._jobs.put(None)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the compress thread after close(); True if it has finished."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            segs = self._manifest["segments"]
+            return {
+                "segments": sum(1 for s in segs if not s["removed"]),
+                "compressing": self._pending,
+                "manifest": self.manifest_path,
+            }
+
+    # --------------------
+    # Internals
+    # --------------------
+    def _find(self, name: str) -> Optional[Dict[str, Any]]:
+        for seg in self._manifest["segments"]:
+            if seg["path"] == name:
+                return seg
+        return None
+
+    def _save(self) -> None:
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        tmp = self.manifest_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._manifest, f, indent=2)
+            os.replace(tmp, self.manifest_path)
+        except OSError:
+            pass
+
+    def _worker(self) -> None:
+        while True:
+            name = self._jobs.get()
+            if name is None:
+                with self._lock:
+                    self._manifest["complete"] = True
+                    self._save_locked()
+                return
+            try:
+                if self.codec:
+                    self._compress(name)
+                self._enforce_retention()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    def _compress(self, name: str) -> None:
+        src = os.path.join(self.dir, name)
+        if not os.path.exists(src):
+            return
+        dst = src + CODEC_EXT[self.codec]
+        binary = self._manifest["format"] == "binary"
+
+        # Cut blocks at index checkpoints, at least BLOCK_BYTES apart, so the
+        # compressed file keeps a (coarser) index and seeks stay cheap.
+        cps = read_checkpoints(src)
+        kept = [(0, 0)]
+        for t_ns, off in cps:
+            if off >= kept[-1][1] + BLOCK_BYTES:
+                kept.append((t_ns, off))
+        offsets = compress_blocks(src, dst, self.codec, [off for _, off in kept])
+        write_index(dst, binary, [(t, c) for (t, _), c in zip(kept, offsets)], self._index_interval_ms)
+        # Copied, not moved: until the manifest names dst, src must stay readable.
+        if binary and os.path.exists(keys_path(src)):
+            shutil.copyfile(keys_path(src), keys_path(dst))
+
+        with self._lock:
+            seg = self._find(name)
+            if seg is not None:
+                seg["path"] = os.path.basename(dst)
+                seg["codec"] = self.codec
+                seg["compressed_bytes"] = os.path.getsize(dst)
+            self._save_locked()
+        for p in (src, index_path(src), keys_path(src)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def _enforce_retention(self) -> None:
+        if not self.max_segments:
+            return
+        with self._lock:
+            closed = [s for s in self._manifest["segments"] if not s["removed"] and s["t_end"] is not None]
+            live = sum(1 for s in self._manifest["segments"] if not s["removed"])
+            drop = closed[:max(0, live - self.max_segments)]
+            for seg in drop:
+                seg["removed"] = True
+            if drop:
+                self._save_locked()
+        for seg in drop:
+            p = os.path.join(self.dir, seg["path"])
+            for f in (p, index_path(p), keys_path(p)):
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+
+
+# --------------------
+# Reading
+# --------------------
+def load_manifest(path: str) -> Dict[str, Any]:
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SessionReader:
+    """
+    Same interface as CaptureReader, over all segments of a segmented session.
+
+    Only segments whose time range overlaps the request are opened, and each is
+    entered through its own index, so old compressed segments are decompressed
+    from the nearest block rather than from the top.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.manifest_path = os.path.join(path, MANIFEST_NAME) if os.path.isdir(path) else path
+        self.dir = os.path.dirname(self.manifest_path)
+        self.binary = False
+        self.reload()
+
+    def reload(self) -> None:
+        self.manifest = load_manifest(self.manifest_path)
+        self.binary = self.manifest.get("format") == "binary"
+
+    def segments(self) -> List[Dict[str, Any]]:
+        return [s for s in self.manifest.get("segments", []) if not s.get("removed")]
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "SessionReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def events(self, start_s: Optional[float] = None, end_s: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        # Re-read so segments compressed/rotated since we opened are found under their new names.
+        self.reload()
+        for seg in self.segments():
+            if end_s is not None and seg.get("t_start") is not None and seg["t_start"] >= end_s:
+                break
+            if start_s is not None and seg.get("t_end") is not None and seg["t_end"] < start_s:
+                continue
+            path = os.path.join(self.dir, seg["path"])
+            if not os.path.exists(path):
+                continue
+            with CaptureReader(path) as r:
+                yield from r.events(start_s, end_s)
+
+
+def open_reader(path: str) -> Union[CaptureReader, SessionReader]:
+    """CaptureReader for a single capture file, SessionReader for a session dir or manifest."""
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST_NAME:
+        return SessionReader(path)
+    return CaptureReader(path)
+
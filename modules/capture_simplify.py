@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+from .capture_format import RawEvent
+
+_TWO_PI = 2.0 * math.pi
+
+
+def _wrap(a: float) -> float:
+    """Angle difference folded into (-pi, pi]."""
+    a = (a + math.pi) % _TWO_PI - math.pi
+    return math.pi if a == -math.pi else a
+
+
+class PathSimplifier:
+    """
+    Online mouse-path simplifier (sleeve / sector-narrowing, Zhao & Saalfeld).
+
+    From the last kept point (the anchor) every later point constrains the
+    direction the next kept segment may take to a sector of half-width
+    asin(tolerance / distance). While new points stay inside the shrinking sector
+    and keep moving away from the anchor, every skipped point is within
+    `tolerance_px` of the segment anchor -> latest point. When a point falls
+    outside, the previous point is kept and becomes the new anchor.
+
+    O(1) per point and no buffering beyond the single pending point. A pending
+    point older than `max_hold_ms` is kept as-is so pauses (and dwell timing) survive.
+    """
+
+    def __init__(self, tolerance_px: float = 2.0, max_hold_ms: int = 100) -> None:
+        self.tolerance = max(0.0, float(tolerance_px))
+        self.hold_ns = max(1, int(max_hold_ms)) * 1_000_000
+        self.reset()
+
+    def reset(self) -> None:
+        self._anchor: Optional[RawEvent] = None
+        self._pending: Optional[RawEvent] = None
+        self._force = False
+        self._open_sector()
+
+    def _open_sector(self) -> None:
+        self._ref: Optional[float] = None  # direction of the first constraining point
+        self._lo = -math.pi
+        self._hi = math.pi
+        self._max_d = 0.0
+
+    @property
+    def pending_t(self) -> int:
+        """Timestamp of the held point, 0 when nothing is held."""
+        return self._pending[1] if self._pending is not None else 0
+
+    def keep_next(self) -> Optional[RawEvent]:
+        """
+        Around a click: keep the held point now (returned) and the next point
+        unconditionally, so the path on both sides of the click is exact.
+        """
+        out = self.flush()
+        self._force = True
+        return out
+
+    def flush(self) -> Optional[RawEvent]:
+        """Keep the held point (if any) and make it the new anchor."""
+        ev = self._pending
+        if ev is not None:
+            self._anchor = ev
+            self._pending = None
+            self._open_sector()
+        return ev
+
+    def feed(self, ev: RawEvent) -> Optional[RawEvent]:
+        """
+        Offer a move; returns an earlier point that must be kept now, or None.
+        `ev` itself is held until a later point (or flush) decides its fate.
+        """
+        if self._anchor is None or self._force:
+            # Nothing to compare against yet, or right after a click: keep it outright.
+            self._force = False
+            self._anchor = ev
+            self._pending = None
+            self._open_sector()
+            return ev
+
+        out = None
+        if self._pending is not None and ev[1] - self._pending[1] > self.hold_ns:
+            out = self.flush()
+
+        if not self._fits(ev):
+            out = self.flush() if out is None else out
+            # Fresh sector from the new anchor; the point always fits it.
+            self._fits(ev)
+        self._pending = ev
+        return out
+
+    def _fits(self, ev: RawEvent) -> bool:
+        anchor = self._anchor
+        dx = ev[2] - anchor[2]
+        dy = ev[3] - anchor[3]
+        d = math.hypot(dx, dy)
+        tol = self.tolerance
+        # Moving back towards the anchor would leave earlier points beyond the end of
+        # the segment; allow only half a tolerance of retreat.
+        if d < self._max_d - tol * 0.5:
+            return False
+        if d <= tol:
+            # Still within tolerance of the anchor itself: no direction constraint.
+            return True
+
+        theta = math.atan2(dy, dx)
+        if self._ref is None:
+            self._ref = theta
+        rel = _wrap(theta - self._ref)
+        if rel < self._lo or rel > self._hi:
+            return False
+        half = math.asin(min(1.0, tol / d))
+        self._lo = max(self._lo, rel - half)
+        self._hi = min(self._hi, rel + half)
+        self._max_d = max(self._max_d, d)
+        return True
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Sequence
+
+from .capture_format import EV_CLICK, EV_KEY_PRESS, EVENT_NAMES, RawEvent
+
+# Hook-to-write latency buckets: 4 per power of two (12-25% wide), 1 ns .. ~70 s.
+LAT_BUCKETS = 160
+
+
+def _lat_bucket(ns: int) -> int:
+    if ns < 8:
+        return max(0, ns)
+    shift = ns.bit_length() - 3
+    return min(LAT_BUCKETS - 1, 4 * shift + (ns >> shift))
+
+
+def _bucket_ns(i: int) -> float:
+    """Representative latency (bucket middle) for bucket `i`."""
+    if i < 8:
+        return float(i)
+    shift = (i - 4) // 4
+    return (i - 4 * shift + 0.5) * (1 << shift)
+
+
+class _Slot:
+    __slots__ = ("sec", "counts", "actions", "lat")
+
+    def __init__(self) -> None:
+        self.sec = -1
+        self.counts = [0] * (max(EVENT_NAMES) + 1)
+        self.actions = 0
+        self.lat = [0] * LAT_BUCKETS
+
+    def reset(self, sec: int) -> None:
+        self.counts = [0] * len(self.counts)
+        self.actions = 0
+        self.lat = [0] * LAT_BUCKETS
+        self.sec = sec
+
+
+class RollingStats:
+    """
+    Rolling input stats over the last `window_s` seconds: a ring of one-second
+    slots (event counts by type, actions, latency histogram), so memory is fixed
+    and each event costs O(1).
+
+    add() is called from a single thread (the capture writer). snapshot() may be
+    called from any thread without locking: it only reads the ring, and a slot
+    being recycled at that moment can at worst be undercounted in one snapshot.
+    """
+
+    def __init__(self, window_s: int = 60, rate_window_s: int = 5) -> None:
+        self.window_s = max(1, int(window_s))
+        self.rate_window_s = max(1, min(self.window_s, int(rate_window_s)))
+        self._slots: List[_Slot] = [_Slot() for _ in range(self.window_s)]
+        self._start_ns = time.perf_counter_ns()
+
+    def reset(self) -> None:
+        self._slots = [_Slot() for _ in range(self.window_s)]
+        self._start_ns = time.perf_counter_ns()
+
+    def add(self, batch: Sequence[RawEvent], now_ns: int) -> None:
+        """Account a batch of events written at `now_ns` (perf_counter_ns)."""
+        slots = self._slots
+        n = self.window_s
+        slot = None
+        sec = -1
+        for ev in batch:
+            etype, t = ev[0], ev[1]
+            s = t // 1_000_000_000
+            if s != sec:
+                sec = s
+                slot = slots[s % n]
+                if slot.sec != s:
+                    slot.reset(s)
+            slot.counts[etype] += 1
+            if etype == EV_KEY_PRESS or (etype == EV_CLICK and ev[5]):
+                slot.actions += 1
+            slot.lat[_lat_bucket(now_ns - t)] += 1
+
+    def snapshot(self, now_ns: int = 0) -> Dict[str, Any]:
+        now_ns = now_ns or time.perf_counter_ns()
+        now_sec = now_ns // 1_000_000_000
+        frac = (now_ns % 1_000_000_000) / 1e9
+        elapsed = max(1e-3, (now_ns - self._start_ns) / 1e9)
+
+        counts = [0] * (max(EVENT_NAMES) + 1)
+        recent = 0
+        actions = 0
+        lat = [0] * LAT_BUCKETS
+        for slot in list(self._slots):
+            age = now_sec - slot.sec
+            if slot.sec < 0 or age < 0 or age >= self.window_s:
+                continue
+            c = slot.counts
+            for i, v in enumerate(c):
+                counts[i] += v
+            if age < self.rate_window_s:
+                recent += sum(c)
+            actions += slot.actions
+            for i, v in enumerate(slot.lat):
+                if v:
+                    lat[i] += v
+
+        # The ring covers (window - 1) whole seconds plus the current partial one.
+        span = min(self.window_s - 1 + frac, elapsed)
+        rate_span = min(self.rate_window_s - 1 + frac, elapsed)
+        total = sum(counts)
+        return {
+            "events_per_s": recent / max(1e-3, rate_span),
+            "apm": actions * 60.0 / max(1e-3, span),
+            "window_s": self.window_s,
+            "window_events": total,
+            "mix": {EVENT_NAMES[i]: v for i, v in enumerate(counts) if i in EVENT_NAMES},
+            "latency_ms": _percentiles(lat, (0.5, 0.9, 0.99)),
+        }
+
+
+def _percentiles(hist: List[int], qs: Sequence[float]) -> Dict[str, float]:
+    total = sum(hist)
+    out = {f"p{round(q * 100)}": 0.0 for q in qs}
+    if not total:
+        return out
+    acc = 0
+    pending = list(qs)
+    for i, v in enumerate(hist):
+        acc += v
+        while pending and acc >= pending[0] * total:
+            out[f"p{round(pending.pop(0) * 100)}"] = _bucket_ns(i) / 1e6
+        if not pending:
+            break
+    return out
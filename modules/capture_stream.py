@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from ..paths import data_dir
+except ImportError:  # pragma: no cover
+    from paths import data_dir
+
+from .capture_format import HEADER_SIZE, RECORD_SIZE, BinaryDecoder, BinaryEncoder, RawEvent, parse_header
+
+# Live event stream for local tools (overlays, analytics).
+#
+# A subscriber connects to 127.0.0.1:<port>, sends the session token plus "\n",
+# and receives the binary capture header followed by frames:
+#   <payload bytes u32> <frames dropped just before this one u32> <base t_ns i64>
+#   payload: 16-byte capture records whose deltas start from base t_ns.
+# Every frame stands on its own, so a subscriber that falls behind just loses
+# frames. After a loss the next frame is preceded by a frame re-sending the whole
+# key/button name table.
+#
+# The port and token are published in <data dir>/capture_stream.json while a
+# stream is running.
+_FRAME = struct.Struct("<IIq")
+FRAME_HEADER_SIZE = _FRAME.size
+ENDPOINT_NAME = "capture_stream.json"
+
+
+def endpoint_path() -> str:
+    return os.path.join(data_dir(), ENDPOINT_NAME)
+
+
+class _Subscriber:
+    """One connected consumer: its own bounded frame queue and sender thread."""
+
+    def __init__(self, sock: socket.socket, addr: Tuple[str, int], max_frames: int) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.max_frames = max_frames
+        self.frames: Deque[Tuple[int, bytes]] = deque()  # (base t_ns, payload)
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.lost = 0          # frames dropped since the last one queued
+        self.dropped = 0       # frames dropped in total
+        self.sent = 0
+        self.resync = True     # next frame must be preceded by the name table
+        self.closed = False
+
+    def offer(self, base: int, payload: bytes, names: "_NameTable") -> None:
+        # Capture-side thread: never blocks on the socket.
+        with self.lock:
+            if len(self.frames) >= self.max_frames:
+                self.lost += 1
+                self.dropped += 1
+                self.resync = True
+                return
+            if self.resync:
+                self.frames.append((base, names.records()))
+                self.resync = False
+            self.frames.append((base, payload))
+        self.wake.set()
+
+    def take(self) -> bytes:
+        with self.lock:
+            frames = list(self.frames)
+            self.frames.clear()
+            lost, self.lost = self.lost, 0
+        out: List[bytes] = []
+        for i, (base, payload) in enumerate(frames):
+            out.append(_FRAME.pack(len(payload), lost if i == 0 else 0, base))
+            out.append(payload)
+        self.sent += len(frames)
+        return b"".join(out)
+
+
+class _NameTable:
+    """The stream encoder's names as KEYDEF records, rebuilt only when it grows."""
+
+    def __init__(self, enc: BinaryEncoder) -> None:
+        self._enc = enc
+        self._n = -1
+        self._records = b""
+
+    def records(self) -> bytes:
+        if self._n != len(self._enc.names):
+            self._records = self._enc.name_records()
+            self._n = len(self._enc.names)
+        return self._records
+
+
+class StreamServer:
+    """
+    Fans captured events out to any number of local subscribers.
+
+    publish() is called from the input hooks and only appends to a deque. A
+    "capture-stream" thread encodes whatever is queued into one frame and hands
+    it to every subscriber's bounded queue; each subscriber has its own sender
+    thread, so a slow reader drops its own frames and never stalls capture or
+    the other subscribers.
+    """
+
+    def __init__(self, start_ns: int, port: int = 0, max_frames: int = 256, queue_max: int = 65536,
+                 write_endpoint: bool = True) -> None:
+        self.start_ns = start_ns
+        self.port = port
+        self.max_frames = max(1, int(max_frames))
+        self.queue_max = max(1, int(queue_max))
+        self.write_endpoint = write_endpoint
+        self.token = secrets.token_hex(16)
+
+        self._enc = BinaryEncoder(start_ns)
+        self._names = _NameTable(self._enc)
+        self._queue: Deque[RawEvent] = deque()
+        self._wake = threading.Event()
+        self._subs: Tuple[_Subscriber, ...] = ()  # replaced, never mutated: read without a lock
+        self._subs_lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self.dropped = 0  # events dropped because the stream thread fell behind
+        self.frames = 0
+
+    # --------------------
+    # Lifecycle
+    # --------------------
+    def start(self) -> Tuple[str, int]:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", self.port))
+        sock.listen(8)
+        sock.settimeout(0.5)
+        self._sock = sock
+        self.port = sock.getsockname()[1]
+        self._running = True
+        for target, name in ((self._accept_loop, "capture-stream-accept"), (self._fanout_loop, "capture-stream")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.write_endpoint:
+            self._write_endpoint()
+        return "127.0.0.1", self.port
+
+    def close(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+        # Senders exit once their final frames are out; give them a moment.
+        for sub in self._subs:
+            sub.wake.set()
+        deadline = time.monotonic() + 1.0
+        while self._subs and time.monotonic() < deadline:
+            time.sleep(0.005)
+        for sub in self._subs:
+            self._drop_subscriber(sub)
+        if self.write_endpoint:
+            try:
+                with open(endpoint_path(), "r", encoding="utf-8") as f:
+                    mine = json.load(f).get("token") == self.token
+                if mine:
+                    os.remove(endpoint_path())
+            except (OSError, ValueError):
+                pass
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}" if self._running else ""
+
+    def status(self) -> Dict[str, Any]:
+        subs = self._subs
+        return {
+            "address": self.address,
+            "subscribers": len(subs),
+            "frames": self.frames,
+            "dropped_frames": sum(s.dropped for s in subs),
+            "dropped_events": self.dropped,
+        }
+
+    # --------------------
+    # Capture side
+    # --------------------
+    def publish(self, ev: RawEvent) -> None:
+        if not self._subs:
+            return
+        q = self._queue
+        if len(q) >= self.queue_max:
+            self.dropped += 1
+            return
+        q.append(ev)
+        # The stream thread clears the flag before draining, so a set flag means
+        # this event will be picked up; skip the (locking) set() in that case.
+        if not self._wake.is_set():
+            self._wake.set()
+
+    def _fanout_loop(self) -> None:
+        q = self._queue
+        while True:
+            self._wake.wait(0.1)
+            self._wake.clear()
+            running = self._running
+            batch: List[RawEvent] = []
+            try:
+                while True:
+                    batch.append(q.popleft())
+            except IndexError:
+                pass
+            subs = self._subs
+            if batch and subs:
+                base = self._enc.t_ns
+                payload = self._enc.encode(batch)
+                self.frames += 1
+                for sub in subs:
+                    sub.offer(base, payload, self._names)
+            if not running:
+                return
+
+    # --------------------
+    # Subscribers
+    # --------------------
+    def _write_endpoint(self) -> None:
+        path = endpoint_path()
+        info = {"host": "127.0.0.1", "port": self.port, "token": self.token, "pid": os.getpid(),
+                "started_at": time.time()}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            t = threading.Thread(target=self._serve, args=(conn, addr), name="capture-stream-sub", daemon=True)
+            t.start()
+
+    def _serve(self, conn: socket.socket, addr) -> None:
+        try:
+            conn.settimeout(2.0)
+            line = b""
+            while not line.endswith(b"\n") and len(line) < 128:
+                chunk = conn.recv(128 - len(line))
+                if not chunk:
+                    break
+                line += chunk
+            if not secrets.compare_digest(line.strip(), self.token.encode("ascii")):
+                conn.close()
+                return
+            conn.settimeout(None)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn.sendall(self._enc.header())
+        except OSError:
+            conn.close()
+            return
+
+        sub = _Subscriber(conn, addr, self.max_frames)
+        with self._subs_lock:
+            self._subs = self._subs + (sub,)
+        try:
+            while not sub.closed:
+                sub.wake.wait(0.5)
+                sub.wake.clear()
+                data = sub.take()
+                if data:
+                    conn.sendall(data)
+                elif not self._running:
+                    break
+        except OSError:
+            pass
+        finally:
+            self._drop_subscriber(sub)
+
+    def _drop_subscriber(self, sub: _Subscriber) -> None:
+        with self._subs_lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+        sub.closed = True
+        sub.wake.set()
+        try:
+            sub.sock.close()
+        except OSError:
+            pass
+
+
+# --------------------
+# Client
+# --------------------
+class StreamSubscriber:
+    """
+    Reads a live capture stream. With no arguments it connects to the stream
+    advertised in the data dir's capture_stream.json.
+
+        with StreamSubscriber() as sub:
+            for ev in sub.events():   # JSONL-shaped dicts, "t" in session seconds
+                ...
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, token: Optional[str] = None,
+                 timeout: float = 5.0) -> None:
+        if port is None or token is None:
+            with open(endpoint_path(), "r", encoding="utf-8") as f:
+                info = json.load(f)
+            host = host or info["host"]
+            port = info["port"] if port is None else port
+            token = info["token"] if token is None else token
+        self.dropped = 0  # frames this subscriber lost by falling behind
+        self._sock = socket.create_connection((host or "127.0.0.1", port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.sendall(token.encode("ascii") + b"\n")
+        self.header = parse_header(self._read(HEADER_SIZE))
+        self._sock.settimeout(None)
+        self._dec = BinaryDecoder()
+
+    def _read(self, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self._sock.recv(n - len(buf))
+            if not chunk:
+                raise EOFError("capture stream closed")
+            buf += chunk
+        return bytes(buf)
+
+    def frames(self) -> Iterator[Tuple[int, bytes]]:
+        """(base t_ns, raw records) per frame, until the stream ends."""
+        while True:
+            try:
+                n, lost, base = _FRAME.unpack(self._read(FRAME_HEADER_SIZE))
+                payload = self._read(n)
+            except (EOFError, OSError):
+                return
+            self.dropped += lost
+            yield base, payload
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        dec = self._dec
+        for base, payload in self.frames():
+            dec.t_ns = base
+            yield from dec.decode(payload[:len(payload) - len(payload) % RECORD_SIZE])
+
+    def close(self) -> None:
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "StreamSubscriber":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Optional (Windows) window APIs for the polling fallback.
+try:
+    import win32gui  # type: ignore
+except Exception:  # pragma: no cover
+    win32gui = None
+
+# Called with the new foreground window title on every focus (or title) change.
+ForegroundCallback = Callable[[str], None]
+
+
+class ForegroundProvider:
+    """
+    Source of "which window is in front" for the capture gate.
+
+    start() begins delivering changes to `on_change` (from whatever thread the
+    backend uses) and returns the current title; stop() ends delivery.
+    """
+
+    name = "none"
+
+    def available(self) -> bool:
+        return True
+
+    def current_title(self) -> str:
+        return ""
+
+    def start(self, on_change: ForegroundCallback) -> str:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+# --------------------
+# Windows: WinEvent hook (change notifications, no polling)
+# --------------------
+if sys.platform == "win32":  # pragma: no cover
+    import ctypes
+    from ctypes import wintypes
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    _WINEVENTPROC = ctypes.WINFUNCTYPE(
+        None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+        wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+    )
+    _user32.SetWinEventHook.restype = wintypes.HANDLE
+    _user32.SetWinEventHook.argtypes = (
+        wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, _WINEVENTPROC,
+        wintypes.DWORD, wintypes.DWORD, wintypes.DWORD,
+    )
+    _user32.UnhookWinEvent.argtypes = (wintypes.HANDLE,)
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.GetWindowTextLengthW.argtypes = (wintypes.HWND,)
+    _user32.GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    _user32.GetMessageW.argtypes = (ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT)
+    _user32.PostThreadMessageW.argtypes = (wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+    _EVENT_SYSTEM_FOREGROUND = 0x0003
+    _EVENT_OBJECT_NAMECHANGE = 0x800C
+    _WINEVENT_OUTOFCONTEXT = 0x0000
+    _WINEVENT_SKIPOWNPROCESS = 0x0002
+    _OBJID_WINDOW = 0
+    _WM_QUIT = 0x0012
+
+    def _window_title(hwnd) -> str:
+        if not hwnd:
+            return ""
+        n = _user32.GetWindowTextLengthW(hwnd)
+        buf = ctypes.create_unicode_buffer(n + 1)
+        _user32.GetWindowTextW(hwnd, buf, n + 1)
+        return buf.value
+else:
+    _user32 = None
+
+
+class WinEventProvider(ForegroundProvider):
+    """
+    SetWinEventHook(EVENT_SYSTEM_FOREGROUND) on a dedicated message-loop thread.
+
+    Windows calls back as soon as focus moves (and on title changes of the
+    foreground window), so the gate flips within the time it takes to read one
+    window title, and nothing runs between changes.
+    """
+
+    name = "winevent"
+
+    def __init__(self) -> None:
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id = 0
+        self._ready = threading.Event()
+        self._on_change: Optional[ForegroundCallback] = None
+        self._hwnd = None
+        self._proc = None  # keep the ctypes callback alive while hooked
+
+    def available(self) -> bool:
+        return _user32 is not None
+
+    def current_title(self) -> str:
+        if _user32 is None:
+            return ""
+        return _window_title(_user32.GetForegroundWindow())
+
+    def start(self, on_change: ForegroundCallback) -> str:
+        if _user32 is None:
+            raise RuntimeError("WinEvent hooks are only available on Windows.")
+        self._on_change = on_change
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="foreground-hook", daemon=True)
+        self._thread.start()
+        self._ready.wait(2.0)
+        return self.current_title()
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread_id:
+            _user32.PostThreadMessageW(self._thread_id, _WM_QUIT, 0, 0)
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._thread_id = 0
+
+    def _callback(self, _hook, event, hwnd, id_object, _id_child, _thread, _time) -> None:
+        if event == _EVENT_OBJECT_NAMECHANGE and (id_object != _OBJID_WINDOW or hwnd != self._hwnd):
+            return
+        self._hwnd = hwnd
+        cb = self._on_change
+        if cb is not None:
+            try:
+                cb(_window_title(hwnd))
+            except Exception:
+                pass
+
+    def _run(self) -> None:  # pragma: no cover - Windows only
+        self._thread_id = _kernel32.GetCurrentThreadId()
+        self._hwnd = _user32.GetForegroundWindow()
+        self._proc = _WINEVENTPROC(self._callback)
+        hooks = [
+            _user32.SetWinEventHook(_EVENT_SYSTEM_FOREGROUND, _EVENT_SYSTEM_FOREGROUND, None, self._proc,
+                                    0, 0, _WINEVENT_OUTOFCONTEXT | _WINEVENT_SKIPOWNPROCESS),
+            _user32.SetWinEventHook(_EVENT_OBJECT_NAMECHANGE, _EVENT_OBJECT_NAMECHANGE, None, self._proc,
+                                    0, 0, _WINEVENT_OUTOFCONTEXT | _WINEVENT_SKIPOWNPROCESS),
+        ]
+        self._ready.set()
+        try:
+            msg = wintypes.MSG()
+            while _user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                _user32.TranslateMessage(ctypes.byref(msg))
+                _user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for h in hooks:
+                if h:
+                    _user32.UnhookWinEvent(h)
+            self._proc = None
+
+
+# --------------------
+# Polling fallback (cached HWND)
+# --------------------
+class PollingProvider(ForegroundProvider):
+    """
+    Polls GetForegroundWindow, which is cheap, and only reads the window title
+    when the handle changes (plus every `title_refresh_s`, for windows that retitle).
+    """
+
+    name = "polling"
+
+    def __init__(self, interval_s: float = 0.02, title_refresh_s: float = 1.0) -> None:
+        self.interval_s = max(0.001, interval_s)
+        self.title_refresh_s = title_refresh_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def available(self) -> bool:
+        return win32gui is not None or _user32 is not None
+
+    def _foreground(self):
+        if win32gui is not None:
+            return win32gui.GetForegroundWindow()
+        return _user32.GetForegroundWindow()
+
+    def _title(self, hwnd) -> str:
+        try:
+            if win32gui is not None:
+                return win32gui.GetWindowText(hwnd) or ""
+            return _window_title(hwnd)
+        except Exception:
+            return ""
+
+    def current_title(self) -> str:
+        if not self.available():
+            return ""
+        return self._title(self._foreground())
+
+    def start(self, on_change: ForegroundCallback) -> str:
+        if not self.available():
+            raise RuntimeError("No foreground window API available (pywin32 / Windows).")
+        self._stop.clear()
+        hwnd = self._foreground()
+        title = self._title(hwnd)
+        self._thread = threading.Thread(target=self._run, args=(on_change, hwnd, title),
+                                        name="foreground-poll", daemon=True)
+        self._thread.start()
+        return title
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self, on_change: ForegroundCallback, hwnd, title: str) -> None:
+        checked = time.monotonic()
+        while not self._stop.wait(self.interval_s):
+            try:
+                cur = self._foreground()
+            except Exception:
+                continue
+            now = time.monotonic()
+            if cur == hwnd and now - checked < self.title_refresh_s:
+                continue
+            checked = now
+            new_title = self._title(cur)
+            if cur != hwnd or new_title != title:
+                hwnd, title = cur, new_title
+                try:
+                    on_change(title)
+                except Exception:
+                    pass
+
+
+# --------------------
+# Scriptable fake (tests / non-Windows development)
+# --------------------
+class FakeProvider(ForegroundProvider):
+    """
+    Foreground provider driven by code: set_title() switches "focus" immediately
+    on the calling thread; play() replays a [(delay_s, title), ...] script.
+    """
+
+    name = "fake"
+
+    def __init__(self, title: str = "") -> None:
+        self._title = title
+        self._on_change: Optional[ForegroundCallback] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.changes: List[Tuple[float, str]] = []  # (perf_counter, title) of every switch
+
+    def current_title(self) -> str:
+        return self._title
+
+    def start(self, on_change: ForegroundCallback) -> str:
+        self._on_change = on_change
+        self._stop.clear()
+        return self._title
+
+    def stop(self) -> None:
+        self._on_change = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def set_title(self, title: str) -> None:
+        self._title = title
+        self.changes.append((time.perf_counter(), title))
+        cb = self._on_change
+        if cb is not None:
+            cb(title)
+
+    def play(self, script: Sequence[Tuple[float, str]]) -> threading.Thread:
+        def run() -> None:
+            for delay, title in script:
+                if self._stop.wait(delay):
+                    return
+                self.set_title(title)
+
+        self._thread = threading.Thread(target=run, name="foreground-fake", daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+def default_provider() -> Optional[ForegroundProvider]:
+    """Best backend for this platform, or None when the foreground can't be observed."""
+    if WinEventProvider().available():
+        return WinEventProvider()
+    poll = PollingProvider()
+    return poll if poll.available() else None
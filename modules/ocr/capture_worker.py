@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+try:
+    import mss  # type: ignore
+except Exception:  # pragma: no cover
+    mss = None
+
+from .change_detect import ChangeDetector, Rect
+from .tooltip_detect import TooltipTracker
+
+
+@dataclass
+class Region:
+    x: int = 0
+    y: int = 0
+    w: int = 800
+    h: int = 600
+
+
+@dataclass
+class Frame:
+    seq: int
+    raw: bytes              # BGRA pixels as grabbed
+    width: int
+    height: int
+    image: Optional[QImage]  # scaled for display (None when unchanged / not needed)
+    grabbed_at: float       # perf_counter() when the grab started
+    ready_at: float         # perf_counter() when the frame was published
+    changed: List[Rect] = field(default_factory=list)  # areas that differ from the previous frame
+
+    @property
+    def latency_ms(self) -> float:
+        return (self.ready_at - self.grabbed_at) * 1000.0
+
+
+# A grabber returns (BGRA bytes, width, height) for a region of a monitor.
+Grabber = Callable[[int, Region], Tuple[bytes, int, int]]
+
+
+class MssGrabber:
+    """mss screen grabs. mss handles are per-thread, so create this on the capture thread."""
+
+    def __init__(self) -> None:
+        if mss is None:
+            raise RuntimeError("mss is not installed. Run: py -m pip install -r requirements.txt")
+        self._sct = mss.mss()
+
+    def monitor_size(self, monitor_index: int) -> Tuple[int, int]:
+        mon = self._sct.monitors[monitor_index]
+        return mon["width"], mon["height"]
+
+    def __call__(self, monitor_index: int, region: Region) -> Tuple[bytes, int, int]:
+        mon = self._sct.monitors[monitor_index]
+        shot = self._sct.grab({
+            "left": mon["left"] + region.x,
+            "top": mon["top"] + region.y,
+            "width": region.w,
+            "height": region.h,
+        })
+        return shot.raw, shot.width, shot.height
+
+    def close(self) -> None:
+        try:
+            self._sct.close()
+        except Exception:
+            pass
+
+
+class LatestFrame:
+    """
+    Single-slot hand-off between the capture thread and the GUI: publishing a
+    new frame replaces one that was never taken (counted as dropped), so the
+    reader always gets the newest frame and nothing queues up behind it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: Optional[Frame] = None
+        self.published = 0
+        self.taken = 0
+        self.dropped = 0
+
+    def publish(self, frame: Frame) -> bool:
+        """Returns True when the slot was empty (the reader needs a nudge)."""
+        with self._lock:
+            was_empty = self._frame is None
+            if not was_empty:
+                self.dropped += 1
+            self._frame = frame
+            self.published += 1
+        return was_empty
+
+    def take(self) -> Optional[Frame]:
+        with self._lock:
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                self.taken += 1
+        return frame
+
+
+class CaptureWorker:
+    """
+    Grabs the preview region on a dedicated thread at the requested FPS and
+    converts/scales it there, so the GUI thread only ever blits a ready QImage.
+    Grabs identical to the last published frame are counted and discarded
+    before any conversion; nothing downstream sees them.
+
+    `on_ready` is called (from the capture thread) when a frame lands in an
+    empty slot; the GUI takes the newest frame from `slot` in response.
+    `on_frame`, if set, also receives every published frame on the capture
+    thread (e.g. to feed OCR) and must not block.
+
+    With a `tracker`, the region follows the tooltip: every `track_interval_s`
+    the tracker looks for it (using the same grabber) and the region is moved to
+    its box; `on_region` is told about each move, from the capture thread.
+    """
+
+    def __init__(self, grabber_factory: Optional[Callable[[], Grabber]] = None,
+                 on_ready: Optional[Callable[[], None]] = None,
+                 detector: Optional[ChangeDetector] = None) -> None:
+        self._factory = grabber_factory or MssGrabber
+        self._on_ready = on_ready
+        self._detector = detector or ChangeDetector()
+        self.on_frame: Optional[Callable[[Frame], None]] = None
+        self.tracker: Optional[TooltipTracker] = None
+        self.on_region: Optional[Callable[[Region], None]] = None
+        self.track_interval_s = 0.2
+        self.slot = LatestFrame()
+
+        self._lock = threading.Lock()
+        self._monitor = 1
+        self._region = Region()
+        self._fps = 10
+        self._target: Tuple[int, int] = (0, 0)
+        self._dirty = True  # region/target changed: publish the next grab regardless
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._latencies: Deque[float] = deque(maxlen=120)
+        self._grab_times: Deque[float] = deque(maxlen=120)
+        self.unchanged = 0
+        self.last_error = ""
+
+    # --------------------
+    # Control (GUI thread)
+    # --------------------
+    def configure(self, monitor: Optional[int] = None, region: Optional[Region] = None, fps: Optional[int] = None,
+                  target_size: Optional[Tuple[int, int]] = None) -> None:
+        with self._lock:
+            if monitor is not None:
+                self._dirty |= self._monitor != max(1, int(monitor))
+                self._monitor = max(1, int(monitor))
+            if region is not None:
+                self._dirty |= self._region != region
+                self._region = region
+            if fps is not None:
+                self._fps = max(1, int(fps))
+            if target_size is not None:
+                target = (max(0, int(target_size[0])), max(0, int(target_size[1])))
+                self._dirty |= self._target != target
+                self._target = target
+
+    def refresh(self) -> None:
+        """Publish the next grab even if it is unchanged."""
+        with self._lock:
+            self._dirty = True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self.last_error = ""
+        self.slot = LatestFrame()
+        self._latencies.clear()
+        self._grab_times.clear()
+        self.unchanged = 0
+        self._dirty = True
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="ocr-capture", daemon=True)
+        self._thread.start()
+        ready.wait(2.0)
+        if self.last_error:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+            raise RuntimeError(self.last_error)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        lat = sorted(self._latencies)
+        times = list(self._grab_times)
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        return {
+            "capture_fps": fps,
+            "latency_ms": lat[len(lat) // 2] if lat else 0.0,
+            "latency_ms_max": lat[-1] if lat else 0.0,
+            "frames": self.slot.published,
+            "shown": self.slot.taken,
+            "dropped": self.slot.dropped,
+            "unchanged": self.unchanged,
+            "tracking": self.tracker is not None,
+            "tooltip": self.tracker.box if self.tracker is not None else None,
+            "track_ms": self.tracker.last_ms if self.tracker is not None else 0.0,
+            "error": self.last_error,
+        }
+
+    # --------------------
+    # Capture thread
+    # --------------------
+    def _run(self, ready: threading.Event) -> None:
+        try:
+            grab = self._factory()
+        except Exception as e:
+            self.last_error = str(e)
+            ready.set()
+            return
+        ready.set()
+        next_t = time.perf_counter()
+        next_track = next_t
+        try:
+            while not self._stop.is_set():
+                tracker = self.tracker
+                if tracker is not None and time.perf_counter() >= next_track:
+                    next_track = time.perf_counter() + self.track_interval_s
+                    self._track(tracker, grab)
+                with self._lock:
+                    monitor, region, fps, target = self._monitor, self._region, self._fps, self._target
+                    dirty, self._dirty = self._dirty, False
+                t0 = time.perf_counter()
+                raw, w, h = grab(monitor, region)
+                self._grab_times.append(t0)
+                if dirty:
+                    self._detector.reset()
+                change = self._detector.check(raw, w, h)
+                if change.changed:
+                    frame = Frame(self._seq, raw, w, h, self._scale(raw, w, h, target), t0, 0.0, change.rects)
+                    self._seq += 1
+                    frame.ready_at = time.perf_counter()
+                    self._latencies.append(frame.latency_ms)
+                    if self.slot.publish(frame) and self._on_ready is not None:
+                        self._on_ready()
+                    consumer = self.on_frame
+                    if consumer is not None:
+                        consumer(frame)
+                else:
+                    self.unchanged += 1
+
+                # Fixed-rate schedule; if we fell behind, restart it instead of bursting.
+                next_t += 1.0 / fps
+                now = time.perf_counter()
+                if next_t < now:
+                    next_t = now
+                self._stop.wait(next_t - now)
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            close = getattr(grab, "close", None)
+            if close is not None:
+                close()
+
+    def _track(self, tracker: TooltipTracker, grab: Grabber) -> None:
+        with self._lock:
+            monitor, region = self._monitor, self._region
+        size = getattr(grab, "monitor_size", None)
+        box = tracker.locate(lambda b: grab(monitor, Region(*b)), size(monitor) if size is not None else None)
+        if box is None or Region(*box) == region:
+            return
+        region = Region(*box)
+        with self._lock:
+            self._region = region
+            self._dirty = True
+        if self.on_region is not None:
+            self.on_region(region)
+
+    @staticmethod
+    def _scale(raw: bytes, w: int, h: int, target: Tuple[int, int]) -> QImage:
+        # mss gives BGRA bytes, which is Qt's (little-endian) RGB32 layout.
+        img = QImage(raw, w, h, 4 * w, QImage.Format.Format_RGB32)
+        tw, th = target
+        if tw <= 0 or th <= 0:
+            return img.copy()  # detach from `raw`
+        return img.scaled(tw, th, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
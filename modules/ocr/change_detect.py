@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+Rect = Tuple[int, int, int, int]  # x, y, w, h in frame pixels
+
+
+@dataclass
+class Change:
+    changed: bool
+    rects: List[Rect] = field(default_factory=list)  # changed areas (tile-aligned), empty when unchanged
+
+    @property
+    def bbox(self) -> Optional[Rect]:
+        if not self.rects:
+            return None
+        x0 = min(r[0] for r in self.rects)
+        y0 = min(r[1] for r in self.rects)
+        x1 = max(r[0] + r[2] for r in self.rects)
+        y1 = max(r[1] + r[3] for r in self.rects)
+        return x0, y0, x1 - x0, y1 - y0
+
+
+class ChangeDetector:
+    """
+    Decides whether a BGRA frame differs from the last frame it reported as
+    changed, so identical frames can skip conversion, scaling and OCR.
+
+    A byte-equal frame is detected with a plain memcmp. Otherwise (with numpy)
+    the frames are compared on a grid sampled every `sample` pixels; a channel
+    has to move by more than `threshold` to count, which ignores dithering and
+    compression noise. Changed areas are reported as `tile`-pixel squares merged
+    into horizontal runs. Without numpy any byte difference is a full change.
+    """
+
+    def __init__(self, tile: int = 32, sample: int = 2, threshold: int = 8) -> None:
+        self.tile = max(1, int(tile))
+        self.sample = max(1, int(sample))
+        self.threshold = max(0, int(threshold))
+        self.reset()
+
+    def reset(self) -> None:
+        self._raw = None
+        self._size = (0, 0)
+        self._grid = None
+
+    def check(self, raw, width: int, height: int) -> Change:
+        full = [(0, 0, width, height)]
+        if self._raw is None or self._size != (width, height):
+            self._accept(raw, width, height)
+            return Change(True, full)
+        if raw == self._raw:
+            return Change(False)
+        if np is None:
+            self._accept(raw, width, height)
+            return Change(True, full)
+
+        grid, prev = self._sampled(raw, width, height), self._grid
+        # |a - b| on uint8 without widening: max(a, b) - min(a, b). Channels 0..2 are B, G, R.
+        d = np.maximum(grid, prev)
+        d -= np.minimum(grid, prev)
+        thr = self.threshold
+        diff = d[..., 0] > thr
+        diff |= d[..., 1] > thr
+        diff |= d[..., 2] > thr
+        if not diff.any():
+            return Change(False)
+        self._accept(raw, width, height)
+        return Change(True, self._tiles(diff, width, height))
+
+    def _sampled(self, raw, width: int, height: int):
+        # A contiguous copy of the sampled pixels: elementwise ops on it are several times
+        # faster than on the strided view.
+        s = self.sample
+        px = np.frombuffer(raw, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+        return np.ascontiguousarray(px[::s, ::s])
+
+    def _accept(self, raw, width: int, height: int) -> None:
+        # Keep a private copy: grabbers may reuse their buffer.
+        self._raw = bytes(raw)
+        self._size = (width, height)
+        self._grid = self._sampled(raw, width, height) if np is not None else None
+
+    def _tiles(self, diff, width: int, height: int) -> List[Rect]:
+        # Per-tile "any change" on the sampled grid, then merge runs along each tile row.
+        t = max(1, self.tile // self.sample)
+        gh, gw = diff.shape
+        th, tw = -(-gh // t), -(-gw // t)
+        pad = np.zeros((th * t, tw * t), dtype=bool)
+        pad[:gh, :gw] = diff
+        hit = pad.reshape(th, t, tw, t).any(axis=(1, 3))
+
+        px = t * self.sample
+        rects: List[Rect] = []
+        for ty in np.flatnonzero(hit.any(axis=1)).tolist():
+            row = np.concatenate(([False], hit[ty], [False]))
+            edges = np.flatnonzero(row[1:] != row[:-1])
+            y = ty * px
+            for a, b in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                x = a * px
+                rects.append((x, y, min(width, b * px) - x, min(height, y + px) - y))
+        return rects
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+# OCR engines run inside the OCR pool's worker processes, so they must be plain
+# picklable objects. Each one is called with a 2-D uint8 (grayscale) array.
+
+
+def encode_pgm(gray) -> bytes:
+    """Binary PGM (P5): the simplest image format tesseract reads from stdin."""
+    h, w = gray.shape
+    return b"P5\n%d %d\n255\n" % (w, h) + gray.tobytes()
+
+
+def find_tesseract(configured: str = "") -> str:
+    """Path to the tesseract executable (the configured one first, then PATH)."""
+    candidates = [configured] if configured else []
+    candidates.append(shutil.which("tesseract") or "")
+    if sys.platform == "win32":
+        candidates.append(r"C:\Program Files\Tesseract-OCR\tesseract.exe")
+    for c in candidates:
+        if c and os.path.isfile(c):
+            return c
+    raise RuntimeError(
+        "Tesseract was not found. Install it and set its path in Settings "
+        "(e.g. C:\\Program Files\\Tesseract-OCR\\tesseract.exe)."
+    )
+
+
+@dataclass
+class TesseractEngine:
+    """Runs the tesseract CLI on one image per call (stdin -> stdout, no temp files)."""
+    path: str
+    lang: str = "eng"
+    psm: int = 6          # assume a single uniform block of text
+    dpi: int = 96
+    timeout_s: float = 10.0
+
+    def __call__(self, gray) -> str:
+        cmd = [self.path, "stdin", "stdout", "-l", self.lang, "--psm", str(self.psm), "--dpi", str(self.dpi)]
+        p = subprocess.run(
+            cmd,
+            input=encode_pgm(gray),
+            capture_output=True,
+            timeout=self.timeout_s,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        if p.returncode != 0:
+            raise RuntimeError(p.stderr.decode("utf-8", "replace").strip() or f"tesseract exited with {p.returncode}")
+        return p.stdout.decode("utf-8", "replace").strip()
+
+
+@dataclass
+class FakeEngine:
+    """
+    Stand-in for tests and benchmarks on machines without tesseract: sleeps like
+    an OCR call would and returns text derived from the pixels, so identical
+    images give identical text.
+    """
+    delay_s: float = 0.05
+
+    def __call__(self, gray) -> str:
+        if self.delay_s > 0:
+            time.sleep(self.delay_s)
+        h, w = gray.shape
+        return f"{w}x{h} sum={int(gray.sum(dtype='uint64'))}"
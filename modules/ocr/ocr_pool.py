@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+from .preprocess import Preprocessor
+
+# OCR off the GUI and capture threads:
+#
+#   capture thread: offer() the frame (newest wins) and carry on
+#   feed thread:    preprocess -> perceptual hash -> cache hit? deliver now
+#                   otherwise copy the image into a free shared-memory slot and
+#                   submit (slot name, shape) to a process pool
+#   worker process: attach the slot (once), run the engine on a view of it
+#
+# At most one OCR per worker is in flight; a newer frame waiting for a worker
+# replaces an older one, so OCR never falls behind the screen.
+
+Engine = Callable[[Any], str]
+Preprocess = Callable[[bytes, int, int], Any]  # BGRA bytes, width, height -> 2-D uint8
+
+
+@dataclass
+class OcrResult:
+    seq: int
+    text: str
+    cached: bool
+    elapsed_ms: float   # submit -> result (OCR time for misses, lookup time for hits)
+    error: str = ""
+
+
+def dhash(gray, size: int = 32) -> int:
+    """
+    Difference hash: area-average the image down to size x (size + 1) and keep
+    one bit per horizontal neighbour pair (left brighter than right). Stable under
+    small noise and brightness shifts; `size` 32 keeps enough detail for text.
+    """
+    h, w = gray.shape
+    if h == 0 or w == 0:
+        return 0
+    ry = (np.arange(size + 1) * h) // size
+    rx = (np.arange(size + 2) * w) // (size + 1)
+    ry, rx = np.minimum(ry[:-1], h - 1), np.minimum(rx[:-1], w - 1)
+    sums = np.add.reduceat(np.add.reduceat(gray.astype(np.uint32), ry, axis=0), rx, axis=1)
+    counts = np.outer(np.diff(np.append(ry, h)), np.diff(np.append(rx, w)))
+    small = sums / np.maximum(counts, 1)
+    bits = (small[:, :-1] > small[:, 1:]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ResultCache:
+    """
+    LRU of OCR text keyed by (width, height, dhash). With max_distance > 0 a miss
+    falls back to the nearest stored hash within that many differing bits.
+    """
+
+    def __init__(self, capacity: int = 256, max_distance: int = 0) -> None:
+        self.capacity = max(1, int(capacity))
+        self.max_distance = max(0, int(max_distance))
+        self._items: "OrderedDict[Tuple[int, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Tuple[int, int, int]) -> Optional[str]:
+        with self._lock:
+            text = self._items.get(key)
+            if text is None and self.max_distance:
+                w, h, hv = key
+                best = self.max_distance + 1
+                for k in self._items:
+                    if k[0] == w and k[1] == h:
+                        d = bin(k[2] ^ hv).count("1")
+                        if d < best:
+                            best, text, key = d, self._items[k], k
+            if text is not None:
+                self._items.move_to_end(key)
+            return text
+
+    def put(self, key: Tuple[int, int, int], text: str) -> None:
+        with self._lock:
+            self._items[key] = text
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+# --------------------
+# Worker process side
+# --------------------
+_engine: Optional[Engine] = None
+_attached: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+
+
+def _init_worker(engine: Engine) -> None:
+    global _engine
+    _engine = engine
+
+
+def _ping() -> bool:
+    return True
+
+
+def _ocr_task(shm_name: str, height: int, width: int) -> str:
+    shm = _attached.get(shm_name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _attached[shm_name] = shm
+        while len(_attached) > 16:  # slots the parent has since replaced
+            _, old = _attached.popitem(last=False)
+            try:
+                old.close()
+            except BufferError:
+                pass
+    else:
+        _attached.move_to_end(shm_name)
+    gray = np.ndarray((height, width), dtype=np.uint8, buffer=shm.buf)
+    try:
+        return _engine(gray)
+    finally:
+        del gray  # release the export so the slot can be closed later
+
+
+# --------------------
+# Capture process side
+# --------------------
+class _Slot:
+    """A shared-memory image buffer owned by the pipeline, reused between tasks."""
+
+    def __init__(self) -> None:
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def put(self, gray) -> str:
+        need = max(1, gray.size)
+        if self.shm is None or self.shm.size < need:
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=need)
+        view = np.ndarray(gray.shape, dtype=np.uint8, buffer=self.shm.buf)
+        view[...] = gray
+        del view
+        return self.shm.name
+
+    def release(self) -> None:
+        if self.shm is not None:
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except (BufferError, OSError):
+                pass
+            self.shm = None
+
+
+class OcrPipeline:
+    """
+    Runs `engine` on submitted frames in a pool of `workers` processes.
+
+    offer() is meant for the capture thread: it only stores the frame (a newer
+    one replaces it if the feed thread is still busy). The feed thread calls
+    submit(), which preprocesses, hashes and either answers from the cache at
+    once or hands the image to an idle worker (or parks it as the single pending
+    frame). Results arrive through `on_result`, called from a pool thread for OCR
+    results and from the thread calling submit() for cache hits.
+    """
+
+    def __init__(self, engine: Engine, workers: int = 2, cache_size: int = 256, max_distance: int = 0,
+                 hash_size: int = 32, preprocess: Optional[Preprocess] = None,
+                 on_result: Optional[Callable[[OcrResult], None]] = None) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed. Install requirements first.")
+        self.engine = engine
+        self.workers = max(1, int(workers))
+        self.hash_size = hash_size
+        self.preprocess = preprocess or Preprocessor()
+        self.on_result = on_result
+        self.cache = ResultCache(cache_size, max_distance)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._free: List[_Slot] = []
+        self._slots: List[_Slot] = []
+        self._inflight: Dict[Tuple[int, int, int], int] = {}  # key -> newest seq waiting for it
+        self._pending: Optional[Tuple[int, Any, Tuple[int, int, int], float]] = None
+        self._offered: Optional[Tuple[Any, int, int, int]] = None  # newest frame for the feed thread
+        self._feed_wake = threading.Event()
+        self._feeder: Optional[threading.Thread] = None
+        self._ocr_ms: Deque[float] = deque(maxlen=100)
+        self._prep_ms: Deque[float] = deque(maxlen=100)
+
+        self.submitted = 0
+        self.cache_hits = 0
+        self.ocr_runs = 0
+        self.superseded = 0  # offered/pending frames replaced by newer ones before they were handled
+        self.errors = 0
+
+    # --------------------
+    # Lifecycle
+    # --------------------
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self, warm: bool = True) -> None:
+        if self._pool is not None:
+            return
+        # spawn everywhere: forking a process that runs Qt and capture threads is unsafe.
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.engine,),
+        )
+        self._slots = [_Slot() for _ in range(self.workers)]
+        self._free = list(self._slots)
+        self._inflight.clear()
+        self._feeder = threading.Thread(target=self._feed_loop, args=(self._pool,), name="ocr-feed", daemon=True)
+        self._feeder.start()
+        if warm:
+            # Get the worker processes started now instead of on the first hover.
+            for _ in range(self.workers):
+                self._pool.submit(_ping)
+
+    def close(self, wait: bool = False) -> None:
+        """
+        Stop the pool. By default this does not wait for an OCR call in progress
+        (safe on the GUI thread): its worker exits when the call returns, and its
+        slot is released from the done-callback.
+        """
+        pool = self._pool
+        if pool is None:
+            return
+        self._pool = None
+        with self._lock:
+            self._pending = None
+            self._offered = None
+            idle, self._free = self._free, []
+            self._slots = []
+        self._feed_wake.set()
+        for slot in idle:
+            slot.release()
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        ms = sorted(self._ocr_ms)
+        prep = sorted(self._prep_ms)
+        return {
+            "submitted": self.submitted,
+            "cache_hits": self.cache_hits,
+            "ocr_runs": self.ocr_runs,
+            "superseded": self.superseded,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+            "cached": len(self.cache),
+            "ocr_ms": ms[len(ms) // 2] if ms else 0.0,
+            "preprocess_ms": prep[len(prep) // 2] if prep else 0.0,
+        }
+
+    # --------------------
+    # Submitting
+    # --------------------
+    def offer(self, raw, width: int, height: int, seq: int = 0) -> None:
+        """Hand a frame to the feed thread without waiting; `raw` must not change afterwards."""
+        if self._pool is None:
+            return
+        with self._lock:
+            if self._offered is not None:
+                self.superseded += 1
+            self._offered = (raw, width, height, seq)
+        self._feed_wake.set()
+
+    def _feed_loop(self, pool: ProcessPoolExecutor) -> None:
+        while self._pool is pool:
+            self._feed_wake.wait()
+            self._feed_wake.clear()
+            with self._lock:
+                item, self._offered = self._offered, None
+            if item is None or self._pool is not pool:
+                continue
+            try:
+                self.submit(*item)
+            except Exception as e:
+                self.errors += 1
+                self._deliver(OcrResult(item[3], "", False, 0.0, str(e) or type(e).__name__))
+
+    def submit(self, raw, width: int, height: int, seq: int = 0) -> str:
+        """Returns "cached", "queued", "pending", "duplicate" or "closed"."""
+        if self._pool is None:
+            return "closed"
+        t0 = time.perf_counter()
+        gray = self.preprocess(raw, width, height)
+        self._prep_ms.append((time.perf_counter() - t0) * 1000.0)
+        key = (gray.shape[1], gray.shape[0], dhash(gray, self.hash_size))
+        self.submitted += 1
+
+        text = self.cache.get(key)
+        if text is not None:
+            self.cache_hits += 1
+            self._deliver(OcrResult(seq, text, True, (time.perf_counter() - t0) * 1000.0))
+            return "cached"
+
+        with self._lock:
+            if key in self._inflight:
+                self._inflight[key] = seq
+                return "duplicate"
+            if not self._free:
+                if self._pending is not None:
+                    self.superseded += 1
+                self._pending = (seq, gray, key, t0)
+                return "pending"
+            self._dispatch(seq, gray, key, t0)
+        return "queued"
+
+    def _dispatch(self, seq: int, gray, key: Tuple[int, int, int], t0: float) -> None:
+        # Called with self._lock held.
+        pool = self._pool
+        if pool is None:
+            return
+        slot = self._free.pop()
+        try:
+            fut = pool.submit(_ocr_task, slot.put(gray), gray.shape[0], gray.shape[1])
+        except RuntimeError:  # shutting down
+            self._free.append(slot)
+            return
+        self._inflight[key] = seq
+        fut.add_done_callback(lambda f: self._done(f, slot, key, t0))
+
+    def _done(self, fut: Future, slot: _Slot, key: Tuple[int, int, int], t0: float) -> None:
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            seq = self._inflight.pop(key, 0)
+            closed = self._pool is None
+            if not closed:
+                self._free.append(slot)
+        if closed:
+            slot.release()  # close() left it to us; the result is of no use any more
+            return
+        if fut.cancelled():
+            return
+        err = fut.exception()
+        if err is None:
+            text = fut.result()
+            self.cache.put(key, text)
+            self.ocr_runs += 1
+            self._ocr_ms.append(ms)
+            self._deliver(OcrResult(seq, text, False, ms))
+        else:
+            self.errors += 1
+            self._deliver(OcrResult(seq, "", False, ms, str(err) or type(err).__name__))
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if pending is None or self._pool is None:
+                return
+            p_seq, p_gray, p_key, p_t0 = pending
+            text = self.cache.get(p_key)
+            if text is None and p_key not in self._inflight:
+                self._dispatch(p_seq, p_gray, p_key, p_t0)
+                return
+            if text is None:
+                self._inflight[p_key] = p_seq
+                return
+        self.cache_hits += 1
+        self._deliver(OcrResult(p_seq, text, True, (time.perf_counter() - p_t0) * 1000.0))
+
+    def _deliver(self, result: OcrResult) -> None:
+        cb = self.on_result
+        if cb is not None:
+            try:
+                cb(result)
+            except Exception:
+                pass
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+# Image clean-up before OCR, vectorized over the grabbed BGRA buffer:
+#
+#   trim     drop a fixed margin (e.g. the tooltip frame)       - view, no copy
+#   crop     find the tooltip panel and the text on it from row/column
+#            projections of the green channel                     - view, no copy
+#   gray     BGRA -> 8-bit luma (only over what is left)
+#   stretch  map the [low, high] percentile range onto 0..255
+#   binarize local-mean threshold, dark text on white
+#   upscale  integer nearest-neighbour zoom, to reach tesseract's preferred text height
+#
+# Cropping and binarizing shrink what the OCR engine has to look at; upscaling
+# goes last so it only multiplies what survived.
+STEPS = ("trim", "crop", "gray", "stretch", "binarize", "upscale")
+
+
+def bgra_view(raw, width: int, height: int):
+    """Zero-copy (height, width, 4) uint8 view of a BGRA buffer."""
+    return np.frombuffer(raw, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+
+
+@dataclass
+class PreprocessConfig:
+    trim_px: int = 0            # margin dropped on every side before anything else
+    crop: bool = True
+    crop_tolerance: int = 12    # green-channel distance from the panel colour that still counts as panel
+    crop_pad: int = 4
+    stretch: bool = True
+    stretch_low: float = 1.0    # percentiles mapped to 0 and 255
+    stretch_high: float = 99.0
+    binarize: bool = True
+    block: int = 25             # local-mean window (pixels, odd)
+    offset: int = 10            # ink must be this much darker than its neighbourhood
+    invert: str = "auto"        # "auto" (light text on dark -> invert), "yes", "no"
+    upscale: int = 2            # 1 = off
+
+
+@dataclass
+class StepTimes:
+    last_ms: Dict[str, float] = field(default_factory=dict)
+    total_ms: Dict[str, float] = field(default_factory=dict)
+    calls: int = 0
+
+    def mean_ms(self) -> Dict[str, float]:
+        return {k: v / self.calls for k, v in self.total_ms.items()} if self.calls else {}
+
+
+class Preprocessor:
+    """
+    Callable (BGRA bytes, width, height) -> 2-D uint8 image for the OCR engine,
+    which is what OcrPipeline expects as `preprocess`. Every step is optional
+    and timed; see `times`.
+    """
+
+    def __init__(self, config: Optional[PreprocessConfig] = None) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed. Install requirements first.")
+        self.config = config or PreprocessConfig()
+        self.times = StepTimes()
+
+    def __call__(self, raw, width: int, height: int):
+        cfg = self.config
+        clock = time.perf_counter_ns
+        marks: List[Tuple[str, int]] = []
+        t = clock()
+
+        img = bgra_view(raw, width, height)
+        if cfg.trim_px > 0:
+            img = trim(img, cfg.trim_px)
+            marks.append(("trim", clock()))
+        if cfg.crop:
+            y0, y1, x0, x1 = content_box(img[..., 1], cfg.crop_tolerance, cfg.crop_pad)
+            img = img[y0:y1, x0:x1]
+            marks.append(("crop", clock()))
+        img = to_gray(img)
+        marks.append(("gray", clock()))
+        if cfg.stretch:
+            img = stretch(img, cfg.stretch_low, cfg.stretch_high)
+            marks.append(("stretch", clock()))
+        if cfg.binarize:
+            img = binarize(img, cfg.block, cfg.offset, cfg.invert)
+            marks.append(("binarize", clock()))
+        elif cfg.invert == "yes" or (cfg.invert == "auto" and is_light_on_dark(img)):
+            img = 255 - img
+        if cfg.upscale > 1:
+            img = upscale(img, cfg.upscale)
+            marks.append(("upscale", clock()))
+
+        tm = self.times
+        tm.last_ms = {}
+        for name, end in marks:
+            ms = (end - t) / 1e6
+            tm.last_ms[name] = ms
+            tm.total_ms[name] = tm.total_ms.get(name, 0.0) + ms
+            t = end
+        tm.calls += 1
+        return img
+
+
+# --------------------
+# Steps
+# --------------------
+def trim(img, px: int):
+    h, w = img.shape[:2]
+    px = min(px, (h - 1) // 2, (w - 1) // 2)
+    return img[px:h - px, px:w - px] if px > 0 else img
+
+
+def to_gray(bgra):
+    """Integer BT.601 luma: (29 B + 150 G + 77 R) >> 8."""
+    y = np.multiply(bgra[..., 0], 29, dtype=np.uint16)
+    y += np.multiply(bgra[..., 1], 150, dtype=np.uint16)
+    y += np.multiply(bgra[..., 2], 77, dtype=np.uint16)
+    y >>= 8
+    return y.astype(np.uint8)
+
+
+def _background(plane) -> int:
+    edges = np.concatenate((plane[0], plane[-1], plane[:, 0], plane[:, -1]))
+    return int(np.median(edges))
+
+
+def panel_box(plane, tolerance: int = 12, min_share: float = 0.5) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (y0, y1, x0, x1) of the tooltip panel in a 2-D plane, or None. The panel
+    colour is the most common value (tooltip panels are large flat areas; scenery
+    and text are not), and the panel spans the rows, then columns, where at least
+    `min_share` of the pixels are within `tolerance` of it. That leaves out
+    scenery around the tooltip and its frame lines.
+    """
+    found = _panel(plane, tolerance, min_share)
+    return found[0] if found is not None else None
+
+
+def _panel(plane, tolerance: int, min_share: float):
+    """(panel box, mask of non-panel pixels) or None."""
+    h, w = plane.shape
+    if h < 3 or w < 3:
+        return None
+    sample = np.ascontiguousarray(plane[::4, ::4]).ravel()
+    bg = int(np.bincount(sample, minlength=256).argmax())
+    lo, hi = max(0, bg - tolerance), min(255, bg + tolerance)
+    # outside [lo, hi] in one compare: values below lo wrap around past hi - lo.
+    ink = (plane - np.uint8(lo)) > np.uint8(hi - lo)
+
+    rows = np.flatnonzero(np.count_nonzero(ink, axis=1) <= w * (1.0 - min_share))
+    if not len(rows):
+        return None
+    y0, y1 = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(np.count_nonzero(ink[y0:y1], axis=0) <= (y1 - y0) * (1.0 - min_share))
+    if not len(cols):
+        return None
+    return (y0, y1, int(cols[0]), int(cols[-1]) + 1), ink
+
+
+def content_box(plane, tolerance: int = 12, pad: int = 4, min_share: float = 0.5) -> Tuple[int, int, int, int]:
+    """
+    (y0, y1, x0, x1) of the text on a tooltip panel (see panel_box): the rows and
+    columns of the panel holding non-panel pixels, plus `pad`. Lines that are
+    almost solid (frames, separators at the edge) do not count. The whole plane
+    when no panel or nothing on it is found.
+    """
+    h, w = plane.shape
+    found = _panel(plane, tolerance, min_share)
+    if found is None:
+        return 0, h, 0, w
+    (py0, py1, px0, px1), ink = found
+    panel = ink[py0:py1]
+    text = panel[:, px0:px1]
+    th, tw = text.shape
+    solid_rows = np.count_nonzero(text, axis=1) >= tw * 0.9
+    solid_cols = np.count_nonzero(text, axis=0) >= th * 0.9
+    text_rows = np.flatnonzero(text[:, ~solid_cols].any(axis=1) & ~solid_rows)
+    text_cols = np.flatnonzero(text[~solid_rows].any(axis=0) & ~solid_cols)
+    if not len(text_rows) or not len(text_cols):
+        return py0, py1, px0, px1
+    return (max(py0, py0 + int(text_rows[0]) - pad), min(py1, py0 + int(text_rows[-1]) + 1 + pad),
+            max(px0, px0 + int(text_cols[0]) - pad), min(px1, px0 + int(text_cols[-1]) + 1 + pad))
+
+
+def stretch(gray, low: float = 1.0, high: float = 99.0):
+    """Linear contrast stretch between two percentiles, through a 256-entry lookup table."""
+    hist = np.bincount(gray.ravel(), minlength=256)
+    cdf = np.cumsum(hist)
+    n = int(cdf[-1])
+    if n == 0:
+        return gray
+    lo = int(np.searchsorted(cdf, n * low / 100.0, "right"))
+    hi = int(np.searchsorted(cdf, n * high / 100.0, "left"))
+    if hi <= lo:
+        return gray
+    lut = np.clip((np.arange(256, dtype=np.int32) - lo) * 255 // (hi - lo), 0, 255).astype(np.uint8)
+    return lut[gray]
+
+
+def is_light_on_dark(gray) -> bool:
+    return _background(gray) < 128
+
+
+def binarize(gray, block: int = 25, offset: int = 10, invert: str = "auto"):
+    """
+    Adaptive threshold against the local mean: a pixel is ink when it is
+    `offset` darker than the mean of its block x block neighbourhood (box sums
+    from running sums over a reflect-padded copy). Output is 0 for ink and 255
+    for paper.
+    """
+    if invert == "yes" or (invert == "auto" and is_light_on_dark(gray)):
+        gray = 255 - gray
+    r = max(1, block // 2)
+    k = 2 * r + 1
+    acc = np.int32 if gray.size < (1 << 23) else np.int64
+    padded = np.pad(gray, ((r + 1, r), (r + 1, r)), mode="reflect")
+    c = np.cumsum(padded, axis=0, dtype=acc)
+    v = c[k:] - c[:-k]                  # vertical window sums
+    np.cumsum(v, axis=1, out=v)
+    s = v[:, k:] - v[:, :-k]            # k x k window sums, same shape as gray
+    # gray < mean - offset  <=>  gray * k^2 < sum - offset * k^2  (no division)
+    area = k * k
+    s -= offset * area
+    lhs = gray.astype(acc)
+    lhs *= area
+    return (lhs >= s).view(np.uint8) * np.uint8(255)
+
+
+def upscale(gray, factor: int):
+    """Nearest-neighbour zoom by an integer factor."""
+    h, w = gray.shape
+    wide = np.repeat(gray, factor, axis=1)
+    out = np.empty((h, factor, w * factor), dtype=gray.dtype)
+    out[...] = wide[:, None, :]
+    return out.reshape(h * factor, w * factor)
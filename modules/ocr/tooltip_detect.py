@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+from .preprocess import bgra_view, panel_box
+
+# Finds a tooltip on screen by its frame: a rectangle of lines in one border
+# colour. Horizontal lines are looked for on every `step`-th column (all rows),
+# vertical lines on every `step`-th row (all columns), so thin lines are never
+# skipped while only about 2/step of the pixels are tested. Row/column
+# projections of the colour mask give line candidates; a top and bottom line
+# with matching ends plus both sides make a frame.
+
+Box = Tuple[int, int, int, int]             # x, y, w, h
+RGB = Tuple[int, int, int]
+GrabBox = Callable[[Box], Tuple[bytes, int, int]]  # screen box -> (BGRA bytes, width, height)
+
+
+def learn_border(raw, width: int, height: int, ring: int = 3) -> Optional[RGB]:
+    """
+    The frame colour of a tooltip filling most of a BGRA image (e.g. a grab of a
+    hand-set capture region): the most common colour just outside its panel.
+    """
+    px = bgra_view(raw, width, height)
+    box = panel_box(px[..., 1])
+    if box is None:
+        return None
+    y0, y1, x0, x1 = box
+    oy0, oy1 = max(0, y0 - ring), min(height, y1 + ring)
+    ox0, ox1 = max(0, x0 - ring), min(width, x1 + ring)
+    outer = px[oy0:oy1, ox0:ox1, :3].reshape(-1, 3)
+    inside = np.zeros((oy1 - oy0, ox1 - ox0), dtype=bool)
+    inside[y0 - oy0:y1 - oy0, x0 - ox0:x1 - ox0] = True
+    ring_px = outer[~inside.ravel()]
+    if not len(ring_px):
+        return None
+    colours, counts = np.unique(ring_px, axis=0, return_counts=True)
+    b, g, r = (int(c) for c in colours[counts.argmax()])
+    return r, g, b
+
+
+def parse_rgb(text: str) -> Optional[RGB]:
+    text = (text or "").strip().lstrip("#")
+    if len(text) != 6:
+        return None
+    try:
+        v = int(text, 16)
+    except ValueError:
+        return None
+    return (v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF
+
+
+def format_rgb(rgb: RGB) -> str:
+    return "#%02x%02x%02x" % rgb
+
+
+@dataclass
+class _Line:
+    y0: int
+    y1: int   # exclusive
+    x0: int
+    x1: int   # exclusive (approximate: step-sampled)
+
+
+class TooltipDetector:
+    """Locates the frame of a tooltip drawn in `border` colour in a BGRA image."""
+
+    def __init__(self, border: RGB, tolerance: int = 24, step: int = 4,
+                 min_size: Tuple[int, int] = (120, 48), side_share: float = 0.7) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed. Install requirements first.")
+        self.border = border
+        self.tolerance = tolerance
+        self.step = max(1, int(step))
+        self.min_w, self.min_h = min_size
+        self.side_share = side_share
+
+    def _mask(self, px):
+        # Per channel |c - border| <= tolerance, one wrapping compare each (see preprocess.content_box).
+        r, g, b = self.border
+        t = self.tolerance
+        m = None
+        for ch, c in ((0, b), (1, g), (2, r)):
+            lo, hi = max(0, c - t), min(255, c + t)
+            ok = (px[..., ch] - np.uint8(lo)) <= np.uint8(hi - lo)
+            m = ok if m is None else (m & ok)
+        return m
+
+    def find(self, raw, width: int, height: int, origin: Tuple[int, int] = (0, 0),
+             prefer: Optional[Box] = None) -> Optional[Box]:
+        """
+        The frame's box in the coordinates of `origin` (the image's top-left on
+        screen), or None. With several candidates the one closest to `prefer`
+        (else the largest) wins.
+        """
+        px = bgra_view(raw, width, height)
+        s = self.step
+        hmask = self._mask(px[:, ::s])   # all rows, every s-th column: horizontal lines
+        vmask = self._mask(px[::s, :])   # every s-th row, all columns: vertical lines
+
+        lines = self._lines(hmask)
+        best: Optional[Box] = None
+        best_score = None
+        for i, top in enumerate(lines):
+            for bottom in lines[i + 1:]:
+                if bottom.y1 - top.y0 < self.min_h:
+                    continue
+                if abs(top.x0 - bottom.x0) > 2 * s or abs(top.x1 - bottom.x1) > 2 * s:
+                    continue
+                box = self._sides(vmask, top, bottom)
+                if box is None:
+                    continue
+                box = (box[0] + origin[0], box[1] + origin[1], box[2], box[3])
+                score = _distance(box, prefer) if prefer is not None else -box[2] * box[3]
+                if best_score is None or score < best_score:
+                    best, best_score = box, score
+        return best
+
+    def _lines(self, hmask) -> List[_Line]:
+        # Rows with a long enough run of border pixels; adjacent rows are one line.
+        s = self.step
+        min_run = max(2, self.min_w // s)
+        rows = np.flatnonzero(np.count_nonzero(hmask, axis=1) >= min_run)
+        lines: List[_Line] = []
+        for y in rows.tolist():
+            a, b = _longest_run(hmask[y])
+            if b - a < min_run:
+                continue
+            x0, x1 = a * s, b * s
+            last = lines[-1] if lines else None
+            if last is not None and last.y1 == y and abs(last.x0 - x0) <= s and abs(last.x1 - x1) <= s:
+                last.y1 = y + 1
+            else:
+                lines.append(_Line(y, y + 1, x0, x1))
+            if len(lines) > 64:  # a screen full of border colour: not a tooltip frame
+                break
+        return lines
+
+    def _sides(self, vmask, top: _Line, bottom: _Line) -> Optional[Box]:
+        # Left/right edges: the outermost columns near the line ends that are border
+        # colour along most of the height. Exact to the pixel (vmask has all columns).
+        s = self.step
+        r0, r1 = -(-top.y0 // s), bottom.y1 // s
+        if r1 - r0 < 2:
+            return None
+        band = vmask[r0:r1]
+        counts = np.count_nonzero(band, axis=0)
+        need = (r1 - r0) * self.side_share
+        w = vmask.shape[1]
+        x0a, x0b = max(0, min(top.x0, bottom.x0) - s), min(w, max(top.x0, bottom.x0) + s)
+        x1a, x1b = max(0, min(top.x1, bottom.x1) - 2 * s), min(w, max(top.x1, bottom.x1) + s)
+        left = np.flatnonzero(counts[x0a:x0b] >= need)
+        right = np.flatnonzero(counts[x1a:x1b] >= need)
+        if not len(left) or not len(right):
+            return None
+        x0 = x0a + int(left[0])
+        x1 = x1a + int(right[-1]) + 1
+        if x1 - x0 < self.min_w:
+            return None
+        return x0, top.y0, x1 - x0, bottom.y1 - top.y0
+
+
+def _longest_run(row) -> Tuple[int, int]:
+    padded = np.concatenate(([False], row, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    if not len(edges):
+        return 0, 0
+    starts, ends = edges[::2], edges[1::2]
+    k = int(np.argmax(ends - starts))
+    return int(starts[k]), int(ends[k])
+
+
+def _distance(a: Box, b: Box) -> float:
+    ax, ay = a[0] + a[2] / 2.0, a[1] + a[3] / 2.0
+    bx, by = b[0] + b[2] / 2.0, b[1] + b[3] / 2.0
+    return (ax - bx) ** 2 + (ay - by) ** 2
+
+
+class TooltipTracker:
+    """
+    Keeps a tooltip's box up to date. While it is known only a window around it
+    (`margin` pixels each side) is grabbed and searched; when it is lost, the
+    whole screen is scanned, at most every `rescan_s` seconds.
+    """
+
+    def __init__(self, detector: TooltipDetector, margin: int = 160, rescan_s: float = 0.5) -> None:
+        self.detector = detector
+        self.margin = margin
+        self.rescan_s = rescan_s
+        self.box: Optional[Box] = None
+        self.lost = 0          # consecutive misses
+        self.full_scans = 0
+        self.last_ms = 0.0     # time of the last locate() (grabs included)
+        self._next_full = 0.0
+
+    def locate(self, grab: GrabBox, screen: Optional[Tuple[int, int]]) -> Optional[Box]:
+        """Returns the current box (None if no tooltip is visible). `screen` is (w, h), None = no full scans."""
+        t0 = time.perf_counter()
+        found = None
+        if self.box is not None:
+            area = _expand(self.box, self.margin, screen)
+            raw, w, h = grab(area)
+            found = self.detector.find(raw, w, h, origin=(area[0], area[1]), prefer=self.box)
+        if found is None and screen is not None and t0 >= self._next_full:
+            self._next_full = t0 + self.rescan_s
+            self.full_scans += 1
+            raw, w, h = grab((0, 0, screen[0], screen[1]))
+            found = self.detector.find(raw, w, h, prefer=self.box)
+        if found is None:
+            self.lost += 1  # keep the last box: tooltips tend to reappear where they were
+        else:
+            self.lost = 0
+            self.box = found
+        self.last_ms = (time.perf_counter() - t0) * 1000.0
+        return found
+
+
+def _expand(box: Box, margin: int, screen: Optional[Tuple[int, int]]) -> Box:
+    x, y, w, h = box
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = x + w + margin, y + h + margin
+    if screen is not None:
+        x1, y1 = min(screen[0], x1), min(screen[1], y1)
+    return x0, y0, x1 - x0, y1 - y0
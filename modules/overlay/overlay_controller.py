@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Deque, Dict, List
+
+from ..timers.alarms import AlarmFired
+from ..timers.schedule_cache import ScheduleCache
+from .timer_text import timer_lines
 
 try:
     # Timer overlay is pure tkinter
@@ -51,3 +57,173 @@ class OverlayController:
             return bool(w is not None and w.winfo_exists())
         except Exception:
             return False
+
+
+# --------------------
+# Overlay host: many widgets, one clock
+# --------------------
+class OverlayWidget:
+    """
+    One piece of overlay content. Subclasses set `widget_id` / `interval_ms` and
+    return their current text from render(); an empty string hides the widget.
+    """
+    widget_id: str = "widget"
+    title: str = "Widget"
+    interval_ms: int = 1000
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+
+class OverlayHost:
+    """
+    Drives every overlay widget from a single clock.
+
+    Each widget is rendered only when its own interval is due; widgets due within
+    `coalesce_ms` of each other share one tick. tick() returns only the widgets
+    whose text changed, so the window repaints/relayouts just those. The caller
+    (Qt or Tk) schedules its next single-shot timer from next_due_in().
+    """
+
+    def __init__(self, coalesce_ms: int = 15) -> None:
+        self.coalesce_s = max(0, coalesce_ms) / 1000.0
+        self._widgets: Dict[str, OverlayWidget] = {}
+        self._due: Dict[str, float] = {}
+        self._text: Dict[str, str] = {}
+
+        # Self-measurement for the HUD widget.
+        self._tick_times: Deque[float] = deque(maxlen=64)
+        self.last_tick_ms = 0.0
+        self.renders = 0
+        self.repaints = 0
+
+    def add(self, widget: OverlayWidget) -> None:
+        self._widgets[widget.widget_id] = widget
+        self._due[widget.widget_id] = 0.0
+        self._text.pop(widget.widget_id, None)
+
+    def remove(self, widget_id: str) -> None:
+        self._widgets.pop(widget_id, None)
+        self._due.pop(widget_id, None)
+        self._text.pop(widget_id, None)
+
+    def widgets(self) -> List[OverlayWidget]:
+        return list(self._widgets.values())
+
+    def get(self, widget_id: str) -> Optional[OverlayWidget]:
+        return self._widgets.get(widget_id)
+
+    def text(self, widget_id: str) -> str:
+        return self._text.get(widget_id, "")
+
+    def invalidate(self, widget_id: Optional[str] = None) -> None:
+        """Make a widget (or all of them) due on the next tick."""
+        for wid in ([widget_id] if widget_id is not None else list(self._due)):
+            if wid in self._due:
+                self._due[wid] = 0.0
+
+    def tick(self, now: Optional[float] = None) -> Dict[str, str]:
+        now = time.monotonic() if now is None else now
+        t0 = time.perf_counter()
+        horizon = now + self.coalesce_s
+
+        changed: Dict[str, str] = {}
+        for wid, due in list(self._due.items()):
+            if due > horizon:
+                continue
+            w = self._widgets[wid]
+            try:
+                text = w.render()
+            except Exception as ex:
+                text = f"{w.title} error: {ex}"
+            self.renders += 1
+            self._due[wid] = now + max(1, w.interval_ms) / 1000.0
+            if text != self._text.get(wid):
+                self._text[wid] = text
+                changed[wid] = text
+
+        self.repaints += len(changed)
+        self._tick_times.append(now)
+        self.last_tick_ms = (time.perf_counter() - t0) * 1000.0
+        return changed
+
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the earliest widget is due (None when there are no widgets)."""
+        if not self._due:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._due.values()) - now)
+
+    def tick_rate(self) -> float:
+        t = self._tick_times
+        if len(t) < 2 or t[-1] <= t[0]:
+            return 0.0
+        return (len(t) - 1) / (t[-1] - t[0])
+
+
+class EventTimersWidget(OverlayWidget):
+    widget_id = "timers"
+    title = "Event timers"
+    interval_ms = 1000
+
+    def __init__(self, schedule: ScheduleCache) -> None:
+        self._schedule = schedule
+        self._alarm: Optional[AlarmFired] = None
+        self._alarm_until = 0.0
+
+    def show_alarm(self, fired: AlarmFired, seconds: float = 15.0) -> None:
+        self._alarm = fired
+        self._alarm_until = time.monotonic() + seconds
+
+    def render(self) -> str:
+        alarm = self._alarm if time.monotonic() < self._alarm_until else None
+        return "\n".join(timer_lines(self._schedule, alarm))
+
+
+class CaptureStatusWidget(OverlayWidget):
+    widget_id = "capture"
+    title = "Capture status"
+    interval_ms = 250
+
+    def __init__(self, status: Callable[[], Dict[str, Any]]) -> None:
+        self._status = status
+
+    def render(self) -> str:
+        st = self._status()
+        if not st.get("running"):
+            return ""
+        state = "PAUSED" if st.get("paused") else "REC"
+        return f"{state}  {st.get('events_written', 0)} events"
+
+
+class OcrReadoutWidget(OverlayWidget):
+    widget_id = "ocr"
+    title = "OCR readout"
+    interval_ms = 250
+
+    def __init__(self, text: Callable[[], str], max_lines: int = 6) -> None:
+        self._text = text
+        self.max_lines = max_lines
+
+    def render(self) -> str:
+        lines = (self._text() or "").strip().splitlines()
+        return "\n".join(lines[: self.max_lines])
+
+
+class HudWidget(OverlayWidget):
+    widget_id = "hud"
+    title = "FPS / latency HUD"
+    interval_ms = 500
+
+    def __init__(self, host: OverlayHost, extra: Optional[Callable[[], str]] = None) -> None:
+        self._host = host
+        self.extra = extra  # e.g. the capture/OCR rates of the preview page
+
+    def render(self) -> str:
+        h = self._host
+        text = f"overlay {h.tick_rate():.1f} ticks/s | tick {h.last_tick_ms:.2f} ms"
+        if self.extra is not None:
+            more = self.extra()
+            if more:
+                text += "\n" + more
+        return text
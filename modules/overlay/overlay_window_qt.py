@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from PySide6.QtCore import Qt, QTimer, QPoint
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
+
+from .overlay_controller import OverlayHost, OverlayWidget
+
+_STYLE = """
+QLabel#OverlayText {
+    background: rgba(11, 15, 20, 217);
+    color: #d7e3ff;
+    font-family: "Segoe UI";
+    font-size: 12pt;
+    font-weight: bold;
+    border-radius: 8px;
+    padding: 8px 10px;
+}
+"""
+
+
+class OverlayWindow(QWidget):
+    """
+    Frameless, translucent, always-on-top window that composites every overlay widget.
+
+    All widgets share one single-shot QTimer armed for the host's next due time, and
+    only labels whose text changed are touched, followed by at most one relayout.
+    Toggling is a plain show()/hide(); the clock only runs while visible.
+    """
+
+    def __init__(self, host: Optional[OverlayHost] = None, x: int = 30, y: int = 30, click_through: bool = False):
+        super().__init__(
+            None,
+            Qt.WindowType.FramelessWindowHint
+            | Qt.WindowType.WindowStaysOnTopHint
+            | Qt.WindowType.Tool,
+        )
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating, True)
+        self.setStyleSheet(_STYLE)
+        self.move(x, y)
+
+        self.host = host or OverlayHost()
+        self._labels: Dict[str, QLabel] = {}
+        self._drag_from: Optional[QPoint] = None
+
+        self._lay = QVBoxLayout(self)
+        self._lay.setContentsMargins(0, 0, 0, 0)
+        self._lay.setSpacing(6)
+
+        self._clock = QTimer(self)
+        self._clock.setSingleShot(True)
+        self._clock.timeout.connect(self._on_clock)
+
+        for w in self.host.widgets():
+            self._add_label(w.widget_id)
+
+        self.set_click_through(click_through)
+
+    # --------------------
+    # Widgets
+    # --------------------
+    def add_widget(self, widget: OverlayWidget) -> None:
+        self.host.add(widget)
+        if widget.widget_id not in self._labels:
+            self._add_label(widget.widget_id)
+        self.poke()
+
+    def remove_widget(self, widget_id: str) -> None:
+        self.host.remove(widget_id)
+        lbl = self._labels.pop(widget_id, None)
+        if lbl is not None:
+            self._lay.removeWidget(lbl)
+            lbl.deleteLater()
+            self.adjustSize()
+
+    def poke(self, widget_id: Optional[str] = None) -> None:
+        """Re-render a widget (or all) now instead of waiting for its interval."""
+        self.host.invalidate(widget_id)
+        if self.isVisible():
+            self._clock.start(0)
+
+    def _add_label(self, widget_id: str) -> None:
+        lbl = QLabel("")
+        lbl.setObjectName("OverlayText")
+        lbl.setVisible(False)
+        self._labels[widget_id] = lbl
+        self._lay.addWidget(lbl)
+
+    def set_click_through(self, on: bool) -> None:
+        """Let mouse input pass through to the game (the window can't be dragged then)."""
+        visible = self.isVisible()
+        self.setWindowFlag(Qt.WindowType.WindowTransparentForInput, bool(on))
+        if visible:
+            # Changing window flags hides the window; bring it back.
+            self.show()
+
+    # --------------------
+    # Qt events
+    # --------------------
+    def showEvent(self, event):
+        self.host.invalidate()
+        self._clock.start(0)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._clock.stop()
+        super().hideEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_from = event.globalPosition().toPoint() - self.frameGeometry().topLeft()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag_from is not None and event.buttons() & Qt.MouseButton.LeftButton:
+            self.move(event.globalPosition().toPoint() - self._drag_from)
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_from = None
+        super().mouseReleaseEvent(event)
+
+    def _on_clock(self):
+        changed = self.host.tick()
+        for wid, text in changed.items():
+            lbl = self._labels.get(wid)
+            if lbl is None:
+                continue
+            lbl.setText(text)
+            lbl.setVisible(bool(text))
+        if changed:
+            self.adjustSize()
+
+        due = self.host.next_due_in()
+        if due is not None and self.isVisible():
+            self._clock.start(int(due * 1000))
@@ -1,31 +1,40 @@
 from __future__ import annotations
 
+import queue
+import time
 import tkinter as tk
-from datetime import datetime
+from typing import Optional
 
-from modules.timers.d4_event_schedule import fetch_events, next_by_kind
+from modules.overlay.timer_text import timer_lines
+from modules.timers.alarms import AlarmFired, AlarmScheduler
+from modules.timers.schedule_cache import ScheduleCache
 
-
-def _fmt_countdown(target: datetime) -> str:
-    now = datetime.now(tz=target.tzinfo)
-    delta = target - now
-    total = int(delta.total_seconds())
-    if total <= 0:
-        return "NOW"
-
-    h = total // 3600
-    m = (total % 3600) // 60
-    s = total % 60
-
-    if h > 0:
-        return f"{h}:{m:02d}:{s:02d}"
-    return f"{m}:{s:02d}"
+_ALARM_SHOW_S = 15.0
 
 
 class TimerOverlay(tk.Toplevel):
-    def __init__(self, master: tk.Tk, x: int = 30, y: int = 30):
+    def __init__(
+        self,
+        master: tk.Tk,
+        x: int = 30,
+        y: int = 30,
+        cache: Optional[ScheduleCache] = None,
+        alarms: Optional[AlarmScheduler] = None,
+    ):
         super().__init__(master)
 
+        # The 1 s tick only reads this cache; fetching happens on its own thread.
+        self._owns_cache = cache is None
+        self._cache = cache or ScheduleCache()
+
+        # Alarm fires arrive on the scheduler thread; Tk is only touched from _tick.
+        self._alarms = alarms
+        self._alarm_q: "queue.SimpleQueue[AlarmFired]" = queue.SimpleQueue()
+        self._alarm_last: Optional[AlarmFired] = None
+        self._alarm_until = 0.0
+        if alarms is not None:
+            alarms.add_listener(self._alarm_q.put)
+
         self.overrideredirect(True)
         self.attributes("-topmost", True)
         self.attributes("-alpha", 0.85)
@@ -58,28 +67,24 @@ class TimerOverlay(tk.Toplevel):
         self.geometry(f"+{wx + dx}+{wy + dy}")
 
     def start(self):
+        self._cache.start()
         self._tick()
 
+    def destroy(self):
+        if self._alarms is not None:
+            self._alarms.remove_listener(self._alarm_q.put)
+        if self._owns_cache:
+            self._cache.stop()
+        super().destroy()
+
     def _tick(self):
         try:
-            events = fetch_events(limit=40)
-            nxt = next_by_kind(events)
-
-            lines = []
-
-            if nxt.get("helltide"):
-                lines.append(f"Helltide: {_fmt_countdown(nxt['helltide'].starts_at)}")
-            if nxt.get("legion"):
-                lines.append(f"Legion:   {_fmt_countdown(nxt['legion'].starts_at)}")
-            if nxt.get("worldboss"):
-                wb = nxt["worldboss"]
-                boss = wb.label or "World Boss"
-                lines.append(f"WB ({boss}): {_fmt_countdown(wb.starts_at)}")
-
-            if not lines:
-                lines = ["No upcoming events"]
+            while not self._alarm_q.empty():
+                self._alarm_last = self._alarm_q.get_nowait()
+                self._alarm_until = time.monotonic() + _ALARM_SHOW_S
+            alarm = self._alarm_last if time.monotonic() < self._alarm_until else None
 
-            self.label.config(text="\n".join(lines))
+            self.label.config(text="\n".join(timer_lines(self._cache, alarm)))
         except Exception as ex:
             self.label.config(text=f"Timer error:\n{ex}")
 
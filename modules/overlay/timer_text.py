@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from ..timers.alarms import AlarmFired
+from ..timers.schedule_cache import ScheduleCache
+
+
+def fmt_countdown(target: datetime, now: Optional[datetime] = None) -> str:
+    now = now or datetime.now(tz=target.tzinfo)
+    delta = target - now
+    total = int(delta.total_seconds())
+    if total <= 0:
+        return "NOW"
+
+    h = total // 3600
+    m = (total % 3600) // 60
+    s = total % 60
+
+    if h > 0:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m}:{s:02d}"
+
+
+def timer_lines(cache: ScheduleCache, alarm: Optional[AlarmFired] = None) -> List[str]:
+    """Countdown lines shared by the Tk and Qt timer overlays."""
+    nxt = cache.next_by_kind()
+
+    lines = []
+
+    if nxt.get("helltide"):
+        lines.append(f"Helltide: {fmt_countdown(nxt['helltide'].starts_at)}")
+    if nxt.get("legion"):
+        lines.append(f"Legion:   {fmt_countdown(nxt['legion'].starts_at)}")
+    if nxt.get("worldboss"):
+        wb = nxt["worldboss"]
+        boss = wb.label or "World Boss"
+        lines.append(f"WB ({boss}): {fmt_countdown(wb.starts_at)}")
+
+    if not lines:
+        lines = ["No upcoming events"]
+
+    if alarm is not None:
+        name = alarm.event.label or alarm.alarm.kind.title()
+        lines.insert(0, f"ALARM: {name} in {fmt_countdown(alarm.event.starts_at)}")
+
+    # Without a scrape the countdowns come from the offline rotation engine.
+    if not cache.has_data():
+        lines.append("(predicted - offline)" if cache.last_error else "(predicted - loading...)")
+    elif cache.stale:
+        lines.append("(offline - last known schedule)")
+
+    return lines
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dateutil import tz
+
+from .d4_event_schedule import D4Event
+
+
+@dataclass(frozen=True)
+class Alarm:
+    alarm_id: int
+    kind: str                 # "helltide" | "legion" | "worldboss" | ...
+    lead: timedelta           # fire this long before the event starts
+    label: str = ""
+
+
+@dataclass(frozen=True)
+class AlarmFired:
+    alarm: Alarm
+    event: D4Event
+    fired_at: datetime
+
+
+# Callable(kind, after) -> next event of that kind starting strictly after `after`.
+NextEventFn = Callable[[str, datetime], Optional[D4Event]]
+
+
+class AlarmScheduler:
+    """
+    "Notify me N minutes before the next <kind>" for any number of alarms.
+
+    Pending deadlines live in one heap of (fire_at, seq, alarm_id, event). A single
+    thread sleeps on a condition until the earliest deadline (or until the heap
+    changes), so there is no per-second polling and each fire/re-arm is O(log n).
+
+    Listeners are called on the scheduler thread; GUI code must marshal to its
+    own thread (Qt: emit a signal, Tk: push to a queue read from the tick).
+    """
+
+    def __init__(self, next_event: NextEventFn) -> None:
+        self._next_event = next_event
+
+        self._cond = threading.Condition()
+        self._alarms: Dict[int, Alarm] = {}
+        self._heap: List[Tuple[float, int, int, D4Event]] = []
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._listeners: List[Callable[[AlarmFired], None]] = []
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._fired = 0
+
+    # --------------------
+    # Lifecycle
+    # --------------------
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="d4-alarms", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    # --------------------
+    # Alarms / listeners
+    # --------------------
+    def add_listener(self, fn: Callable[[AlarmFired], None]) -> None:
+        with self._cond:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn: Callable[[AlarmFired], None]) -> None:
+        with self._cond:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def add_alarm(self, kind: str, lead_minutes: float, label: str = "") -> Alarm:
+        alarm = Alarm(alarm_id=next(self._ids), kind=kind, lead=timedelta(minutes=lead_minutes), label=label)
+        with self._cond:
+            self._alarms[alarm.alarm_id] = alarm
+            self._arm(alarm, datetime.now(tz=tz.tzlocal()))
+            self._cond.notify()
+        return alarm
+
+    def remove_alarm(self, alarm_id: int) -> None:
+        # Heap entries of removed alarms are discarded lazily when they surface.
+        with self._cond:
+            self._alarms.pop(alarm_id, None)
+            self._cond.notify()
+
+    def alarms(self) -> List[Alarm]:
+        with self._cond:
+            return list(self._alarms.values())
+
+    def reschedule(self) -> None:
+        """Re-arm every alarm against the current schedule (call after a refresh)."""
+        now = datetime.now(tz=tz.tzlocal())
+        with self._cond:
+            self._heap = []
+            for alarm in self._alarms.values():
+                self._arm(alarm, now)
+            self._cond.notify()
+
+    def status(self) -> Dict[str, object]:
+        with self._cond:
+            nxt = self._heap[0][0] - time.time() if self._heap else None
+            return {
+                "alarms": len(self._alarms),
+                "pending": len(self._heap),
+                "fired": self._fired,
+                "next_in_s": nxt,
+            }
+
+    # --------------------
+    # Internals (call with self._cond held)
+    # --------------------
+    def _arm(self, alarm: Alarm, now: datetime) -> None:
+        # First occurrence whose fire time is still ahead of `now`.
+        ev = self._next_event(alarm.kind, now + alarm.lead)
+        if ev is None:
+            return
+        fire_at = (ev.starts_at - alarm.lead).timestamp()
+        heapq.heappush(self._heap, (fire_at, next(self._seq), alarm.alarm_id, ev))
+
+    def _loop(self) -> None:
+        while True:
+            due: List[AlarmFired] = []
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0][0] - time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+
+                now_ts = time.time()
+                now = datetime.now(tz=tz.tzlocal())
+                while self._heap and self._heap[0][0] <= now_ts:
+                    _, _, alarm_id, ev = heapq.heappop(self._heap)
+                    alarm = self._alarms.get(alarm_id)
+                    if alarm is None:
+                        continue
+                    due.append(AlarmFired(alarm=alarm, event=ev, fired_at=now))
+                    # Re-arm for the occurrence after this one.
+                    nxt = self._next_event(alarm.kind, ev.starts_at)
+                    if nxt is not None:
+                        fire_at = (nxt.starts_at - alarm.lead).timestamp()
+                        heapq.heappush(self._heap, (fire_at, next(self._seq), alarm_id, nxt))
+                self._fired += len(due)
+                listeners = list(self._listeners)
+
+            for fired in due:
+                for fn in listeners:
+                    try:
+                        fn(fired)
+                    except Exception:
+                        pass
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Union
+import codecs
+import json
+import os
 import re
+import time
 
 import requests
-from bs4 import BeautifulSoup
 from dateutil import tz
 
+from .event_index import EventIndex
+
+try:
+    from ...paths import data_dir
+except ImportError:  # loaded as a top-level ``modules`` package
+    from paths import data_dir
+
 
 HELLTIDES_SCHEDULE_URL = "https://helltides.com/schedule"
+_CACHE_VERSION = 1
 
 
 @dataclass
@@ -20,76 +33,310 @@ class D4Event:
     label: str = ""
 
 
+@dataclass
+class ScheduleResult:
+    events: List[D4Event] = field(default_factory=list)
+    stale: bool = False         # True when served from disk without reaching the site
+    fetched_at: float = 0.0     # epoch seconds of the last successful contact
+    not_modified: bool = False  # True when the site answered 304
+
+
+_LOCAL_TZ = tz.tzlocal()
+
+# "12/26/2025 5:00 PM" with the fields captured so no strptime is needed.
+_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})\s+(\d{1,2}):(\d{2})\s*([AaPp])[Mm]")
+
+_BOSS_NAMES = frozenset({"Avarice", "Ashava", "Wandering Death", "Azmodan"})
+
+# Lowercase label keyword -> kind. New event types only need an entry here.
+KIND_KEYWORDS: Dict[str, str] = {
+    "helltide": "helltide",
+    "legion": "legion",
+    "world boss": "worldboss",
+}
+
+# Kinds the overlay shows, in display order.
+MAIN_KINDS = ("helltide", "legion", "worldboss")
+
+# Elements whose text is one schedule entry, and elements that never hold any.
+_ROW_TAGS = frozenset({"tr", "li"})
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "head"})
+
+
 def _now_local():
-    return datetime.now(tz=tz.tzlocal())
+    return datetime.now(tz=_LOCAL_TZ)
 
 
-def _parse_time_local(s: str) -> Optional[datetime]:
+@lru_cache(maxsize=2048)
+def _decode_time(mo: str, day: str, year: str, hh: str, mm: str, ampm: str) -> Optional[datetime]:
     try:
-        dt_naive = datetime.strptime(s.strip(), "%m/%d/%Y %I:%M %p")
-        return dt_naive.replace(tzinfo=tz.tzlocal())
-    except Exception:
+        h = int(hh) % 12 + (12 if ampm in "Pp" else 0)
+        return datetime(int(year), int(mo), int(day), h, int(mm), tzinfo=_LOCAL_TZ)
+    except ValueError:
         return None
 
 
-def fetch_events(limit: int = 30, timeout: float = 10.0) -> List[D4Event]:
-    r = requests.get(
-        HELLTIDES_SCHEDULE_URL,
-        timeout=timeout,
-        headers={"User-Agent": "Mozilla/5.0"},
-    )
-    r.raise_for_status()
-
-    soup = BeautifulSoup(r.text, "html.parser")
-    text = soup.get_text("\n", strip=True)
-
-    lines = [
-        ln.strip()
-        for ln in text.splitlines()
-        if re.search(r"\d{1,2}/\d{1,2}/\d{4}", ln)
-    ][: max(limit, 1)]
-
-    events: List[D4Event] = []
-    for ln in lines:
-        m = re.match(
-            r"^(\d{1,2}/\d{1,2}/\d{4}\s+\d{1,2}:\d{2}\s+[AP]M)(.*)$",
-            ln,
-        )
-        if not m:
-            continue
+@lru_cache(maxsize=256)
+def classify_label(label: str) -> str:
+    """Event kind for a schedule label ("event" when nothing matches)."""
+    if label in _BOSS_NAMES:
+        return "worldboss"
+    low = label.lower()
+    for keyword, kind in KIND_KEYWORDS.items():
+        if keyword in low:
+            return kind
+    return "event"
 
-        dt_part = m.group(1).strip()
-        tail = m.group(2).strip()
 
-        dt_local = _parse_time_local(dt_part)
-        if not dt_local:
-            continue
+class _ScheduleRowParser(HTMLParser):
+    """
+    Incremental tokenizer that only keeps schedule entries.
+
+    Text inside <tr>/<li> is grouped per row; a row holding a date becomes an
+    event labelled with the text after the date (or the row's other cells).
+    Script/style content is skipped without being buffered.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.events: List[D4Event] = []
+        self._skip = 0
+        self._row: Optional[List[str]] = None
+        self._pending: Optional[datetime] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _ROW_TAGS:
+            self._flush_row()
+            self._row = []
 
-        boss_names = {"Avarice", "Ashava", "Wandering Death", "Azmodan"}
-        if tail in boss_names:
-            kind = "worldboss"
-            label = tail
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            if self._skip:
+                self._skip -= 1
+        elif tag in _ROW_TAGS:
+            self._flush_row()
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._row is not None:
+            self._row.append(data)
+            return
+
+        # Loose text outside a row: a bare date takes the next text node as its label.
+        text = data.strip()
+        if not text:
+            return
+        m = _DATE_RE.search(text)
+        if m is None:
+            if self._pending is not None:
+                self._add(self._pending, text)
+                self._pending = None
+            return
+        self._flush_pending()
+        starts = _decode_time(*m.groups())
+        if starts is None:
+            return
+        tail = text[m.end():].strip()
+        if tail:
+            self._add(starts, tail)
         else:
-            kind = "event"
-            label = tail
+            self._pending = starts
 
-        events.append(D4Event(kind=kind, starts_at=dt_local, label=label))
+    def close(self):
+        super().close()
+        self._flush_row()
+        self._flush_pending()
 
-    now = _now_local()
-    events = [e for e in events if e.starts_at > now]
+    def _add(self, starts: datetime, label: str) -> None:
+        self.events.append(D4Event(kind=classify_label(label), starts_at=starts, label=label))
+
+    def _flush_pending(self) -> None:
+        if self._pending is not None:
+            self._add(self._pending, "")
+            self._pending = None
+
+    def _flush_row(self) -> None:
+        row, self._row = self._row, None
+        if not row:
+            return
+        cells = [c.strip() for c in row]
+        cells = [c for c in cells if c]
+
+        dated = []
+        others = []
+        for c in cells:
+            m = _DATE_RE.search(c)
+            if m is None:
+                others.append(c)
+            else:
+                dated.append((c, m))
+        if not dated:
+            return
+
+        fallback = " ".join(others)
+        for c, m in dated:
+            starts = _decode_time(*m.groups())
+            if starts is None:
+                continue
+            self._add(starts, c[m.end():].strip() or fallback)
+
+
+def _parse_events(html: Union[str, Iterable[str]]) -> List[D4Event]:
+    """Parse schedule entries from the page HTML (a string or an iterable of chunks)."""
+    parser = _ScheduleRowParser()
+    if isinstance(html, str):
+        parser.feed(html)
+    else:
+        for chunk in html:
+            parser.feed(chunk)
+    parser.close()
+
+    events = parser.events
     events.sort(key=lambda e: e.starts_at)
     return events
 
 
-def next_by_kind(events: List[D4Event]) -> Dict[str, Optional[D4Event]]:
-    next_worldboss = next((e for e in events if e.kind == "worldboss"), None)
-    generics = [e for e in events if e.kind == "event"]
+def _iter_text(r: requests.Response, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    for chunk in r.iter_content(chunk_size=chunk_size):
+        if chunk:
+            yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+# --------------------
+# On-disk cache (parsed events + validators for conditional GET)
+# --------------------
+def _cache_path() -> str:
+    d = os.path.join(data_dir(), "cache")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, "helltides_schedule.json")
+
+
+def _read_cache(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != _CACHE_VERSION:
+        return None
+    return data
+
+
+def _write_cache(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _events_to_json(events: List[D4Event]) -> List[Dict[str, Any]]:
+    return [{"kind": e.kind, "ts": e.starts_at.timestamp(), "label": e.label} for e in events]
+
+
+def _events_from_json(rows: List[Dict[str, Any]]) -> List[D4Event]:
+    out: List[D4Event] = []
+    for r in rows or []:
+        try:
+            label = str(r.get("label", ""))
+            kind = str(r["kind"])
+            out.append(D4Event(
+                # Older cache files stored helltides/legions as generic "event".
+                kind=classify_label(label) if kind == "event" else kind,
+                starts_at=datetime.fromtimestamp(float(r["ts"]), tz=_LOCAL_TZ),
+                label=label,
+            ))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+
+def load_cached_schedule(cache_path: Optional[str] = None) -> Optional[ScheduleResult]:
+    """Last known schedule from disk (no network). Always flagged stale."""
+    data = _read_cache(cache_path or _cache_path())
+    if data is None:
+        return None
+    return ScheduleResult(
+        events=_events_from_json(data.get("events")),
+        stale=True,
+        fetched_at=float(data.get("fetched_at", 0.0)),
+    )
+
+
+def fetch_schedule(
+    timeout: float = 10.0,
+    url: str = HELLTIDES_SCHEDULE_URL,
+    cache_path: Optional[str] = None,
+) -> ScheduleResult:
+    """
+    Fetch the full parsed schedule using a conditional GET against the disk cache.
+
+    - 304 Not Modified: cached events are returned without downloading or parsing.
+    - Network/HTTP failure: the last known schedule is returned with stale=True
+      (the error is raised only if nothing is cached yet).
+    """
+    path = cache_path or _cache_path()
+    cached = _read_cache(path)
+    if cached is not None and cached.get("url") != url:
+        cached = None
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        # Streamed so the page is tokenized as it arrives instead of held whole.
+        with requests.get(url, timeout=timeout, headers=headers, stream=True) as r:
+            if r.status_code == 304 and cached is not None:
+                cached["fetched_at"] = time.time()
+                _write_cache(path, cached)
+                return ScheduleResult(
+                    events=_events_from_json(cached.get("events")),
+                    fetched_at=cached["fetched_at"],
+                    not_modified=True,
+                )
+            r.raise_for_status()
+            events = _parse_events(_iter_text(r))
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+    except requests.RequestException:
+        if cached is None:
+            raise
+        return ScheduleResult(
+            events=_events_from_json(cached.get("events")),
+            stale=True,
+            fetched_at=float(cached.get("fetched_at", 0.0)),
+        )
+
+    now = time.time()
+    _write_cache(path, {
+        "version": _CACHE_VERSION,
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": now,
+        "events": _events_to_json(events),
+    })
+    return ScheduleResult(events=events, fetched_at=now)
+
+
+def fetch_events(limit: int = 30, timeout: float = 10.0) -> List[D4Event]:
+    events = fetch_schedule(timeout=timeout).events
+    now = _now_local()
+    return [e for e in events if e.starts_at > now][: max(limit, 1)]
 
-    next_helltide = generics[0] if len(generics) >= 1 else None
-    next_legion = generics[1] if len(generics) >= 2 else None
 
-    return {
-        "helltide": next_helltide,
-        "legion": next_legion,
-        "worldboss": next_worldboss,
-    }
+def next_by_kind(events: List[D4Event], now: Optional[datetime] = None) -> Dict[str, Optional[D4Event]]:
+    """Next helltide / legion / world boss after `now`. Build an EventIndex once to query repeatedly."""
+    return EventIndex(events).next_by_kind(now or _now_local(), kinds=MAIN_KINDS)
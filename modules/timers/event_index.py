@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .d4_event_schedule import D4Event
+
+# (start timestamps, events) for one kind; both sorted by start.
+_Timeline = Tuple[List[float], List["D4Event"]]
+
+
+class EventIndex:
+    """
+    Per-kind timelines of D4 events, sorted by start and searched with bisect.
+
+    Queries are O(log n) and lock-free: merges build new timelines and swap them
+    in with a single reference assignment, so readers (overlay ticks, alarms)
+    never see a half-updated list.
+    """
+
+    def __init__(self, events: Iterable["D4Event"] = ()) -> None:
+        self._timelines: Dict[str, _Timeline] = {}
+        self.merge(events)
+
+    def __len__(self) -> int:
+        return sum(len(ev) for _, ev in self._timelines.values())
+
+    def kinds(self) -> List[str]:
+        return list(self._timelines)
+
+    # --------------------
+    # Updates
+    # --------------------
+    def merge(self, events: Iterable["D4Event"], authoritative: bool = False) -> int:
+        """
+        Merge new events into the index without re-sorting what is already there.
+
+        Only the incoming batch is sorted; each kind is then merged linearly.
+        Duplicates (same kind, start and label) are skipped. With `authoritative`,
+        existing events inside the batch's time span are replaced by the batch,
+        so corrected or cancelled entries from a fresh scrape don't linger.
+        Returns the number of events added.
+        """
+        batch: Dict[str, List["D4Event"]] = {}
+        for e in events:
+            batch.setdefault(e.kind, []).append(e)
+        if not batch:
+            return 0
+
+        timelines = dict(self._timelines)
+        added = 0
+        for kind, new in batch.items():
+            new.sort(key=lambda e: e.starts_at)
+            old_ts, old_ev = timelines.get(kind, ([], []))
+
+            if authoritative and old_ts:
+                lo = bisect_left(old_ts, new[0].starts_at.timestamp())
+                hi = bisect_right(old_ts, new[-1].starts_at.timestamp())
+                old_ts = old_ts[:lo] + old_ts[hi:]
+                old_ev = old_ev[:lo] + old_ev[hi:]
+
+            ts: List[float] = []
+            ev: List["D4Event"] = []
+            merged = heapq.merge(
+                ((t, 0, e) for t, e in zip(old_ts, old_ev)),
+                ((e.starts_at.timestamp(), 1, e) for e in new),
+                key=lambda x: (x[0], x[1]),
+            )
+            for t, is_new, e in merged:
+                if ts and ts[-1] == t and ev[-1].label == e.label:
+                    continue
+                ts.append(t)
+                ev.append(e)
+                added += is_new
+            timelines[kind] = (ts, ev)
+
+        self._timelines = timelines
+        return added
+
+    def prune(self, before: datetime) -> int:
+        """Drop events starting before `before`. Returns how many were removed."""
+        cut = before.timestamp()
+        timelines: Dict[str, _Timeline] = {}
+        removed = 0
+        for kind, (ts, ev) in self._timelines.items():
+            i = bisect_left(ts, cut)
+            removed += i
+            if i < len(ts):
+                timelines[kind] = (ts[i:], ev[i:])
+        self._timelines = timelines
+        return removed
+
+    def clear(self) -> None:
+        self._timelines = {}
+
+    # --------------------
+    # Queries
+    # --------------------
+    def next(self, kind: str, after: datetime) -> Optional["D4Event"]:
+        """First event of `kind` starting strictly after `after`."""
+        tl = self._timelines.get(kind)
+        if tl is None:
+            return None
+        ts, ev = tl
+        i = bisect_right(ts, after.timestamp())
+        return ev[i] if i < len(ev) else None
+
+    def next_k(self, kind: str, after: datetime, k: int) -> List["D4Event"]:
+        tl = self._timelines.get(kind)
+        if tl is None or k <= 0:
+            return []
+        ts, ev = tl
+        i = bisect_right(ts, after.timestamp())
+        return ev[i:i + k]
+
+    def window(self, start: datetime, end: datetime, kinds: Optional[Iterable[str]] = None) -> List["D4Event"]:
+        """Events starting in [start, end), across `kinds` (default all), in time order."""
+        timelines = self._timelines
+        lo_t, hi_t = start.timestamp(), end.timestamp()
+        slices = []
+        for kind in (kinds if kinds is not None else timelines):
+            tl = timelines.get(kind)
+            if tl is None:
+                continue
+            ts, ev = tl
+            slices.append(ev[bisect_left(ts, lo_t):bisect_left(ts, hi_t)])
+        if len(slices) == 1:
+            return slices[0]
+        return list(heapq.merge(*slices, key=lambda e: e.starts_at))
+
+    def next_by_kind(self, after: datetime, kinds: Optional[Iterable[str]] = None) -> Dict[str, Optional["D4Event"]]:
+        return {kind: self.next(kind, after) for kind in (kinds if kinds is not None else self._timelines)}
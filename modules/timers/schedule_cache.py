@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Dict, Any
+
+from dateutil import tz
+
+from .d4_event_schedule import MAIN_KINDS, D4Event, ScheduleResult, fetch_schedule, load_cached_schedule
+from .event_index import EventIndex
+from .schedule_engine import ScheduleEngine
+
+
+class ScheduleCache:
+    """
+    Holds the last fetched D4 schedule and refreshes it on a background thread.
+
+    Readers (overlay ticks, pages) only ever look at the cached events, so a slow
+    or unreachable helltides.com never blocks a UI thread. Refreshes happen every
+    `refresh_ttl_s` seconds +/- `jitter_s`, or sooner once the cached list runs out.
+
+    On start the last schedule saved on disk is loaded synchronously, so timers
+    show up immediately and keep working (flagged stale) while offline. Kinds
+    the scrape has nothing for are filled in by the offline ScheduleEngine, which
+    every successful fetch re-anchors.
+    """
+
+    def __init__(
+        self,
+        refresh_ttl_s: float = 300.0,
+        jitter_s: float = 30.0,
+        retry_s: float = 30.0,
+        fetcher: Optional[Callable[[], ScheduleResult]] = None,
+        cache_path: Optional[str] = None,
+        engine: Optional[ScheduleEngine] = None,
+    ) -> None:
+        self.refresh_ttl_s = max(1.0, float(refresh_ttl_s))
+        self.jitter_s = max(0.0, float(jitter_s))
+        self.retry_s = max(1.0, float(retry_s))
+        self._cache_path = cache_path
+        self._fetcher = fetcher or (lambda: fetch_schedule(cache_path=cache_path))
+
+        self.engine = engine or ScheduleEngine()
+        self.index = EventIndex()
+
+        self._lock = threading.Lock()
+        self._events: List[D4Event] = []
+        self._fetched_at = 0.0
+        self._stale = False
+        self._last_error: Optional[str] = None
+
+        self._refresh_listeners: List[Callable[[], None]] = []
+
+        self._wake = threading.Event()
+        self._running = False
+        self._stop: Optional[threading.Event] = None  # per loop, so a restart never revives an old loop
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            stop = self._stop = threading.Event()
+            cold = self._fetched_at == 0.0
+        if cold:
+            self._load_from_disk()
+        self._wake.clear()  # a stop() wake-up meant for the previous loop
+        self._thread = threading.Thread(target=self._loop, args=(stop,), name="d4-schedule-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            stop, self._stop = self._stop, None
+        if stop is not None:
+            stop.set()
+        self._wake.set()
+
+    def add_refresh_listener(self, fn: Callable[[], None]) -> None:
+        """Call `fn` (on the refresh thread) whenever new schedule data lands."""
+        with self._lock:
+            self._refresh_listeners.append(fn)
+
+    def refresh_now(self) -> None:
+        """Ask the background thread to refresh without waiting for the TTL."""
+        self._wake.set()
+
+    # --------------------
+    # Readers (cheap, never touch the network)
+    # --------------------
+    def has_data(self) -> bool:
+        with self._lock:
+            return self._fetched_at > 0.0
+
+    def events(self) -> List[D4Event]:
+        # The list is replaced wholesale on refresh and never mutated, so handing
+        # out the reference is safe.
+        with self._lock:
+            return self._events
+
+    def upcoming(self, now: Optional[datetime] = None) -> List[D4Event]:
+        now = now or datetime.now(tz=tz.tzlocal())
+        return [e for e in self.events() if e.starts_at > now]
+
+    def next_by_kind(self, now: Optional[datetime] = None) -> Dict[str, Optional[D4Event]]:
+        """Next scraped event per kind, falling back to the engine's prediction."""
+        now = now or datetime.now(tz=tz.tzlocal())
+        nxt = self.index.next_by_kind(now, kinds=MAIN_KINDS)
+        with self._lock:
+            predicted = self.engine.next_by_kind(now)
+        for kind, ev in predicted.items():
+            if nxt.get(kind) is None:
+                nxt[kind] = ev
+        return nxt
+
+    def next_event(self, kind: str, after: datetime) -> Optional[D4Event]:
+        """Next event of `kind` strictly after `after`: scraped if known, else predicted."""
+        ev = self.index.next(kind, after)
+        if ev is not None:
+            return ev
+        with self._lock:
+            return self.engine.next_event(kind, after)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            age = (time.monotonic() - self._fetched_at) if self._fetched_at else None
+            return {
+                "running": self._running,
+                "events": len(self._events),
+                "age_s": age,
+                "stale": self._stale,
+                "last_error": self._last_error,
+            }
+
+    @property
+    def stale(self) -> bool:
+        """True while the events come from disk rather than a successful fetch."""
+        with self._lock:
+            return self._stale
+
+    @property
+    def last_error(self) -> Optional[str]:
+        with self._lock:
+            return self._last_error
+
+    # --------------------
+    # Background refresh
+    # --------------------
+    def _load_from_disk(self) -> None:
+        try:
+            res = load_cached_schedule(self._cache_path)
+        except Exception:
+            res = None
+        if res is None or not res.events:
+            return
+        with self._lock:
+            self.engine.reanchor(res.events)
+            self.index.merge(res.events)
+            if self._fetched_at == 0.0:
+                self._events = list(res.events)
+                self._fetched_at = time.monotonic()
+                self._stale = True
+
+    def _refresh_once(self) -> None:
+        try:
+            res = self._fetcher()
+        except Exception as ex:
+            with self._lock:
+                self._last_error = str(ex) or ex.__class__.__name__
+            return
+
+        with self._lock:
+            self.engine.reanchor(res.events)
+            # A live scrape is authoritative for the span it covers; stale data only fills gaps.
+            self.index.merge(res.events, authoritative=not res.stale)
+            self.index.prune(datetime.now(tz=tz.tzlocal()) - timedelta(hours=1))
+            self._events = list(res.events)
+            self._fetched_at = time.monotonic()
+            self._stale = res.stale
+            self._last_error = None
+            listeners = list(self._refresh_listeners)
+
+        for fn in listeners:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def _next_delay(self) -> float:
+        with self._lock:
+            if self._last_error is not None or self._stale:
+                return self.retry_s
+            events = self._events
+
+        delay = self.refresh_ttl_s + random.uniform(-self.jitter_s, self.jitter_s)
+
+        # Don't sit on a list that is about to run out. Once it has, the site is
+        # serving a finished list: poll at the retry pace, not every second.
+        if events:
+            left = (events[-1].starts_at - datetime.now(tz=events[-1].starts_at.tzinfo)).total_seconds()
+            delay = min(delay, left) if left > 0 else min(delay, self.retry_s)
+        return max(1.0, delay)
+
+    def _loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self._refresh_once()
+            if stop.is_set():
+                return
+            self._wake.wait(self._next_delay())
+            if stop.is_set():
+                return
+            self._wake.clear()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .d4_event_schedule import D4Event
+
+
+@dataclass(frozen=True)
+class RotationRule:
+    kind: str
+    period: timedelta
+    anchor: datetime                    # start of one known occurrence (timezone-aware)
+    duration: timedelta = timedelta(0)
+    labels: Tuple[str, ...] = ()        # cycled in order, labels[0] belongs to the anchor
+
+
+# Current live rotations. Anchors are only a starting point: every successful
+# scrape re-anchors (and if needed re-times) the rule through ScheduleEngine.reanchor.
+DEFAULT_RULES: Tuple[RotationRule, ...] = (
+    RotationRule(
+        kind="helltide",
+        period=timedelta(hours=1),
+        anchor=datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc),
+        duration=timedelta(minutes=55),
+    ),
+    RotationRule(
+        kind="legion",
+        period=timedelta(minutes=25),
+        anchor=datetime(2024, 1, 1, 0, 10, tzinfo=timezone.utc),
+        duration=timedelta(minutes=5),
+    ),
+    RotationRule(
+        kind="worldboss",
+        period=timedelta(hours=3, minutes=30),
+        anchor=datetime(2024, 1, 1, 1, 30, tzinfo=timezone.utc),
+        duration=timedelta(minutes=15),
+    ),
+)
+
+# Scraped spacing within this much of a multiple of the rule period counts as "on schedule".
+_PERIOD_TOLERANCE = timedelta(seconds=60)
+
+
+class ScheduleEngine:
+    """
+    Deterministic, offline predictor for recurring D4 events.
+
+    Each kind follows a fixed period from an anchor, so "next N after T" is plain
+    arithmetic: O(1) to locate the first occurrence, O(N) to emit them. No network
+    and no stored timeline are needed; scraping only corrects the anchors.
+    """
+
+    def __init__(self, rules: Optional[Iterable[RotationRule]] = None) -> None:
+        self._rules: Dict[str, RotationRule] = {r.kind: r for r in (rules if rules is not None else DEFAULT_RULES)}
+
+    def kinds(self) -> List[str]:
+        return list(self._rules)
+
+    def rule(self, kind: str) -> Optional[RotationRule]:
+        return self._rules.get(kind)
+
+    def set_rule(self, rule: RotationRule) -> None:
+        self._rules[rule.kind] = rule
+
+    # --------------------
+    # Queries
+    # --------------------
+    def _occurrence(self, rule: RotationRule, k: int, tzinfo) -> D4Event:
+        label = rule.labels[k % len(rule.labels)] if rule.labels else ""
+        starts = (rule.anchor + rule.period * k).astimezone(tzinfo)
+        return D4Event(kind=rule.kind, starts_at=starts, label=label)
+
+    def _first_index_after(self, rule: RotationRule, after: datetime) -> int:
+        # timedelta // timedelta floors, so this is the first k with start > after.
+        return (after - rule.anchor) // rule.period + 1
+
+    def next_events(self, kind: str, after: datetime, n: int = 1) -> List[D4Event]:
+        """The next `n` occurrences of `kind` starting strictly after `after`."""
+        rule = self._rules.get(kind)
+        if rule is None or n <= 0:
+            return []
+        k0 = self._first_index_after(rule, after)
+        return [self._occurrence(rule, k0 + i, after.tzinfo) for i in range(n)]
+
+    def next_event(self, kind: str, after: datetime) -> Optional[D4Event]:
+        nxt = self.next_events(kind, after, 1)
+        return nxt[0] if nxt else None
+
+    def active(self, kind: str, at: datetime) -> Optional[D4Event]:
+        """The occurrence of `kind` whose [start, start + duration) window contains `at`."""
+        rule = self._rules.get(kind)
+        if rule is None or rule.duration <= timedelta(0):
+            return None
+        k = self._first_index_after(rule, at) - 1
+        ev = self._occurrence(rule, k, at.tzinfo)
+        return ev if at < ev.starts_at + rule.duration else None
+
+    def next_by_kind(self, after: datetime) -> Dict[str, Optional[D4Event]]:
+        return {kind: self.next_event(kind, after) for kind in self._rules}
+
+    def _iter_kind(self, rule: RotationRule, start: datetime, end: datetime) -> Iterator[D4Event]:
+        k = self._first_index_after(rule, start - timedelta(microseconds=1))
+        while True:
+            ev = self._occurrence(rule, k, start.tzinfo)
+            if ev.starts_at >= end:
+                return
+            yield ev
+            k += 1
+
+    def generate(self, start: datetime, end: datetime, kinds: Optional[Iterable[str]] = None) -> List[D4Event]:
+        """All occurrences in [start, end), merged in time order."""
+        rules = [self._rules[k] for k in (kinds if kinds is not None else self._rules) if k in self._rules]
+        streams = [self._iter_kind(r, start, end) for r in rules]
+        return list(heapq.merge(*streams, key=lambda e: e.starts_at))
+
+    # --------------------
+    # Correction from scraped data
+    # --------------------
+    def reanchor(self, events: Iterable[D4Event]) -> List[str]:
+        """
+        Re-anchor rules on observed events (typically a fresh scrape).
+
+        The latest observed occurrence of each kind becomes the new anchor. When
+        three or more occurrences are seen and their spacing disagrees with the
+        rule, the period is corrected to the smallest gap they are all multiples of.
+        Returns the kinds that were updated.
+        """
+        by_kind: Dict[str, List[D4Event]] = {}
+        for e in events:
+            if e.kind in self._rules:
+                by_kind.setdefault(e.kind, []).append(e)
+
+        updated: List[str] = []
+        for kind, seen in by_kind.items():
+            seen.sort(key=lambda e: e.starts_at)
+            rule = self._rules[kind]
+            latest = seen[-1]
+
+            period = rule.period
+            gaps = [b.starts_at - a.starts_at for a, b in zip(seen, seen[1:])]
+            gaps = [g for g in gaps if g > _PERIOD_TOLERANCE]
+            if len(gaps) >= 2:
+                step = min(gaps)
+                if all(_near_multiple(g, step) for g in gaps) and not _near_multiple(step, period):
+                    period = step
+
+            labels = rule.labels
+            if labels and latest.label in labels:
+                i = labels.index(latest.label)
+                labels = labels[i:] + labels[:i]
+
+            new = replace(rule, anchor=latest.starts_at, period=period, labels=labels)
+            if new != rule:
+                self._rules[kind] = new
+                updated.append(kind)
+        return updated
+
+
+def _near_multiple(value: timedelta, step: timedelta) -> bool:
+    if step <= timedelta(0):
+        return False
+    n = max(1, round(value / step))
+    return abs(value - step * n) <= _PERIOD_TOLERANCE
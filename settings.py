@@ -14,6 +14,7 @@ class AppSettings:
     accent: str = "#3aa3ff"
     start_maximized: bool = False
     tesseract_path: str = ""
+    tooltip_border: str = ""
 
 def load_settings() -> AppSettings:
     path = _settings_path()
@@ -26,6 +27,8 @@ def load_settings() -> AppSettings:
         return AppSettings(
             accent=data.get("accent", default.accent),
             start_maximized=bool(data.get("start_maximized", default.start_maximized)),
+            tesseract_path=str(data.get("tesseract_path", default.tesseract_path) or ""),
+            tooltip_border=str(data.get("tooltip_border", default.tooltip_border) or ""),
         )
     except Exception:
         return AppSettings()
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+from PySide6.QtCore import Qt, QObject, Signal, QAbstractTableModel, QModelIndex
+from PySide6.QtWidgets import (
+    QVBoxLayout, QLabel, QFrame, QHBoxLayout, QLineEdit, QPushButton,
+    QMessageBox, QCheckBox, QTableView, QHeaderView, QFileDialog, QAbstractItemView
+)
+
+from .base import Page
+from ...tools_registry import ToolAction
+from ...paths import data_dir
+from ...modules.capture_format import EVENT_NAMES
+from ...modules.capture_browse import BrowseCancelled, CaptureIndex, RowFilter
+
+_COLUMNS = ("Time (s)", "Event", "X", "Y", "Detail")
+
+
+class _BrowseBridge(QObject):
+    """Carries index/filter results from worker threads onto the GUI thread."""
+    progress = Signal(int, bool)     # rows indexed, done
+    filtered = Signal(object, int)   # RowFilter, generation
+    failed = Signal(str)
+
+
+class CaptureTableModel(QAbstractTableModel):
+    """
+    Rows come straight from a CaptureIndex: only the blocks Qt asks about are
+    decoded. The row count grows while the index is still being built.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._ix: Optional[CaptureIndex] = None
+        self._rows = 0
+        self._filter: Optional[RowFilter] = None
+
+    def set_index(self, ix: Optional[CaptureIndex]):
+        self.beginResetModel()
+        self._ix = ix
+        self._rows = 0
+        self._filter = None
+        self.endResetModel()
+
+    def grow(self, rows: int):
+        if self._filter is not None:
+            self._rows = rows
+            return
+        if rows > self._rows:
+            self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+            self._rows = rows
+            self.endInsertRows()
+
+    @property
+    def filter(self) -> Optional[RowFilter]:
+        return self._filter
+
+    def set_filter(self, f: Optional[RowFilter]):
+        self.beginResetModel()
+        self._filter = f
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._ix is None:
+            return 0
+        return self._filter.rows if self._filter is not None else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return _COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or self._ix is None or not index.isValid():
+            return None
+        r = index.row()
+        if self._filter is not None:
+            r = self._filter.source_row(r)
+        t, et, x, y, detail = self._ix.row(r)
+        col = index.column()
+        if col == 0:
+            return f"{t:.6f}"
+        if col == 1:
+            return EVENT_NAMES.get(et, "?")
+        if col in (2, 3):
+            return "" if et not in (0, 1, 2) else str(x if col == 2 else y)
+        return detail
+
+
+class CaptureBrowserPage(Page):
+    page_id = "capture_browser"
+    title = "Capture Browser"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._ix: Optional[CaptureIndex] = None
+        self._build_cancel = threading.Event()
+        self._build_thread: Optional[threading.Thread] = None
+        self._filter_cancel = threading.Event()
+        self._filter_thread: Optional[threading.Thread] = None
+        self._filter_gen = 0
+
+        self._bridge = _BrowseBridge(self)
+        self._bridge.progress.connect(self._on_progress)
+        self._bridge.filtered.connect(self._on_filtered)
+        self._bridge.failed.connect(self._on_failed)
+
+        root = QVBoxLayout(self)
+        root.setContentsMargins(18, 18, 18, 18)
+        root.setSpacing(14)
+
+        h = QLabel("Capture Browser")
+        h.setObjectName("H1")
+        root.addWidget(h)
+
+        sub = QLabel("Browse recorded captures of any size. Rows are read from disk only as they scroll into view.")
+        sub.setObjectName("Dim")
+        sub.setWordWrap(True)
+        root.addWidget(sub)
+
+        card = QFrame()
+        card.setObjectName("Card")
+        c = QVBoxLayout(card)
+        c.setContentsMargins(16, 16, 16, 16)
+        c.setSpacing(10)
+        root.addWidget(card, 1)
+
+        row1 = QHBoxLayout()
+        row1.setSpacing(10)
+        c.addLayout(row1)
+        self._path = QLineEdit()
+        self._path.setPlaceholderText("Capture file (.jsonl or .jcap)")
+        btn_pick = QPushButton("Choose...")
+        btn_pick.clicked.connect(self._choose)
+        btn_open = QPushButton("Open")
+        btn_open.setObjectName("Primary")
+        btn_open.clicked.connect(lambda: self.open_file(self._path.text().strip()))
+        row1.addWidget(QLabel("File:"))
+        row1.addWidget(self._path, 1)
+        row1.addWidget(btn_pick)
+        row1.addWidget(btn_open)
+
+        row2 = QHBoxLayout()
+        row2.setSpacing(10)
+        c.addLayout(row2)
+        self._t_from = QLineEdit()
+        self._t_from.setPlaceholderText("from (s)")
+        self._t_from.setFixedWidth(90)
+        self._t_to = QLineEdit()
+        self._t_to.setPlaceholderText("to (s)")
+        self._t_to.setFixedWidth(90)
+        row2.addWidget(QLabel("Time:"))
+        row2.addWidget(self._t_from)
+        row2.addWidget(self._t_to)
+        self._types = {}
+        for etype, name in EVENT_NAMES.items():
+            cb = QCheckBox(name.replace("mouse_", "").replace("_", " "))
+            cb.setChecked(True)
+            self._types[etype] = cb
+            row2.addWidget(cb)
+        btn_apply = QPushButton("Apply")
+        btn_apply.clicked.connect(self._apply_filter)
+        btn_clear = QPushButton("Clear")
+        btn_clear.clicked.connect(self._clear_filter)
+        row2.addWidget(btn_apply)
+        row2.addWidget(btn_clear)
+        row2.addStretch(1)
+
+        self._model = CaptureTableModel(self)
+        self._table = QTableView()
+        self._table.setModel(self._model)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self._table.setWordWrap(False)
+        # Fixed row heights: the view never has to measure rows it doesn't show.
+        vh = self._table.verticalHeader()
+        vh.setVisible(False)
+        vh.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vh.setDefaultSectionSize(22)
+        hh = self._table.horizontalHeader()
+        hh.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        hh.setStretchLastSection(True)
+        for col, w in enumerate((120, 110, 70, 70)):
+            self._table.setColumnWidth(col, w)
+        c.addWidget(self._table, 1)
+
+        self._status = QLabel("No file open")
+        self._status.setObjectName("Dim")
+        c.addWidget(self._status)
+
+    def register_actions(self, registry):
+        registry.register(ToolAction(
+            id="open_capture_browser",
+            title="Capture Browser",
+            keywords=["capture", "browse", "events", "jsonl", "recording", "viewer"],
+            open_page_id=self.page_id
+        ))
+
+    def _choose(self):
+        start = os.path.join(data_dir(), "captures")
+        path, _ = QFileDialog.getOpenFileName(self, "Open capture", start, "Captures (*.jsonl *.jcap);;All files (*)")
+        if path:
+            self._path.setText(path)
+            self.open_file(path)
+
+    # --------------------
+    # Opening / indexing
+    # --------------------
+    def open_file(self, path: str):
+        if not path:
+            return
+        try:
+            ix = CaptureIndex(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Can't open capture", str(e))
+            return
+        self._close_index()
+        self._ix = ix
+        self._model.set_index(ix)
+        self._status.setText("Indexing...")
+
+        cancel = threading.Event()
+        self._build_cancel = cancel
+
+        def worker():
+            try:
+                ix.build(lambda rows, done: None if cancel.is_set() else self._bridge.progress.emit(rows, done), cancel)
+            except Exception as e:
+                self._bridge.failed.emit(str(e))
+
+        self._build_thread = threading.Thread(target=worker, name="capture-browse-index", daemon=True)
+        self._build_thread.start()
+
+    def _close_index(self):
+        self._build_cancel.set()
+        self._filter_cancel.set()
+        self._filter_gen += 1
+        for t in (self._build_thread, self._filter_thread):
+            if t is not None:
+                t.join(timeout=2.0)
+        self._build_thread = None
+        self._filter_thread = None
+        if self._ix is not None:
+            self._model.set_index(None)
+            self._ix.close()
+            self._ix = None
+
+    def _on_progress(self, rows: int, done: bool):
+        if self._ix is None:
+            return
+        self._model.grow(rows)
+        if self._model.filter is not None:
+            return
+        size_mb = self._ix.size / (1024 * 1024)
+        state = "" if done else " (indexing...)"
+        self._status.setText(f"{os.path.basename(self._ix.path)}: {rows:,} events, {size_mb:.1f} MB{state}")
+
+    def _on_failed(self, msg: str):
+        QMessageBox.critical(self, "Capture browser", msg)
+
+    # --------------------
+    # Filtering (worker thread)
+    # --------------------
+    def _apply_filter(self):
+        if self._ix is None:
+            return
+        try:
+            t0 = float(self._t_from.text()) if self._t_from.text().strip() else None
+            t1 = float(self._t_to.text()) if self._t_to.text().strip() else None
+        except ValueError:
+            QMessageBox.critical(self, "Invalid time range", "Times are seconds from the start of the capture.")
+            return
+        types = [t for t, cb in self._types.items() if cb.isChecked()]
+        if t0 is None and t1 is None and len(types) == len(self._types):
+            self._clear_filter()
+            return
+
+        self._filter_cancel.set()
+        cancel = threading.Event()
+        self._filter_cancel = cancel
+        self._filter_gen += 1
+        gen = self._filter_gen
+        ix = self._ix
+        self._status.setText("Filtering...")
+
+        def worker():
+            try:
+                f = ix.filter(t0, t1, types, cancel)
+            except BrowseCancelled:
+                return
+            except Exception as e:
+                if not cancel.is_set():  # a cancelled filter may trip over the index being closed
+                    self._bridge.failed.emit(str(e))
+                return
+            self._bridge.filtered.emit(f, gen)
+
+        self._filter_thread = threading.Thread(target=worker, name="capture-browse-filter", daemon=True)
+        self._filter_thread.start()
+
+    def _on_filtered(self, f: RowFilter, gen: int):
+        if gen != self._filter_gen or self._ix is None:
+            return
+        self._model.set_filter(f)
+        self._status.setText(f"{f.rows:,} of {self._ix.rows:,} events match")
+
+    def _clear_filter(self):
+        self._filter_cancel.set()
+        self._filter_gen += 1
+        if self._ix is None:
+            return
+        self._model.set_filter(None)
+        self._model.grow(self._ix.rows)
+        self._on_progress(self._ix.rows, self._ix.complete)
+
+    def closeEvent(self, event):
+        self._close_index()
+        return super().closeEvent(event)
@@ -6,13 +6,15 @@ import time
 from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import (
     QVBoxLayout, QLabel, QFrame, QHBoxLayout, QLineEdit, QPushButton,
-    QMessageBox, QComboBox
+    QMessageBox, QComboBox, QPlainTextEdit, QCheckBox
 )
 
 from .base import Page
 from ...tools_registry import ToolAction
 from ...paths import data_dir
 from ...modules.capture_recorder import CaptureRecorder, CaptureConfig
+from ...modules.capture_format import BINARY_EXT, JSONL_EXT
+from ...modules.capture_filters import parse_rules
 
 
 class CapturePage(Page):
@@ -61,20 +63,38 @@ class CapturePage(Page):
         self._mode = QComboBox()
         self._mode.addItem("Event-driven (recommended)", "event")
         self._mode.addItem("Fixed-rate mouse move throttle", "fixed")
+        self._mode.addItem("Adaptive path simplification", "adaptive")
 
         self._rate = QLineEdit()
         self._rate.setPlaceholderText("25")
         self._rate.setText("25")
 
+        self._tol = QLineEdit()
+        self._tol.setPlaceholderText("2")
+        self._tol.setText("2")
+
         row2.addWidget(QLabel("Mode:"))
         row2.addWidget(self._mode, 1)
         row2.addWidget(QLabel("Rate (ms):"))
         row2.addWidget(self._rate)
+        row2.addWidget(QLabel("Tolerance (px):"))
+        row2.addWidget(self._tol)
 
         row3 = QHBoxLayout()
         row3.setSpacing(10)
         c.addLayout(row3)
 
+        self._format = QComboBox()
+        self._format.addItem("JSONL (text)", "jsonl")
+        self._format.addItem("Binary (compact)", "binary")
+        self._format.currentIndexChanged.connect(self._refresh_output_path)
+
+        # (segment_max_mb, segment_max_s); closed segments are compressed in the background.
+        self._split = QComboBox()
+        self._split.addItem("Single file", (0, 0))
+        self._split.addItem("Segments: 64 MB", (64, 0))
+        self._split.addItem("Segments: 15 min", (0, 900))
+
         self._out = QLineEdit()
         self._out.setReadOnly(True)
         self._refresh_output_path()
@@ -84,8 +104,23 @@ class CapturePage(Page):
 
         row3.addWidget(QLabel("Output:"))
         row3.addWidget(self._out, 1)
+        row3.addWidget(self._format)
+        row3.addWidget(self._split)
         row3.addWidget(btn_new)
 
+        self._filters = QPlainTextEdit()
+        self._filters.setPlaceholderText(
+            "Filter rules, one per line (first match wins, unmatched events are kept), e.g.\n"
+            "drop key_release\n"
+            "drop mouse_move outside 0,0,2560,1440\n"
+            "keep key_press keys w,a,s,d\n"
+            "drop key_press\n"
+            "sample mouse_scroll 4"
+        )
+        self._filters.setFixedHeight(104)
+        c.addWidget(QLabel("Filters:"))
+        c.addWidget(self._filters)
+
         row4 = QHBoxLayout()
         row4.setSpacing(10)
         c.addLayout(row4)
@@ -97,14 +132,22 @@ class CapturePage(Page):
         self._btn_start.clicked.connect(self._start)
         self._btn_stop.clicked.connect(self._stop)
 
+        self._stream = QCheckBox("Stream live to local tools")
+        self._stream.setToolTip("Fan events out over a local socket (see capture_stream.json in the data folder).")
+
         row4.addWidget(self._btn_start)
         row4.addWidget(self._btn_stop)
+        row4.addWidget(self._stream)
         row4.addStretch(1)
 
         self._status = QLabel("Status: idle")
         self._status.setObjectName("Dim")
         c.addWidget(self._status)
 
+        self._live = QLabel("")
+        self._live.setObjectName("Dim")
+        c.addWidget(self._live)
+
         if not self._rec.available():
             QMessageBox.warning(
                 self,
@@ -116,7 +159,7 @@ class CapturePage(Page):
             QMessageBox.information(
                 self,
                 "Limited foreground check",
-                "Foreground-window gating (auto-pause outside the target app) is only available on Windows with pywin32 installed.\n"
+                "Foreground-window gating (auto-pause outside the target app) is only available on Windows.\n"
                 "You can still record, but it may capture input from any focused window."
             )
 
@@ -125,6 +168,10 @@ class CapturePage(Page):
         self._timer.timeout.connect(self._tick)
         self._timer.start()
 
+    @property
+    def recorder(self) -> CaptureRecorder:
+        return self._rec
+
     def register_actions(self, registry):
         registry.register(ToolAction(
             id="open_capture",
@@ -140,7 +187,8 @@ class CapturePage(Page):
 
     def _refresh_output_path(self):
         ts = time.strftime("%Y%m%d_%H%M%S")
-        out = os.path.join(self._captures_dir(), f"capture_{ts}.jsonl")
+        ext = BINARY_EXT if self._format.currentData() == "binary" else JSONL_EXT
+        out = os.path.join(self._captures_dir(), f"capture_{ts}{ext}")
         self._out.setText(out)
 
     def _start(self):
@@ -154,15 +202,34 @@ class CapturePage(Page):
         except Exception:
             fixed = 25
 
+        try:
+            tol = float((self._tol.text() or "2").strip())
+            tol = max(0.0, min(50.0, tol))
+        except Exception:
+            tol = 2.0
+
+        try:
+            filters = parse_rules(self._filters.toPlainText())
+        except ValueError as e:
+            QMessageBox.critical(self, "Invalid filter rule", str(e))
+            return
+
         cfg = CaptureConfig(
             target_window_substring=(self._target.text() or "Diablo IV").strip(),
             mode=str(self._mode.currentData()),
             fixed_rate_ms=fixed,
+            tolerance_px=tol,
             output_path=self._out.text().strip(),
+            format=str(self._format.currentData()),
+            segment_max_mb=self._split.currentData()[0],
+            segment_max_s=self._split.currentData()[1],
+            filters=filters,
+            stream=self._stream.isChecked(),
         )
 
         try:
             self._rec.start(cfg)
+            self._out.setText(self._rec.status()["output_path"])
             self._btn_start.setEnabled(False)
             self._btn_stop.setEnabled(True)
         except Exception as e:
@@ -179,12 +246,43 @@ class CapturePage(Page):
             state = "paused (target not focused)" if st["paused"] else "recording"
         else:
             state = "idle"
-        self._status.setText(f"Status: {state} | events: {st['events_written']}")
+        text = f"Status: {state} | events: {st['events_written']} | queue: {st['queue_depth']}"
+        if st["mode"] == "adaptive" and st["moves_kept"]:
+            text += f" | moves kept 1/{st['move_ratio']:.1f}"
+        if st["segments"]:
+            text += f" | segments: {st['segments']}"
+        if st["compressing"]:
+            text += f" | compressing: {st['compressing']}"
+        if st["filtered"]:
+            text += f" | filtered: {st['filtered']}"
+        if st["stream"]:
+            text += f" | subscribers: {st['stream']['subscribers']}"
+        if st["dropped"]:
+            text += f" | dropped: {st['dropped']}"
+        if st["error"]:
+            text += f"\nWrite error: {st['error']}"
+        self._status.setText(text)
+
+        if not st["running"]:
+            return
+        live = self._rec.live_stats()
+        mix = live["mix"]
+        total = live["window_events"] or 1
+        keys = mix.get("key_press", 0) + mix.get("key_release", 0)
+        lat = live["latency_ms"]
+        self._live.setText(
+            f"{live['events_per_s']:.0f} ev/s | APM {live['apm']:.0f} | "
+            f"moves {100 * mix.get('mouse_move', 0) / total:.0f}% "
+            f"clicks {100 * mix.get('mouse_click', 0) / total:.0f}% "
+            f"keys {100 * keys / total:.0f}% | "
+            f"latency p50 {lat['p50']:.1f} ms, p99 {lat['p99']:.1f} ms"
+        )
 
     def closeEvent(self, event):
         # Ensure recorder stops if user navigates away and closes the app.
         try:
             self._rec.stop()
+            self._rec.wait_closed()  # don't leave a segmented session half compressed
         except Exception:
             pass
         return super().closeEvent(event)
@@ -1,26 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from collections import deque
+from typing import Optional
 
-from PySide6.QtCore import QTimer, Qt
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
-    QVBoxLayout, QHBoxLayout, QLabel, QFrame, QPushButton, QSpinBox, QMessageBox
+    QVBoxLayout, QHBoxLayout, QLabel, QFrame, QPushButton, QSpinBox, QMessageBox, QCheckBox, QPlainTextEdit
 )
 
 from .base import Page
+from ...settings import load_settings, save_settings
+from ...modules.ocr.capture_worker import CaptureWorker, Region
+from ...modules.ocr.engines import TesseractEngine, find_tesseract
+from ...modules.ocr.ocr_pool import OcrPipeline, OcrResult
+from ...modules.ocr.tooltip_detect import TooltipDetector, TooltipTracker, format_rgb, learn_border, parse_rgb
 
-try:
-    import mss  # type: ignore
-except Exception:  # pragma: no cover
-    mss = None
 
-@dataclass
-class Region:
-    x: int = 0
-    y: int = 0
-    w: int = 800
-    h: int = 600
+class _FrameBridge(QObject):
+    """Nudges the GUI thread when the capture worker has a new frame or OCR text."""
+    ready = Signal()
+    ocr = Signal(object)     # OcrResult
+    region = Signal(object)  # Region the tooltip tracker moved the capture to
+
 
 class OCRPreviewPage(Page):
     page_id = "ocr_preview"
@@ -29,14 +32,25 @@ class OCRPreviewPage(Page):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self._tick)
-
-        self._sct = None
         self._monitor_index = 1  # mss uses 1..N (0 is all)
 
         self._region = Region()
 
+        # Grabbing and scaling run on the worker's thread; the GUI only blits.
+        self._bridge = _FrameBridge(self)
+        self._bridge.ready.connect(self._show_latest)
+        self._bridge.ocr.connect(self._show_ocr)
+        self._bridge.region.connect(self._on_tracked_region)
+        self._worker = CaptureWorker(on_ready=self._bridge.ready.emit)
+        self._ocr: Optional[OcrPipeline] = None
+        self._ocr_last: Optional[OcrResult] = None
+        self._last_frame = None  # newest displayed Frame (for learning the tooltip border)
+        self._shown = deque(maxlen=60)  # perf_counter of recently displayed frames
+
+        self._stats_timer = QTimer(self)
+        self._stats_timer.setInterval(500)
+        self._stats_timer.timeout.connect(self._update_stats)
+
         root = QVBoxLayout(self)
         root.setContentsMargins(18, 18, 18, 18)
         root.setSpacing(12)
@@ -80,6 +94,7 @@ class OCRPreviewPage(Page):
         self._fps.setMinimum(1)
         self._fps.setMaximum(30)
         self._fps.setValue(10)
+        self._fps.valueChanged.connect(lambda v: self._worker.configure(fps=v))
         row.addWidget(self._fps, 0)
 
         self._btn = QPushButton("Start Preview")
@@ -87,28 +102,79 @@ class OCRPreviewPage(Page):
         self._btn.clicked.connect(self._toggle)
         row.addWidget(self._btn, 0)
 
+        self._ocr_on = QCheckBox("OCR")
+        self._ocr_on.setToolTip("Read the region's text with Tesseract (path in Settings)")
+        self._ocr_on.toggled.connect(self._toggle_ocr)
+        row.addWidget(self._ocr_on, 0)
+
         cl.addLayout(row)
 
+        row2 = QHBoxLayout()
+        self._track = QCheckBox("Track tooltip")
+        self._track.setToolTip("Find the tooltip on screen by its border colour and keep the region locked to it")
+        self._track.toggled.connect(self._toggle_track)
+        row2.addWidget(self._track, 0)
+        btn_learn = QPushButton("Learn border")
+        btn_learn.setToolTip("With the region set on a tooltip, take its frame colour from the preview")
+        btn_learn.clicked.connect(self._learn_border)
+        row2.addWidget(btn_learn, 0)
+        self._border = QLabel("")
+        self._border.setObjectName("Dim")
+        row2.addWidget(self._border, 0)
+        row2.addStretch(1)
+        cl.addLayout(row2)
+        self._show_border(load_settings().tooltip_border)
+
         self._img = QLabel("Preview will appear here.")
         self._img.setAlignment(Qt.AlignCenter)
         self._img.setMinimumHeight(360)
         self._img.setObjectName("Preview")
         cl.addWidget(self._img, 1)
 
-        tip = QLabel("Tip: Set the region to your tooltip area in-game. This is capture-only (no OCR).")
+        self._stats = QLabel("")
+        self._stats.setObjectName("Dim")
+        cl.addWidget(self._stats)
+
+        self._text = QPlainTextEdit()
+        self._text.setReadOnly(True)
+        self._text.setPlaceholderText("OCR text will appear here.")
+        self._text.setMaximumHeight(140)
+        self._text.setVisible(False)
+        cl.addWidget(self._text)
+
+        tip = QLabel("Tip: Set the region to your tooltip area in-game. Tick OCR to read its text.")
         tip.setObjectName("Dim")
         cl.addWidget(tip)
 
         root.addWidget(card, 1)
 
-    def _ensure_mss(self) -> bool:
-        if mss is None:
-            QMessageBox.critical(self, "Missing dependency", "mss is not installed. Run: py -m pip install -r requirements.txt")
-            return False
-        return True
+    def overlay_text(self) -> str:
+        """
+        Readout for the overlay: the recognized text while OCR is on, otherwise a
+        short preview line ("" while the preview is stopped).
+        """
+        if not self._worker.running:
+            return ""
+        last = self._ocr_last
+        if self._ocr is not None and last is not None:
+            return f"[OCR error] {last.error}" if last.error else last.text
+        r = self._region
+        return f"Preview {r.w}x{r.h} @ {self._fps.value()} fps"
+
+    def hud_text(self) -> str:
+        """Capture (and OCR) rates for the overlay HUD ("" while the preview is stopped)."""
+        if not self._worker.running:
+            return ""
+        st = self._worker.stats()
+        text = (f"capture {st['capture_fps']:.1f} fps | latency {st['latency_ms']:.1f} ms | "
+                f"dropped {st['dropped']}")
+        if self._ocr is not None:
+            text += f" | OCR {self._ocr.stats()['ocr_ms']:.0f} ms"
+        return text
 
     def _on_mon_changed(self, v: int):
         self._monitor_index = max(1, int(v))
+        self._worker.configure(monitor=self._monitor_index)
 
     def _on_region(self, _):
         self._region = Region(
@@ -117,52 +183,161 @@ class OCRPreviewPage(Page):
             w=int(self._w.value()),
             h=int(self._h.value()),
         )
+        self._worker.configure(region=self._region)
 
-    def _toggle(self):
-        if self._timer.isActive():
-            self._timer.stop()
-            if self._sct is not None:
-                try:
-                    self._sct.close()
-                except Exception:
-                    pass
-            self._sct = None
-            self._btn.setText("Start Preview")
-            return
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._worker.configure(target_size=(self._img.width(), self._img.height()))
 
-        if not self._ensure_mss():
+    def _toggle(self):
+        if self._worker.running:
+            self._stop_preview()
             return
 
+        self._worker.configure(
+            monitor=self._monitor_index,
+            region=self._region,
+            fps=int(self._fps.value()),
+            target_size=(self._img.width(), self._img.height()),
+        )
         try:
-            self._sct = mss.mss()
+            self._worker.start()
         except Exception as e:
             QMessageBox.critical(self, "Capture error", f"Unable to start screen capture.\n\n{e}")
-            self._sct = None
             return
 
-        fps = max(1, int(self._fps.value()))
-        self._timer.start(int(1000 / fps))
+        self._shown.clear()
+        self._stats_timer.start()
         self._btn.setText("Stop Preview")
 
-    def _tick(self):
-        if self._sct is None:
+    def _stop_preview(self, message: str = ""):
+        self._worker.stop()
+        self._stats_timer.stop()
+        self._btn.setText("Start Preview")
+        if message:
+            self._img.setText(message)
+
+    def _show_latest(self):
+        frame = self._worker.slot.take()
+        if frame is None or frame.image is None:
+            return
+        self._img.setPixmap(QPixmap.fromImage(frame.image))
+        self._shown.append(time.perf_counter())
+        self._last_frame = frame
+
+    def _update_stats(self):
+        st = self._worker.stats()
+        if not self._worker.running:
+            # The capture thread stopped on its own: surface why.
+            self._stop_preview(f"Preview stopped.\n{st['error']}" if st["error"] else "")
+            return
+        shown = list(self._shown)
+        shown_fps = (len(shown) - 1) / (shown[-1] - shown[0]) if len(shown) > 1 and shown[-1] > shown[0] else 0.0
+        text = (
+            f"capture {st['capture_fps']:.1f} fps | shown {shown_fps:.1f} fps | "
+            f"latency {st['latency_ms']:.1f} ms (max {st['latency_ms_max']:.1f}) | dropped {st['dropped']} | "
+            f"unchanged {st['unchanged']}"
+        )
+        if st["tracking"]:
+            box = st["tooltip"]
+            where = f"{box[2]}x{box[3]} at {box[0]},{box[1]}" if box else "searching"
+            text += f"\ntooltip {where} ({st['track_ms']:.1f} ms)"
+        if self._ocr is not None:
+            o = self._ocr.stats()
+            text += (
+                f"\nOCR {o['ocr_ms']:.0f} ms (preprocess {o['preprocess_ms']:.1f} ms) | runs {o['ocr_runs']} | cache hits {o['cache_hits']} "
+                f"({o['cached']} cached) | superseded {o['superseded']} | errors {o['errors']}"
+            )
+        self._stats.setText(text)
+
+    # --------------------
+    # Tooltip tracking
+    # --------------------
+    def _show_border(self, hex_rgb: str):
+        self._border.setText(f"Border {hex_rgb}" if hex_rgb else "Border not learned yet")
+
+    def _learn_border(self):
+        frame = self._last_frame
+        if frame is None:
+            QMessageBox.information(self, "Learn border", "Start the preview with the region set on a tooltip first.")
+            return
+        rgb = learn_border(frame.raw, frame.width, frame.height)
+        if rgb is None:
+            QMessageBox.information(self, "Learn border", "No tooltip panel found in the current region.")
+            return
+        s = load_settings()
+        s.tooltip_border = format_rgb(rgb)
+        save_settings(s)
+        self._show_border(s.tooltip_border)
+        if self._worker.tracker is not None:
+            self._worker.tracker = TooltipTracker(TooltipDetector(rgb))
+
+    def _toggle_track(self, on: bool):
+        if not on:
+            self._worker.tracker = None
+            self._worker.on_region = None
+            return
+        rgb = parse_rgb(load_settings().tooltip_border)
+        if rgb is None:
+            QMessageBox.information(
+                self, "Track tooltip",
+                "Set the region on a tooltip, start the preview and click \"Learn border\" first.")
+            self._track.blockSignals(True)
+            self._track.setChecked(False)
+            self._track.blockSignals(False)
+            return
+        self._worker.on_region = self._bridge.region.emit
+        self._worker.tracker = TooltipTracker(TooltipDetector(rgb))
+
+    def _on_tracked_region(self, region: Region):
+        self._region = region
+        for box, v in ((self._x, region.x), (self._y, region.y), (self._w, region.w), (self._h, region.h)):
+            box.blockSignals(True)
+            box.setValue(v)
+            box.blockSignals(False)
+
+    # --------------------
+    # OCR
+    # --------------------
+    def _toggle_ocr(self, on: bool):
+        if not on:
+            self._stop_ocr()
             return
         try:
-            mon = self._sct.monitors[self._monitor_index]
-            bbox = {
-                "left": mon["left"] + self._region.x,
-                "top": mon["top"] + self._region.y,
-                "width": self._region.w,
-                "height": self._region.h,
-            }
-            shot = self._sct.grab(bbox)
-            # BGRA -> QImage
-            qimg = QImage(shot.raw, shot.width, shot.height, QImage.Format.Format_BGRA8888)
-            pix = QPixmap.fromImage(qimg)
-            # Fit to label while preserving aspect
-            self._img.setPixmap(pix.scaled(self._img.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            engine = TesseractEngine(find_tesseract(load_settings().tesseract_path))
+            self._ocr = OcrPipeline(engine, on_result=self._bridge.ocr.emit)
+            self._ocr.start()
         except Exception as e:
-            # Stop preview on repeated failures
-            self._timer.stop()
-            self._btn.setText("Start Preview")
-            self._img.setText(f"Preview stopped.\n{e}")
+            self._ocr = None
+            QMessageBox.critical(self, "OCR unavailable", str(e))
+            self._ocr_on.blockSignals(True)
+            self._ocr_on.setChecked(False)
+            self._ocr_on.blockSignals(False)
+            return
+        ocr = self._ocr
+        self._worker.on_frame = lambda f: ocr.offer(f.raw, f.width, f.height, f.seq)
+        self._worker.refresh()
+        self._text.setVisible(True)
+
+    def _stop_ocr(self):
+        self._worker.on_frame = None
+        if self._ocr is not None:
+            self._ocr.close()
+            self._ocr = None
+        self._ocr_last = None
+        self._text.setVisible(False)
+
+    def _show_ocr(self, result: OcrResult):
+        last = self._ocr_last
+        if self._ocr is None or (last is not None and result.seq < last.seq):
+            return  # late result for an older frame
+        self._ocr_last = result
+        if result.error:
+            self._text.setPlainText(f"[OCR error] {result.error}")
+        elif self._text.toPlainText() != result.text:
+            self._text.setPlainText(result.text)
+
+    def closeEvent(self, event):
+        self._worker.stop()
+        self._stop_ocr()
+        return super().closeEvent(event)
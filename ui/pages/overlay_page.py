@@ -1,21 +1,48 @@
 
 from __future__ import annotations
 
-import multiprocessing
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
-from PySide6.QtCore import Qt
+from typing import Callable, Dict, Optional
+
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFrame, QComboBox,
+    QSpinBox, QListWidget, QListWidgetItem, QApplication, QCheckBox
+)
+from PySide6.QtCore import Qt, QObject, Signal
+
+from ...modules.overlay.overlay_controller import EventTimersWidget, HudWidget, OverlayWidget
+from ...modules.overlay.overlay_window_qt import OverlayWindow
+from ...modules.timers.alarms import AlarmFired, AlarmScheduler
+from ...modules.timers.schedule_cache import ScheduleCache
+
+_ALARM_KINDS = (("Helltide", "helltide"), ("Legion", "legion"), ("World Boss", "worldboss"))
+
+class _AlarmBridge(QObject):
+    """Carries alarm fires from the scheduler thread onto the GUI thread."""
+    fired = Signal(object)  # AlarmFired
 
-def _run_timer_overlay():
-    from modules.overlay.timer_overlay_tk import launch_overlay
-    launch_overlay(30, 30)
 
 class OverlayPage(QWidget):
     page_id = "overlay"
     title = "OVERLAY"
 
-    def __init__(self):
+    alarm_fired = Signal(object)  # AlarmFired, on the GUI thread
+
+    def __init__(self, schedule: Optional[ScheduleCache] = None, alarms: Optional[AlarmScheduler] = None):
         super().__init__()
-        self._proc = None
+        self._schedule = schedule or ScheduleCache()
+        self._alarms = alarms or AlarmScheduler(self._schedule.next_event)
+        self._schedule.add_refresh_listener(self._alarms.reschedule)
+
+        self._bridge = _AlarmBridge(self)
+        self._bridge.fired.connect(self._on_alarm_fired)
+        self._alarms.add_listener(self._bridge.fired.emit)
+
+        # One overlay window hosts every widget; pages register theirs via add_overlay_widget().
+        self._overlay = OverlayWindow(x=30, y=30)
+        self._overlay_widgets: Dict[str, OverlayWidget] = {}
+        self._timers_widget = EventTimersWidget(self._schedule)
+        self.alarm_fired.connect(self._timers_widget.show_alarm)
+        self.alarm_fired.connect(lambda _fired: self._overlay.poke(EventTimersWidget.widget_id))
 
         lay = QVBoxLayout(self)
         lay.setAlignment(Qt.AlignmentFlag.AlignTop)
@@ -30,23 +57,130 @@ class OverlayPage(QWidget):
         desc.setObjectName("Dim")
         desc.setWordWrap(True)
 
-        self.btn_timer = QPushButton("Toggle Event Timers Overlay")
-        self.btn_timer.clicked.connect(self._toggle_timer)
+        self.btn_overlay = QPushButton("Show Overlay")
+        self.btn_overlay.clicked.connect(self._toggle_overlay)
+
+        self.chk_click_through = QCheckBox("Click-through (mouse passes to the game, overlay can't be dragged)")
+        self.chk_click_through.toggled.connect(self._overlay.set_click_through)
+
+        widgets_card = QFrame()
+        widgets_card.setObjectName("Card")
+        self._widgets_lay = QVBoxLayout(widgets_card)
+        self._widgets_lay.setContentsMargins(16, 16, 16, 16)
+        self._widgets_lay.setSpacing(8)
+        wh = QLabel("Overlay Widgets")
+        wh.setObjectName("H2")
+        self._widgets_lay.addWidget(wh)
 
         lay.addWidget(title)
         lay.addWidget(desc)
-        lay.addWidget(self.btn_timer)
+        lay.addWidget(self.btn_overlay)
+        lay.addWidget(self.chk_click_through)
+        lay.addWidget(widgets_card)
+        lay.addWidget(self._build_alarms_card())
         lay.addStretch(1)
 
-    def _toggle_timer(self):
-        if self._proc and self._proc.is_alive():
-            self._proc.terminate()
-            self._proc = None
-            self.btn_timer.setText("Toggle Event Timers Overlay")
+        self.add_overlay_widget(self._timers_widget, enabled=True)
+        self._hud = HudWidget(self._overlay.host)
+        self.add_overlay_widget(self._hud, enabled=False)
+
+    def _build_alarms_card(self) -> QFrame:
+        card = QFrame()
+        card.setObjectName("Card")
+        c = QVBoxLayout(card)
+        c.setContentsMargins(16, 16, 16, 16)
+        c.setSpacing(10)
+
+        h = QLabel("Event Alarms")
+        h.setObjectName("H2")
+        c.addWidget(h)
+
+        row = QHBoxLayout()
+        row.setSpacing(10)
+        self._alarm_kind = QComboBox()
+        for text, kind in _ALARM_KINDS:
+            self._alarm_kind.addItem(text, kind)
+        self._alarm_lead = QSpinBox()
+        self._alarm_lead.setRange(0, 180)
+        self._alarm_lead.setValue(5)
+        self._alarm_lead.setSuffix(" min before")
+        btn_add = QPushButton("Add Alarm")
+        btn_add.clicked.connect(self._add_alarm)
+        btn_remove = QPushButton("Remove")
+        btn_remove.clicked.connect(self._remove_alarm)
+        row.addWidget(self._alarm_kind, 1)
+        row.addWidget(self._alarm_lead)
+        row.addWidget(btn_add)
+        row.addWidget(btn_remove)
+        c.addLayout(row)
+
+        self._alarm_list = QListWidget()
+        self._alarm_list.setMaximumHeight(140)
+        c.addWidget(self._alarm_list)
+
+        self._alarm_status = QLabel("No alarm fired yet.")
+        self._alarm_status.setObjectName("Dim")
+        c.addWidget(self._alarm_status)
+        return card
+
+    def _add_alarm(self):
+        self._schedule.start()
+        self._alarms.start()
+        kind = str(self._alarm_kind.currentData())
+        lead = int(self._alarm_lead.value())
+        alarm = self._alarms.add_alarm(kind, lead, label=self._alarm_kind.currentText())
+        item = QListWidgetItem(f"{alarm.label}: {lead} min before")
+        item.setData(Qt.ItemDataRole.UserRole, alarm.alarm_id)
+        self._alarm_list.addItem(item)
+
+    def _remove_alarm(self):
+        item = self._alarm_list.currentItem()
+        if item is None:
+            return
+        self._alarms.remove_alarm(int(item.data(Qt.ItemDataRole.UserRole)))
+        self._alarm_list.takeItem(self._alarm_list.row(item))
+
+    def _on_alarm_fired(self, fired: AlarmFired):
+        ev = fired.event
+        name = ev.label or fired.alarm.label
+        mins = int(fired.alarm.lead.total_seconds() // 60)
+        self._alarm_status.setText(f"ALARM: {name} starts at {ev.starts_at:%I:%M %p} ({mins} min warning)")
+        QApplication.beep()
+        self.alarm_fired.emit(fired)
+
+    def set_hud_extra(self, extra: Optional[Callable[[], str]]):
+        """Extra HUD line(s) from another page, e.g. capture/OCR latency."""
+        self._hud.extra = extra
+
+    def add_overlay_widget(self, widget: OverlayWidget, enabled: bool = False):
+        """Offer a widget on the overlay; the user picks which ones are shown."""
+        self._overlay_widgets[widget.widget_id] = widget
+        chk = QCheckBox(widget.title)
+        chk.setChecked(enabled)
+        chk.toggled.connect(lambda on, wid=widget.widget_id: self._set_widget_enabled(wid, on))
+        self._widgets_lay.addWidget(chk)
+        if enabled:
+            self._set_widget_enabled(widget.widget_id, True)
+
+    def _set_widget_enabled(self, widget_id: str, on: bool):
+        if on:
+            self._overlay.add_widget(self._overlay_widgets[widget_id])
         else:
-            self._proc = multiprocessing.Process(target=_run_timer_overlay, daemon=True)
-            self._proc.start()
-            self.btn_timer.setText("Disable Event Timers Overlay")
+            self._overlay.remove_widget(widget_id)
+
+    def _toggle_overlay(self):
+        if self._overlay.isVisible():
+            self._overlay.hide()
+            self.btn_overlay.setText("Show Overlay")
+            return
+
+        self._schedule.start()
+        self._overlay.show()
+        self.btn_overlay.setText("Hide Overlay")
+
+    def closeEvent(self, event):
+        self._overlay.close()
+        return super().closeEvent(event)
 
     def register_actions(self, registry):
         pass